@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import CustomUser, DocumentUtilisateur, HistoriqueParrainage, CodePromoParrainage, AccountDeletionLog
+from .moderation import traiter_demande_vendor
+from .models import CustomUser, DocumentUtilisateur, HistoriqueParrainage, CodePromoParrainage, AccountDeletionLog, CodeOTP, SoldeParrainage, RetraitParrainage, ElementModeration, BlobFichier
 from django.utils.html import format_html
 from django.urls import reverse
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Q, Subquery
 
 # Register your models here.
 @admin.register(CustomUser)
@@ -58,7 +59,7 @@ class DocumentUtilisateurAdmin(admin.ModelAdmin):
     # ✅ Nouvelle méthode pour identifier les demandes vendor
     def is_vendor_request(self, obj):
         """Indique si c'est une demande de vendor"""
-        return "Demande vendor" in obj.nom
+        return obj.est_demande_vendor
     is_vendor_request.boolean = True
     is_vendor_request.short_description = "Demande Vendor"
     
@@ -68,7 +69,7 @@ class DocumentUtilisateurAdmin(admin.ModelAdmin):
         approved_count = 0
         
         for document in queryset:
-            if "Demande vendor" in document.nom and document.statut_verification == 'en_attente':
+            if document.est_demande_vendor and document.statut_verification == 'en_attente':
                 # Marquer le document comme approuvé
                 document.statut_verification = 'approuve'
                 document.moderateur = request.user
@@ -107,7 +108,7 @@ class DocumentUtilisateurAdmin(admin.ModelAdmin):
         refused_count = 0
         
         for document in queryset:
-            if "Demande vendor" in document.nom and document.statut_verification == 'en_attente':
+            if document.est_demande_vendor and document.statut_verification == 'en_attente':
                 # Marquer le document comme refusé
                 document.statut_verification = 'refuse'
                 document.moderateur = request.user
@@ -171,9 +172,9 @@ class VendorRequestFilter(admin.SimpleListFilter):
     
     def queryset(self, request, queryset):
         if self.value() == 'vendor':
-            return queryset.filter(nom__icontains='Demande vendor')
+            return queryset.filter(est_demande_vendor=True)
         elif self.value() == 'documents':
-            return queryset.exclude(nom__icontains='Demande vendor')
+            return queryset.filter(est_demande_vendor=False)
         return queryset
 
 # ✅ Admin proxy pour les demandes vendor uniquement
@@ -188,9 +189,13 @@ class DemandeVendorAdmin(admin.ModelAdmin):
     """Interface dédiée pour gérer uniquement les demandes vendor"""
     
     def get_queryset(self, request):
+        # Nombre de documents par utilisateur via une sous-requête groupée (pas de COUNT par ligne)
+        documents_par_utilisateur = DocumentUtilisateur.objects.filter(
+            utilisateur=OuterRef('utilisateur'), est_demande_vendor=True
+        ).values('utilisateur').annotate(n=Count('id')).values('n')
         return super().get_queryset(request).filter(
-            nom__icontains='Demande vendor'
-        ).select_related('utilisateur')
+            est_demande_vendor=True
+        ).select_related('utilisateur').annotate(nb_documents=Subquery(documents_par_utilisateur))
     
     list_display = [
         'id', 'utilisateur_info', 'structure_type', 'agence_info', 
@@ -231,11 +236,7 @@ class DemandeVendorAdmin(admin.ModelAdmin):
     
     def documents_count(self, obj):
         """Nombre de documents associés à cette demande"""
-        count = DocumentUtilisateur.objects.filter(
-            utilisateur=obj.utilisateur,
-            nom__icontains='Demande vendor'
-        ).count()
-        return f"{count} document(s)"
+        return f"{obj.nb_documents or 0} document(s)"
     documents_count.short_description = "Documents"
     
     def approuver_demandes(self, request, queryset):
@@ -243,20 +244,8 @@ class DemandeVendorAdmin(admin.ModelAdmin):
         approved = 0
         for demande in queryset:
             if demande.statut_verification == 'en_attente':
-                # Approuver tous les documents de cette demande
-                DocumentUtilisateur.objects.filter(
-                    utilisateur=demande.utilisateur,
-                    nom__icontains='Demande vendor'
-                ).update(
-                    statut_verification='approuve',
-                    moderateur=request.user
-                )
-                
-                # Activer le vendor
-                user = demande.utilisateur
-                user.is_vendor = True
-                user.est_verifie = True
-                user.save()
+                # Tous les documents de la demande, activation du vendor et email
+                traiter_demande_vendor(demande.utilisateur, 'approuve', request.user)
                 approved += 1
         
         self.message_user(request, f"{approved} demande(s) approuvée(s)")
@@ -267,15 +256,8 @@ class DemandeVendorAdmin(admin.ModelAdmin):
         refused = 0
         for demande in queryset:
             if demande.statut_verification == 'en_attente':
-                # Refuser tous les documents de cette demande
-                DocumentUtilisateur.objects.filter(
-                    utilisateur=demande.utilisateur,
-                    nom__icontains='Demande vendor'
-                ).update(
-                    statut_verification='refuse',
-                    moderateur=request.user,
-                    commentaire_moderateur="Demande refusée par l'administration"
-                )
+                # Tous les documents de la demande et email
+                traiter_demande_vendor(demande.utilisateur, 'refuse', request.user)
                 refused += 1
         
         self.message_user(request, f"{refused} demande(s) refusée(s)")
@@ -285,4 +267,44 @@ class DemandeVendorAdmin(admin.ModelAdmin):
 class AccountDeletionLogAdmin(admin.ModelAdmin):
     list_display = ('id', 'user_id', 'email', 'username', 'hard_delete', 'deleted_at', 'performed_by')
     search_fields = ('email', 'username', 'user_id')
-    list_filter = ('hard_delete', 'deleted_at')
\ No newline at end of file
+    list_filter = ('hard_delete', 'deleted_at')
+
+
+@admin.register(CodeOTP)
+class CodeOTPAdmin(admin.ModelAdmin):
+    list_display = ('id', 'utilisateur', 'usage', 'created_at', 'expire_le', 'tentatives', 'utilise', 'adresse_ip')
+    list_filter = ('usage', 'utilise', 'created_at')
+    search_fields = ('utilisateur__email', 'adresse_ip')
+    raw_id_fields = ('utilisateur',)
+    readonly_fields = ('code_hash',)
+
+
+@admin.register(SoldeParrainage)
+class SoldeParrainageAdmin(admin.ModelAdmin):
+    list_display = ('utilisateur', 'gains_acquis', 'gains_en_attente', 'montant_retire', 'points', 'updated_at')
+    search_fields = ('utilisateur__email', 'utilisateur__username')
+    raw_id_fields = ('utilisateur',)
+    readonly_fields = ('gains_acquis', 'gains_en_attente', 'montant_retire', 'points', 'updated_at')
+
+
+@admin.register(RetraitParrainage)
+class RetraitParrainageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'utilisateur', 'montant', 'mode_paiement', 'statut', 'created_at', 'traite_le')
+    list_filter = ('statut', 'mode_paiement', 'created_at')
+    search_fields = ('utilisateur__email', 'utilisateur__username')
+    raw_id_fields = ('utilisateur',)
+
+
+@admin.register(ElementModeration)
+class ElementModerationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'type_element', 'document', 'bien', 'priorite', 'statut', 'moderateur', 'reserve_jusqu_a', 'decision', 'traite_par', 'traite_le')
+    list_filter = ('type_element', 'statut', 'decision')
+    raw_id_fields = ('document', 'bien', 'moderateur', 'traite_par')
+    ordering = ('statut', '-priorite', 'created_at')
+
+
+@admin.register(BlobFichier)
+class BlobFichierAdmin(admin.ModelAdmin):
+    list_display = ('cle_stockage', 'taille', 'nb_references', 'created_at')
+    search_fields = ('sha256', 'cle_stockage')
+    readonly_fields = ('sha256', 'cle_stockage', 'taille', 'nb_references', 'created_at')
@@ -0,0 +1,92 @@
+"""
+Arbre de parrainage (filleuls des filleuls…) sur plusieurs niveaux.
+
+Une seule requête récursive (WITH RECURSIVE, commune à PostgreSQL et SQLite)
+parcourt l'auto-référence CustomUser.parrain en s'appuyant sur l'index de la
+clé étrangère ; le résumé par niveau est mis en cache pour chaque racine.
+"""
+from django.core.cache import cache
+from django.db import connection
+
+PROFONDEUR_MAX = 10
+CACHE_TIMEOUT = 60 * 10  # Pas d'invalidation : un changement profond concerne tous les ancêtres
+
+
+def _tables():
+    from .models import CustomUser, HistoriqueParrainage
+
+    return {
+        'utilisateurs': connection.ops.quote_name(CustomUser._meta.db_table),
+        'historique': connection.ops.quote_name(HistoriqueParrainage._meta.db_table),
+    }
+
+
+def _cte():
+    # La profondeur bornée garantit la terminaison même en cas de cycle parrain/filleul
+    return """
+        WITH RECURSIVE arbre (id, niveau) AS (
+            SELECT id, 1 FROM {utilisateurs} WHERE parrain_id = %s
+            UNION ALL
+            SELECT u.id, a.niveau + 1
+            FROM {utilisateurs} u
+            JOIN arbre a ON u.parrain_id = a.id
+            WHERE a.niveau < %s
+        )
+    """.format(**_tables())
+
+
+def _calculer(user_id, profondeur):
+    sql = _cte() + """
+        SELECT a.niveau,
+               COUNT(DISTINCT a.id),
+               COUNT(DISTINCT CASE WHEN u.parrainage_actif THEN a.id END),
+               COALESCE(SUM(h.montant_recompense), 0)
+        FROM arbre a
+        JOIN {utilisateurs} u ON u.id = a.id
+        LEFT JOIN {historique} h ON h.filleul_id = a.id AND h.statut_recompense <> 'annulee'
+        GROUP BY a.niveau
+        ORDER BY a.niveau
+    """.format(**_tables())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, profondeur])
+        lignes = cursor.fetchall()
+
+    niveaux = [
+        {'niveau': niveau, 'membres': membres, 'membres_actifs': actifs, 'recompenses_generees': recompenses}
+        for niveau, membres, actifs, recompenses in lignes
+    ]
+    return {
+        'profondeur': profondeur,
+        'total_membres': sum(n['membres'] for n in niveaux),
+        'total_recompenses_generees': sum((n['recompenses_generees'] for n in niveaux), 0),
+        'niveaux': niveaux,
+    }
+
+
+def resume_arbre(user_id, profondeur):
+    """Nombre de membres (et actifs) et récompenses générées par niveau, jusqu'à ``profondeur``"""
+    profondeur = max(1, min(int(profondeur), PROFONDEUR_MAX))
+    cle = f"parrainage:arbre:{user_id}:{profondeur}"
+    resume = cache.get(cle)
+    if resume is None:
+        resume = _calculer(user_id, profondeur)
+        cache.set(cle, resume, CACHE_TIMEOUT)
+    return resume
+
+
+def membres_arbre(user_id, profondeur, niveau=None, limite=100, decalage=0):
+    """Page de membres de l'arbre (id, username, parrain_id, niveau), par niveau puis identifiant"""
+    profondeur = max(1, min(int(profondeur), PROFONDEUR_MAX))
+    sql = _cte() + """
+        SELECT u.id, u.username, u.parrain_id, a.niveau, u.date_parrainage
+        FROM arbre a
+        JOIN {utilisateurs} u ON u.id = a.id
+        {filtre}
+        ORDER BY a.niveau, u.id
+        LIMIT %s OFFSET %s
+    """.format(filtre='WHERE a.niveau = %s' if niveau else '', **_tables())
+    parametres = [user_id, profondeur] + ([niveau] if niveau else []) + [limite, decalage]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametres)
+        colonnes = [col[0] for col in cursor.description]
+        return [dict(zip(colonnes, ligne)) for ligne in cursor.fetchall()]
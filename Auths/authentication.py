@@ -0,0 +1,54 @@
+"""
+Authentification JWT avec résolution de l'utilisateur mise en cache.
+
+Le jeton d'accès est toujours vérifié (signature, expiration) ; seule la
+lecture de la ligne CustomUser est servie par le cache pendant quelques
+secondes. Le cache est invalidé à chaque sauvegarde ou suppression de
+l'utilisateur (signaux) et après chaque ``QuerySet.update()`` sur les
+utilisateurs, actions groupées de l'admin comprises (CustomUserQuerySet,
+voir Auths/models.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Court : avec le cache mémoire local, une invalidation n'atteint que le worker courant
+CACHE_TIMEOUT = getattr(settings, 'JWT_USER_CACHE_TIMEOUT', 60)
+
+
+def _cle(user_id):
+    return f"auth:utilisateur:{user_id}"
+
+
+def invalider_utilisateur(user_id):
+    cache.delete(_cle(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication dont ``get_user`` ne touche la base qu'en cas d'absence du cache"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = cache.get(_cle(user_id))
+        if user is None:
+            # Lecture en base + contrôles habituels (inexistant, inactif, mot de passe changé)
+            user = super().get_user(validated_token)
+            cache.set(_cle(user_id), user, CACHE_TIMEOUT)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
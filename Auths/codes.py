@@ -0,0 +1,99 @@
+"""
+Attribution de codes uniques (parrainage, codes promo).
+
+Les codes sont tirés au hasard dans un alphabet sans caractères ambigus
+(31 symboles, soit plus de 8 × 10^11 codes sur 8 caractères) et l'unicité est
+garantie par l'index unique de la colonne : on insère directement et on ne
+retire un code qu'en cas de collision, au lieu d'un ``exists()`` préalable.
+"""
+import re
+import secrets
+
+from django.db import IntegrityError, transaction
+
+# Sans 0/O ni 1/I/L pour éviter les confusions à la saisie
+ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+LONGUEUR_CODE = 8
+TENTATIVES_MAX = 5
+
+# Colonnes de l'index en cause : « Key (col)=(…) » (PostgreSQL),
+# « UNIQUE constraint failed: table.col » (SQLite)
+_CLE_POSTGRES = re.compile(r'Key \(([^)]*)\)=')
+_CLE_SQLITE = re.compile(r'UNIQUE constraint failed: (.+)$', re.MULTILINE)
+
+
+def code_aleatoire(prefixe='', longueur=LONGUEUR_CODE):
+    """Code aléatoire (générateur cryptographique), sans accès à la base"""
+    return prefixe + ''.join(secrets.choice(ALPHABET) for _ in range(longueur))
+
+
+def est_collision(erreur, champ):
+    """
+    L'IntegrityError vient-elle de l'index unique portant sur la seule colonne
+    ``champ`` ? Compare les noms de colonnes du message du SGBD, pas une
+    sous-chaîne (le nom de la table peut contenir celui du champ).
+    """
+    diag = getattr(erreur.__cause__, 'diag', None)
+    message = getattr(diag, 'message_detail', None) or str(erreur)
+    trouve = _CLE_POSTGRES.search(message)
+    if trouve:
+        colonnes = [colonne.strip().strip('"') for colonne in trouve.group(1).split(',')]
+    else:
+        trouve = _CLE_SQLITE.search(message)
+        if not trouve:
+            return False
+        colonnes = [colonne.strip().rsplit('.', 1)[-1] for colonne in trouve.group(1).split(',')]
+    return colonnes == [champ]
+
+
+def inserer_avec_code(inserer, champ, prefixe='', longueur=LONGUEUR_CODE):
+    """
+    Appelle ``inserer(code)`` avec un nouveau code jusqu'à ce que l'insertion
+    passe l'index unique de ``champ``.
+
+    Chaque essai est isolé dans un point de sauvegarde pour que la transaction
+    englobante reste utilisable après une collision (PostgreSQL).
+    """
+    for tentative in range(TENTATIVES_MAX):
+        code = code_aleatoire(prefixe, longueur)
+        try:
+            with transaction.atomic():
+                return inserer(code)
+        except IntegrityError as e:
+            if not est_collision(e, champ) or tentative == TENTATIVES_MAX - 1:
+                raise
+
+
+def allouer_codes(modele, champ, nombre, prefixe='', longueur=LONGUEUR_CODE):
+    """
+    Alloue ``nombre`` codes distincts absents de ``modele.champ`` pour les
+    insertions groupées (imports) : une seule requête IN par tour pour écarter
+    les rares collisions avec l'existant.
+    """
+    codes = set()
+    while len(codes) < nombre:
+        candidats = set()
+        while len(candidats) < nombre - len(codes):
+            code = code_aleatoire(prefixe, longueur)
+            if code not in codes:
+                candidats.add(code)
+        pris = set(
+            modele._default_manager
+            .filter(**{f'{champ}__in': candidats})
+            .values_list(champ, flat=True)
+        )
+        codes |= candidats - pris
+    return list(codes)
+
+
+def attribuer_codes(objets, champ, prefixe='', longueur=LONGUEUR_CODE):
+    """
+    Renseigne ``champ`` sur les instances qui n'en ont pas encore, avant un
+    ``bulk_create`` / ``bulk_update`` (``save()`` n'est pas appelé dans ce cas).
+    """
+    sans_code = [objet for objet in objets if not getattr(objet, champ)]
+    if sans_code:
+        codes = allouer_codes(type(sans_code[0]), champ, len(sans_code), prefixe, longueur)
+        for objet, code in zip(sans_code, codes):
+            setattr(objet, champ, code)
+    return objets
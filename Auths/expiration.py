@@ -0,0 +1,146 @@
+"""
+Suivi des dates d'expiration des documents (pièces d'identité, permis,
+assurances et cartes grises des biens).
+
+Un balayage périodique (commande ``verifier_expirations_documents``) :
+- passe en un UPDATE les documents utilisateur dépassés au statut « expiré » ;
+- sélectionne par une requête d'intervalle sur l'index de ``date_expiration``
+  les documents qui expirent (ou viennent d'expirer) et n'ont pas encore été
+  signalés, puis envoie un seul email récapitulatif par utilisateur.
+
+``expiration_notifiee`` retient la date déjà signalée : un document renouvelé
+avec une nouvelle date sera de nouveau signalé à son approche.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+JOURS_PREAVIS = getattr(settings, 'DOCUMENTS_JOURS_PREAVIS_EXPIRATION', 30)
+STATUTS_ACTIFS = ('en_attente', 'approuve')
+
+
+def marquer_documents_expires(aujourd_hui=None, taille_lot=500):
+    """Passe au statut « expiré » les documents actifs dont la date est dépassée ; retourne leur nombre"""
+    from .models import DocumentUtilisateur
+    from .moderation import cloturer_elements
+
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    total = 0
+    while True:
+        ids = list(
+            DocumentUtilisateur.objects.filter(
+                date_expiration__lt=aujourd_hui, statut_verification__in=STATUTS_ACTIFS
+            ).order_by().values_list('id', flat=True)[:taille_lot]
+        )
+        if not ids:
+            return total
+        with transaction.atomic():
+            DocumentUtilisateur.objects.filter(id__in=ids).update(statut_verification='expire')
+            # Un document expiré n'a plus à être modéré
+            cloturer_elements(documents=ids)
+        total += len(ids)
+
+
+def documents_a_signaler(aujourd_hui=None, jours=JOURS_PREAVIS):
+    """
+    {user_id: {'utilisateur', 'documents', 'documents_biens'}} des documents
+    expirant dans les ``jours`` prochains (ou depuis moins de ``jours``) et pas
+    encore signalés : une requête d'intervalle par table.
+    """
+    from reservation.models import Document
+
+    from .models import DocumentUtilisateur
+
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    intervalle = (aujourd_hui - timedelta(days=jours), aujourd_hui + timedelta(days=jours))
+    destinataires = {}
+
+    documents = (
+        DocumentUtilisateur.objects.filter(date_expiration__range=intervalle)
+        .exclude(statut_verification='refuse')
+        .exclude(expiration_notifiee=F('date_expiration'))
+        .select_related('utilisateur')
+        .order_by('date_expiration')
+    )
+    for document in documents:
+        entree = destinataires.setdefault(
+            document.utilisateur_id,
+            {'utilisateur': document.utilisateur, 'documents': [], 'documents_biens': []},
+        )
+        entree['documents'].append(document)
+
+    documents_biens = (
+        Document.objects.filter(date_expiration__range=intervalle)
+        .exclude(expiration_notifiee=F('date_expiration'))
+        .select_related('bien__owner')
+        .order_by('date_expiration')
+    )
+    for document in documents_biens:
+        proprietaire = document.bien.owner
+        if proprietaire is None:
+            continue
+        entree = destinataires.setdefault(
+            proprietaire.pk,
+            {'utilisateur': proprietaire, 'documents': [], 'documents_biens': []},
+        )
+        entree['documents_biens'].append(document)
+
+    return destinataires
+
+
+def _email_recapitulatif(entree, aujourd_hui, from_email):
+    context = {**entree, 'aujourd_hui': aujourd_hui}
+    html = render_to_string('emails/expiration_documents_email.html', context)
+    nombre = len(entree['documents']) + len(entree['documents_biens'])
+    email = EmailMultiAlternatives(
+        f"BabiLoc - {nombre} document(s) arrivent à expiration",
+        strip_tags(html),
+        from_email,
+        [entree['utilisateur'].email],
+    )
+    email.attach_alternative(html, 'text/html')
+    return email
+
+
+def notifier_expirations(aujourd_hui=None, jours=JOURS_PREAVIS, taille_lot=100):
+    """
+    Envoie un récapitulatif par utilisateur, par lots sur une même connexion SMTP,
+    et marque les documents signalés. Un lot en échec sera retenté au prochain passage.
+    Retourne (emails envoyés, documents signalés).
+    """
+    from reservation.models import Document
+
+    from .models import DocumentUtilisateur
+
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', getattr(settings, 'EMAIL_HOST_USER', None))
+    entrees = [e for e in documents_a_signaler(aujourd_hui, jours).values() if e['utilisateur'].email]
+
+    emails_envoyes = documents_signales = 0
+    for debut in range(0, len(entrees), taille_lot):
+        lot = entrees[debut:debut + taille_lot]
+        try:
+            with get_connection() as connexion:
+                emails_envoyes += connexion.send_messages(
+                    [_email_recapitulatif(entree, aujourd_hui, from_email) for entree in lot]
+                )
+        except Exception as e:
+            logger.error("Envoi des alertes d'expiration impossible (lot de %s) : %s", len(lot), e)
+            continue
+
+        ids_documents = [d.pk for entree in lot for d in entree['documents']]
+        ids_documents_biens = [d.pk for entree in lot for d in entree['documents_biens']]
+        DocumentUtilisateur.objects.filter(id__in=ids_documents).update(expiration_notifiee=F('date_expiration'))
+        Document.objects.filter(id__in=ids_documents_biens).update(expiration_notifiee=F('date_expiration'))
+        documents_signales += len(ids_documents) + len(ids_documents_biens)
+
+    return emails_envoyes, documents_signales
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from Auths.codes import attribuer_codes
+from Auths.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Attribue par lots un code de parrainage aux utilisateurs qui n'en ont pas (après un import)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            utilisateurs = list(
+                CustomUser.objects.filter(code_parrainage__isnull=True)
+                .only('id', 'code_parrainage')[:options['taille_lot']]
+            )
+            if not utilisateurs:
+                break
+            attribuer_codes(utilisateurs, 'code_parrainage')
+            CustomUser.objects.bulk_update(utilisateurs, ['code_parrainage'])
+            total += len(utilisateurs)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} code(s) de parrainage attribué(s)"))
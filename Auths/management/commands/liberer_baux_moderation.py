@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Auths.moderation import liberer_baux_expires
+
+
+class Command(BaseCommand):
+    help = "Remet dans la file de modération les éléments dont le bail de réservation a expiré"
+
+    def handle(self, *args, **options):
+        liberes = liberer_baux_expires()
+        self.stdout.write(self.style.SUCCESS(f"{liberes} élément(s) remis dans la file"))
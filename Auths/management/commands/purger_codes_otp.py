@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Auths.models import CodeOTP
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime par lots les codes OTP plus anciens que la fenêtre des limites d'envoi "
+        "(24 h par défaut)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--heures', type=int, default=24, help="Âge minimal des codes à supprimer")
+        parser.add_argument('--taille-lot', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['heures'])
+        total = 0
+        while True:
+            ids = list(
+                CodeOTP.objects.filter(created_at__lt=limite)
+                .values_list('id', flat=True)[:options['taille_lot']]
+            )
+            if not ids:
+                break
+            supprimes, _ = CodeOTP.objects.filter(id__in=ids).delete()
+            total += supprimes
+
+        self.stdout.write(self.style.SUCCESS(f"{total} code(s) OTP supprimé(s)"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime par lots les jetons de rafraîchissement expirés (OutstandingToken) et leurs "
+        "entrées de liste noire. À planifier (cron) : la rotation des jetons en crée à chaque rafraîchissement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        maintenant = timezone.now()
+        total_jetons = total_liste_noire = 0
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lt=maintenant)
+                .order_by()
+                .values_list('id', flat=True)[:options['taille_lot']]
+            )
+            if not ids:
+                break
+            # Un DELETE par table pour le lot : la liste noire d'abord, la cascade n'a alors plus rien à charger
+            total_liste_noire += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            total_jetons += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_jetons} jeton(s) expiré(s) et {total_liste_noire} entrée(s) de liste noire supprimé(s)"
+        ))
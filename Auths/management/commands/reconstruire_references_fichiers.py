@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Auths.models import CHAMPS_FICHIERS_DOCUMENT, CHAMPS_FICHIERS_UTILISATEUR, BlobFichier, CustomUser, DocumentUtilisateur
+from Auths.stockage import stockage_documents
+from chat.models import CHAMPS_FICHIERS_PIECE_JOINTE, PieceJointeChat
+from reservation.models import Document
+
+
+def compter_references():
+    """{cle_stockage: nombre de champs qui la référencent} sur tous les modèles dédupliqués"""
+    references = Counter()
+    for modele, champs in (
+        (CustomUser, CHAMPS_FICHIERS_UTILISATEUR),
+        (DocumentUtilisateur, CHAMPS_FICHIERS_DOCUMENT),
+        (Document, CHAMPS_FICHIERS_DOCUMENT),
+        (PieceJointeChat, CHAMPS_FICHIERS_PIECE_JOINTE),
+    ):
+        for champ in champs:
+            references.update(
+                modele.objects.exclude(**{f'{champ}__isnull': True}).exclude(**{champ: ''})
+                .values_list(champ, flat=True).iterator()
+            )
+    return references
+
+
+class Command(BaseCommand):
+    help = "Recalcule le nombre de références des fichiers dédupliqués et purge éventuellement les orphelins"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purger', action='store_true', help="Supprime les fichiers qui ne sont plus référencés")
+
+    def handle(self, *args, **options):
+        references = compter_references()
+        corriges = 0
+        orphelins = []
+        with transaction.atomic():
+            for blob in BlobFichier.objects.select_for_update().only('id', 'cle_stockage', 'nb_references'):
+                nombre = references.get(blob.cle_stockage, 0)
+                if nombre == 0:
+                    orphelins.append(blob)
+                elif nombre != blob.nb_references:
+                    blob.nb_references = nombre
+                    blob.save(update_fields=['nb_references'])
+                    corriges += 1
+
+        self.stdout.write(f"{corriges} compteur(s) corrigé(s), {len(orphelins)} fichier(s) orphelin(s)")
+        if options['purger'] and orphelins:
+            backend = stockage_documents().backend
+            for blob in orphelins:
+                backend.delete(blob.cle_stockage)
+                blob.delete()
+            self.stdout.write(self.style.SUCCESS(f"{len(orphelins)} fichier(s) orphelin(s) supprimé(s)"))
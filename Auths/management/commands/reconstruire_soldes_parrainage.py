@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from Auths.models import HistoriqueParrainage, RetraitParrainage, SoldeParrainage
+
+
+def calculer_soldes(historiques, retraits):
+    """{user_id: champs du solde} en une requête GROUP BY par table"""
+    soldes = {}
+    for ligne in historiques.values('parrain_id').annotate(
+        gains_acquis=Sum('montant_recompense', filter=Q(statut_recompense='versee')),
+        gains_en_attente=Sum('montant_recompense', filter=Q(statut_recompense='en_attente')),
+        points=Sum('points_recompense', filter=~Q(statut_recompense='annulee')),
+    ).order_by():
+        soldes[ligne['parrain_id']] = {
+            'gains_acquis': ligne['gains_acquis'] or 0,
+            'gains_en_attente': ligne['gains_en_attente'] or 0,
+            'points': ligne['points'] or 0,
+        }
+    for ligne in retraits.exclude(statut='refuse').values('utilisateur_id').annotate(
+        total=Sum('montant')
+    ).order_by():
+        soldes.setdefault(ligne['utilisateur_id'], {})['montant_retire'] = ligne['total'] or 0
+    return soldes
+
+
+class Command(BaseCommand):
+    help = "Recalcule entièrement les soldes de parrainage à partir de l'historique et des retraits"
+
+    def handle(self, *args, **options):
+        soldes = calculer_soldes(HistoriqueParrainage.objects.all(), RetraitParrainage.objects.all())
+        with transaction.atomic():
+            SoldeParrainage.objects.all().delete()
+            SoldeParrainage.objects.bulk_create(
+                [SoldeParrainage(utilisateur_id=user_id, **champs) for user_id, champs in soldes.items()],
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(soldes)} solde(s) de parrainage recalculé(s)"))
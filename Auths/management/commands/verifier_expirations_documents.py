@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from Auths.expiration import JOURS_PREAVIS, marquer_documents_expires, notifier_expirations
+
+
+class Command(BaseCommand):
+    help = (
+        "Marque les documents expirés et envoie un récapitulatif par utilisateur des documents "
+        "(pièces, permis, assurances des biens) qui arrivent à expiration. À planifier chaque jour (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=JOURS_PREAVIS, help="Préavis en jours avant l'expiration")
+        parser.add_argument('--taille-lot', type=int, default=100, help="Emails envoyés par connexion SMTP")
+
+    def handle(self, *args, **options):
+        expires = marquer_documents_expires()
+        emails, documents = notifier_expirations(jours=options['jours'], taille_lot=options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{expires} document(s) passé(s) en « expiré », {documents} document(s) signalé(s) "
+            f"dans {emails} email(s)"
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0009_alter_documentutilisateur_fichier_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='otp_code',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='otp_created_at',
+        ),
+        migrations.CreateModel(
+            name='CodeOTP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usage', models.CharField(choices=[('activation', 'Activation du compte'), ('reinitialisation', 'Réinitialisation du mot de passe'), ('suppression', 'Suppression du compte')], max_length=20, verbose_name='Usage')),
+                ('code_hash', models.CharField(max_length=64, verbose_name='Empreinte du code')),
+                ('expire_le', models.DateTimeField(verbose_name='Expire le')),
+                ('tentatives', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('utilise', models.BooleanField(default=False, verbose_name='Utilisé')),
+                ('adresse_ip', models.GenericIPAddressField(blank=True, null=True, verbose_name='Adresse IP')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codes_otp', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Code OTP',
+                'verbose_name_plural': 'Codes OTP',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['utilisateur', 'usage', '-created_at'], name='otp_utilisateur_usage_idx'), models.Index(fields=['adresse_ip', 'created_at'], name='otp_ip_date_idx'), models.Index(fields=['created_at'], name='otp_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def initialiser_soldes_parrainage(apps, schema_editor):
+    """Calcule les soldes à partir de l'historique existant (même calcul que reconstruire_soldes_parrainage)"""
+    HistoriqueParrainage = apps.get_model('Auths', 'HistoriqueParrainage')
+    SoldeParrainage = apps.get_model('Auths', 'SoldeParrainage')
+
+    lignes = HistoriqueParrainage.objects.values('parrain_id').annotate(
+        gains_acquis=Sum('montant_recompense', filter=Q(statut_recompense='versee')),
+        gains_en_attente=Sum('montant_recompense', filter=Q(statut_recompense='en_attente')),
+        points=Sum('points_recompense', filter=~Q(statut_recompense='annulee')),
+    ).order_by()
+    SoldeParrainage.objects.bulk_create(
+        [
+            SoldeParrainage(
+                utilisateur_id=ligne['parrain_id'],
+                gains_acquis=ligne['gains_acquis'] or 0,
+                gains_en_attente=ligne['gains_en_attente'] or 0,
+                points=ligne['points'] or 0,
+            )
+            for ligne in lignes
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0010_remove_customuser_otp_code_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoldeParrainage',
+            fields=[
+                ('utilisateur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='solde_parrainage', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('gains_acquis', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Gains versés')),
+                ('gains_en_attente', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Gains en attente')),
+                ('montant_retire', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Montant retiré (hors retraits refusés)')),
+                ('points', models.IntegerField(default=0, verbose_name='Points gagnés')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Solde de parrainage',
+                'verbose_name_plural': 'Soldes de parrainage',
+            },
+        ),
+        migrations.CreateModel(
+            name='RetraitParrainage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Montant')),
+                ('mode_paiement', models.CharField(default='mobile_money', max_length=30, verbose_name='Mode de paiement')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('effectue', 'Effectué'), ('refuse', 'Refusé')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('traite_le', models.DateTimeField(blank=True, null=True, verbose_name='Traité le')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retraits_parrainage', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Retrait de parrainage',
+                'verbose_name_plural': 'Retraits de parrainage',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(initialiser_soldes_parrainage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:59
+
+from django.db import migrations, models
+
+
+def marquer_demandes_vendor(apps, schema_editor):
+    """Les demandes existantes étaient reconnues à leur nom"""
+    DocumentUtilisateur = apps.get_model('Auths', 'DocumentUtilisateur')
+    DocumentUtilisateur.objects.filter(nom__icontains='Demande vendor').update(est_demande_vendor=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0011_soldeparrainage_retraitparrainage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentutilisateur',
+            name='est_demande_vendor',
+            field=models.BooleanField(default=False, verbose_name='Demande vendor'),
+        ),
+        migrations.AddIndex(
+            model_name='documentutilisateur',
+            index=models.Index(condition=models.Q(('est_demande_vendor', True)), fields=['statut_verification', '-date_upload'], name='doc_demande_vendor_idx'),
+        ),
+        migrations.RunPython(marquer_demandes_vendor, migrations.RunPython.noop),
+    ]
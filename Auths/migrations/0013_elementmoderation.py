@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remplir_file_moderation(apps, schema_editor):
+    """Met dans la file les documents en attente et les biens non vérifiés existants"""
+    DocumentUtilisateur = apps.get_model('Auths', 'DocumentUtilisateur')
+    Bien = apps.get_model('reservation', 'Bien')
+    ElementModeration = apps.get_model('Auths', 'ElementModeration')
+
+    elements = [
+        ElementModeration(
+            type_element='document', document_id=document_id,
+            priorite=10 if est_demande_vendor else 0, created_at=date_upload,
+        )
+        for document_id, est_demande_vendor, date_upload in DocumentUtilisateur.objects.filter(
+            statut_verification='en_attente'
+        ).values_list('id', 'est_demande_vendor', 'date_upload').iterator(chunk_size=2000)
+    ]
+    elements += [
+        ElementModeration(type_element='bien', bien_id=bien_id, priorite=5, created_at=created_at)
+        for bien_id, created_at in Bien.objects.filter(est_verifie=False).values_list(
+            'id', 'created_at'
+        ).iterator(chunk_size=2000)
+    ]
+    ElementModeration.objects.bulk_create(elements, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0012_documentutilisateur_est_demande_vendor'),
+        ('reservation', '0032_bien_nb_notes_somme_notes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElementModeration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_element', models.CharField(choices=[('document', 'Document utilisateur'), ('bien', 'Bien')], max_length=20, verbose_name='Type')),
+                ('priorite', models.SmallIntegerField(default=0, verbose_name='Priorité')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours de traitement'), ('traite', 'Traité')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('reserve_le', models.DateTimeField(blank=True, null=True, verbose_name='Réservé le')),
+                ('reserve_jusqu_a', models.DateTimeField(blank=True, null=True, verbose_name="Bail jusqu'à")),
+                ('decision', models.CharField(blank=True, choices=[('approuve', 'Approuvé'), ('refuse', 'Refusé')], max_length=20, null=True, verbose_name='Décision')),
+                ('traite_le', models.DateTimeField(blank=True, null=True, verbose_name='Traité le')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Entré dans la file le')),
+                ('bien', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='element_moderation', to='reservation.bien', verbose_name='Bien')),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='element_moderation', to='Auths.documentutilisateur', verbose_name='Document')),
+                ('moderateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='elements_moderation_reserves', to=settings.AUTH_USER_MODEL, verbose_name='Réservé par')),
+                ('traite_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='elements_moderation_traites', to=settings.AUTH_USER_MODEL, verbose_name='Traité par')),
+            ],
+            options={
+                'verbose_name': 'Élément de modération',
+                'verbose_name_plural': 'File de modération',
+                'indexes': [models.Index(condition=models.Q(('statut', 'en_attente')), fields=['-priorite', 'created_at'], name='moderation_file_idx'), models.Index(condition=models.Q(('statut', 'en_cours')), fields=['reserve_jusqu_a'], name='moderation_bail_idx'), models.Index(fields=['traite_par', 'traite_le'], name='moderation_debit_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('bien__isnull', True), ('document__isnull', False), ('type_element', 'document')), models.Q(('bien__isnull', False), ('document__isnull', True), ('type_element', 'bien')), _connector='OR'), name='moderation_un_seul_objet')],
+            },
+        ),
+        migrations.RunPython(remplir_file_moderation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:05
+
+import Auths.models
+import Auths.stockage
+import Auths.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0013_elementmoderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobFichier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='Empreinte SHA-256')),
+                ('cle_stockage', models.CharField(max_length=255, unique=True, verbose_name='Clé de stockage')),
+                ('taille', models.PositiveBigIntegerField(verbose_name='Taille (octets)')),
+                ('nb_references', models.PositiveIntegerField(default=1, verbose_name='Nombre de références')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+            ],
+            options={
+                'verbose_name': 'Fichier stocké',
+                'verbose_name_plural': 'Fichiers stockés',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='carte_identite',
+            field=models.FileField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to=Auths.models.upload_path_cni),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='permis_conduire',
+            field=models.FileField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to=Auths.models.upload_path_permis),
+        ),
+        migrations.AlterField(
+            model_name='documentutilisateur',
+            name='fichier',
+            field=models.FileField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to=Auths.utils.document_upload_to, verbose_name='Fichier document'),
+        ),
+        migrations.AlterField(
+            model_name='documentutilisateur',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to=Auths.utils.document_upload_to, verbose_name='Image du document'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0014_blobfichier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentutilisateur',
+            name='expiration_notifiee',
+            field=models.DateField(blank=True, null=True, verbose_name='Expiration notifiée'),
+        ),
+        migrations.AddIndex(
+            model_name='documentutilisateur',
+            index=models.Index(condition=models.Q(('date_expiration__isnull', False)), fields=['date_expiration'], name='doc_expiration_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:49
+
+import Auths.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Auths', '0015_documentutilisateur_expiration'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', Auths.models.CustomUserManager()),
+            ],
+        ),
+    ]
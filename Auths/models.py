@@ -1,23 +1,51 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
-import random
-import string
+from django.db import models, transaction
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.utils import timezone
-from datetime import timedelta
 from Auths.utils import document_upload_to
+from Auths.codes import code_aleatoire, inserer_avec_code
+from Auths.stockage import liberer_fichiers, liberer_fichiers_remplaces, memoriser_fichiers, stockage_documents
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 
 # Create your models here.
 
 def upload_path_cni(instance, filename):
-    return f"documents/cni/{instance.user.id}/{filename}"
+    return f"documents/cni/{instance.pk}/{filename}"
 
 def upload_path_permis(instance, filename):
-    return f"documents/permis/{instance.user.id}/{filename}"
+    return f"documents/permis/{instance.pk}/{filename}"
+
+
+class CustomUserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        ``QuerySet.update()`` ne déclenche pas post_save : les utilisateurs modifiés
+        (désactivation, actions groupées de l'admin, ``bulk_update``) sont retirés
+        du cache d'authentification JWT après la validation
+        """
+        from .authentication import invalider_utilisateur
+
+        ids = list(self.order_by().values_list('pk', flat=True))
+        nombre = super().update(**kwargs)
+
+        def invalider():
+            for user_id in ids:
+                invalider_utilisateur(user_id)
+
+        if ids:
+            transaction.on_commit(invalider)
+        return nombre
+
+    update.alters_data = True
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
 
 
 class CustomUser(AbstractUser):
+    objects = CustomUserManager()
+
     class Meta:
         verbose_name = "Utilisateur"
         verbose_name_plural = "Utilisateurs"
@@ -31,16 +59,14 @@ class CustomUser(AbstractUser):
     
     number = models.TextField(null=True)
     birthdate = models.DateField(null=True)
-    carte_identite = models.FileField(upload_to=upload_path_cni, null=True, blank=True)
-    permis_conduire = models.FileField(upload_to=upload_path_permis, null=True, blank=True)
+    carte_identite = models.FileField(upload_to=upload_path_cni, storage=stockage_documents, null=True, blank=True)
+    permis_conduire = models.FileField(upload_to=upload_path_permis, storage=stockage_documents, null=True, blank=True)
     est_verifie = models.BooleanField(default=False)  # Pour marquer si les documents sont vérifiés manuellement
     is_vendor = models.BooleanField(default=False)
     photo_profil = models.ImageField(upload_to='photos_profil/', null=True, blank=True)
     image_banniere = models.ImageField(upload_to='bannieres/', null=True, blank=True)
     
-    # Nouveaux champs pour OTP
-    otp_code = models.CharField(max_length=4, null=True, blank=True)
-    otp_created_at = models.DateTimeField(null=True, blank=True)
+    # Compte vérifié par OTP (les codes eux-mêmes sont dans CodeOTP)
     otp_verified = models.BooleanField(default=False)
     
     # Système de parrainage
@@ -126,30 +152,44 @@ class CustomUser(AbstractUser):
     # ==================== MÉTHODES DE PARRAINAGE ====================
     
     def generate_code_parrainage(self):
-        """Génère un code de parrainage unique"""
-        while True:
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            if not CustomUser.objects.filter(code_parrainage=code).exists():
-                self.code_parrainage = code
-                self.save()
-                return code
+        """Attribue un code de parrainage (sans sauvegarde : l'unicité est vérifiée à l'insertion)"""
+        self.code_parrainage = code_aleatoire()
+        return self.code_parrainage
     
     def save(self, *args, **kwargs):
         # Générer automatiquement un code de parrainage si pas présent
-        if not self.code_parrainage:
-            self.generate_code_parrainage()
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if self.code_parrainage or (update_fields is not None and 'code_parrainage' not in update_fields):
+            return super().save(*args, **kwargs)
+
+        def inserer(code):
+            self.code_parrainage = code
+            super(CustomUser, self).save(*args, **kwargs)
+
+        try:
+            inserer_avec_code(inserer, 'code_parrainage')
+        except Exception:
+            self.code_parrainage = None
+            raise
     
     def parrainer(self, filleul):
         """Parrainer un utilisateur"""
-        if filleul.parrain is None:
+        from .statistiques import invalider_statistiques_parrainage
+
+        maintenant = timezone.now()
+        # Mise à jour conditionnelle : un filleul ne peut être rattaché qu'à un seul parrain
+        if CustomUser.objects.filter(pk=filleul.pk, parrain__isnull=True).update(
+            parrain=self, date_parrainage=maintenant
+        ):
             filleul.parrain = self
-            filleul.date_parrainage = timezone.now()
-            filleul.save()
+            filleul.date_parrainage = maintenant
             
-            # Incrémenter le nombre de parrainages
-            self.nb_parrainages += 1
-            self.save()
+            # Incrémenter le nombre de parrainages sans écraser les écritures concurrentes
+            CustomUser.objects.filter(pk=self.pk).update(nb_parrainages=models.F('nb_parrainages') + 1)
+            self.refresh_from_db(fields=['nb_parrainages'])
+            
+            # Cache d'authentification invalidé par CustomUserQuerySet.update()
+            invalider_statistiques_parrainage(self.pk)
             
             # Créer un historique de parrainage
             HistoriqueParrainage.objects.create(
@@ -185,57 +225,14 @@ class CustomUser(AbstractUser):
         """Retourne le nombre de filleuls"""
         return self.filleuls.count()
     
-    def get_revenus_parrainage(self):
-        """Retourne les revenus du parrainage"""
-        # Calculer les revenus basés sur les historiques de parrainage
-        from django.db.models import Sum
-        total_revenus = self.historiques_parrainage.aggregate(
-            total=Sum('montant_recompense')
-        )['total'] or 0
-        return total_revenus
-    
     def get_filleuls_actifs(self):
         """Retourne les filleuls avec parrainage actif"""
         return self.filleuls.filter(parrainage_actif=True)
     
     def get_revenus_parrainage(self):
-        """Calcule les revenus générés par le parrainage"""
-        return self.historiques_parrainage.aggregate(
-            total=models.Sum('montant_recompense')
-        )['total'] or 0
-    
-    def save(self, *args, **kwargs):
-        # Générer automatiquement un code de parrainage si pas présent
-        if not self.code_parrainage:
-            self.generate_code_parrainage()
-        super().save(*args, **kwargs)
-
-    def generate_otp(self):
-        """Génère un code OTP à 4 chiffres"""
-        self.otp_code = str(random.randint(1000, 9999))
-        self.otp_created_at = timezone.now()
-        self.otp_verified = False
-        self.save()
-        return self.otp_code
-    
-    def is_otp_valid(self):
-        """Vérifie si l'OTP est encore valide (2 minutes)"""
-        if not self.otp_created_at:
-            return False
-        expiry_time = self.otp_created_at + timedelta(minutes=2)
-        return timezone.now() <= expiry_time
-    
-    def verify_otp(self, otp_code):
-        """Vérifie le code OTP"""
-        # Convertir les deux codes en string pour éviter les problèmes de type
-        if str(self.otp_code) == str(otp_code) and self.is_otp_valid():
-            self.otp_verified = True
-            self.is_active = True
-            self.otp_code = None  # Nettoyer le code après utilisation
-            self.otp_created_at = None
-            self.save()
-            return True
-        return False
+        """Revenus du parrainage (versés et en attente), lus sur le solde tenu à jour"""
+        solde = SoldeParrainage.objects.filter(utilisateur_id=self.pk).first()
+        return solde.revenus if solde else 0
 
 class HistoriqueParrainage(models.Model):
     """Historique des actions de parrainage"""
@@ -420,11 +417,178 @@ class CodePromoParrainage(models.Model):
         return False
 
 
+class SoldeParrainage(models.Model):
+    """
+    Solde de parrainage d'un utilisateur, ajusté par des UPDATE avec F() à chaque
+    écriture d'un HistoriqueParrainage ou d'un RetraitParrainage (voir les signaux).
+    """
+    
+    utilisateur = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='solde_parrainage',
+        verbose_name="Utilisateur"
+    )
+    gains_acquis = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Gains versés"
+    )
+    gains_en_attente = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Gains en attente"
+    )
+    montant_retire = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Montant retiré (hors retraits refusés)"
+    )
+    points = models.IntegerField(default=0, verbose_name="Points gagnés")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+    
+    class Meta:
+        verbose_name = "Solde de parrainage"
+        verbose_name_plural = "Soldes de parrainage"
+    
+    def __str__(self):
+        return f"Solde parrainage user#{self.utilisateur_id} - {self.solde_disponible} FCFA"
+    
+    @property
+    def revenus(self):
+        return self.gains_acquis + self.gains_en_attente
+    
+    @property
+    def solde_disponible(self):
+        """Comme auparavant, les gains en attente sont retirables (le retrait reste à valider)"""
+        return self.revenus - self.montant_retire
+
+
+class RetraitParrainage(models.Model):
+    """Demande de retrait des gains de parrainage"""
+    
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('effectue', 'Effectué'),
+        ('refuse', 'Refusé'),
+    ]
+    
+    utilisateur = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='retraits_parrainage',
+        verbose_name="Utilisateur"
+    )
+    montant = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Montant")
+    mode_paiement = models.CharField(max_length=30, default='mobile_money', verbose_name="Mode de paiement")
+    statut = models.CharField(
+        max_length=20, choices=STATUT_CHOICES, default='en_attente', verbose_name="Statut"
+    )
+    traite_le = models.DateTimeField(null=True, blank=True, verbose_name="Traité le")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    
+    class Meta:
+        verbose_name = "Retrait de parrainage"
+        verbose_name_plural = "Retraits de parrainage"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Retrait {self.montant} FCFA - user#{self.utilisateur_id} ({self.get_statut_display()})"
+
+
+# ==================== SOLDES DE PARRAINAGE ====================
+
+CHAMPS_SOLDE_HISTORIQUE = ('parrain_id', 'statut_recompense', 'montant_recompense', 'points_recompense')
+CHAMPS_SOLDE_RETRAIT = ('utilisateur_id', 'statut', 'montant')
+
+
+def _contribution_historique(etat):
+    montant = etat['montant_recompense'] or 0
+    statut = etat['statut_recompense']
+    return {
+        'gains_acquis': montant if statut == 'versee' else 0,
+        'gains_en_attente': montant if statut == 'en_attente' else 0,
+        'points': (etat['points_recompense'] or 0) if statut != 'annulee' else 0,
+    }
+
+
+def _contribution_retrait(etat):
+    return {'montant_retire': etat['montant'] if etat['statut'] != 'refuse' else 0}
+
+
+def deltas_solde_parrainage(ancien, nouveau, contribution, cle):
+    """{user_id: {champ: delta}} entre deux états (None = absent) d'une ligne du registre"""
+    deltas = {}
+    for etat, signe in ((ancien, -1), (nouveau, 1)):
+        if etat is None or etat[cle] is None:
+            continue
+        cumul = deltas.setdefault(etat[cle], {})
+        for champ, valeur in contribution(etat).items():
+            cumul[champ] = cumul.get(champ, 0) + signe * valeur
+    return {
+        user_id: {champ: valeur for champ, valeur in delta.items() if valeur}
+        for user_id, delta in deltas.items()
+        if any(delta.values())
+    }
+
+
+def ajuster_solde_parrainage(user_id, delta, creer=True):
+    """Applique un delta au solde en un seul UPDATE (création de la ligne au besoin)"""
+    valeurs = {champ: models.F(champ) + valeur for champ, valeur in delta.items()}
+    valeurs['updated_at'] = timezone.now()
+    if SoldeParrainage.objects.filter(utilisateur_id=user_id).update(**valeurs) or not creer:
+        return
+    SoldeParrainage.objects.get_or_create(utilisateur_id=user_id)
+    SoldeParrainage.objects.filter(utilisateur_id=user_id).update(**valeurs)
+
+
 # ==================== SIGNAUX POUR AUTOMATISER LES RÉCOMPENSES ====================
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
+
+def _memoriser_etat(modele, instance, champs, update_fields):
+    noms = {*champs, *(champ.removesuffix('_id') for champ in champs)}
+    if update_fields is not None and not (noms & set(update_fields)):
+        return False  # Aucun champ du solde modifié
+    if not instance.pk:
+        return None
+    return modele.objects.filter(pk=instance.pk).values(*champs).first()
+
+
+@receiver(pre_save, sender=HistoriqueParrainage)
+@receiver(pre_save, sender=RetraitParrainage)
+def memoriser_etat_registre(sender, instance, update_fields=None, **kwargs):
+    """Conserve l'état stocké de la ligne pour calculer le delta du solde après sauvegarde"""
+    champs = CHAMPS_SOLDE_HISTORIQUE if sender is HistoriqueParrainage else CHAMPS_SOLDE_RETRAIT
+    instance._etat_solde_precedent = _memoriser_etat(sender, instance, champs, update_fields)
+
+
+@receiver(post_save, sender=HistoriqueParrainage)
+@receiver(post_save, sender=RetraitParrainage)
+def ajuster_solde_sauvegarde(sender, instance, **kwargs):
+    """Répercute sur le solde la différence entre l'ancien et le nouvel état"""
+    ancien = getattr(instance, '_etat_solde_precedent', None)
+    if ancien is False:
+        return
+    if sender is HistoriqueParrainage:
+        champs, contribution, cle = CHAMPS_SOLDE_HISTORIQUE, _contribution_historique, 'parrain_id'
+    else:
+        champs, contribution, cle = CHAMPS_SOLDE_RETRAIT, _contribution_retrait, 'utilisateur_id'
+    nouveau = {champ: getattr(instance, champ) for champ in champs}
+    for user_id, delta in deltas_solde_parrainage(ancien, nouveau, contribution, cle).items():
+        ajuster_solde_parrainage(user_id, delta)
+
+
+@receiver(post_delete, sender=HistoriqueParrainage)
+@receiver(post_delete, sender=RetraitParrainage)
+def ajuster_solde_suppression(sender, instance, **kwargs):
+    if sender is HistoriqueParrainage:
+        champs, contribution, cle = CHAMPS_SOLDE_HISTORIQUE, _contribution_historique, 'parrain_id'
+    else:
+        champs, contribution, cle = CHAMPS_SOLDE_RETRAIT, _contribution_retrait, 'utilisateur_id'
+    ancien = {champ: getattr(instance, champ) for champ in champs}
+    # Pas de création : lors de la suppression d'un utilisateur, son solde part avec lui
+    for user_id, delta in deltas_solde_parrainage(ancien, None, contribution, cle).items():
+        ajuster_solde_parrainage(user_id, delta, creer=False)
+
+
 @receiver(post_save, sender=CustomUser)
 def parrainage_inscription(sender, instance, created, **kwargs):
     """Déclenche les récompenses lors de l'inscription d'un nouvel utilisateur"""
@@ -439,6 +603,24 @@ def parrainage_inscription(sender, instance, created, **kwargs):
             description=f"Bonus d'inscription pour le parrainage de {instance.username}"
         )
 
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalider_cache_authentification(sender, instance, **kwargs):
+    """Retire l'utilisateur du cache d'authentification JWT (profil, mot de passe, suppression)"""
+    from .authentication import invalider_utilisateur
+    invalider_utilisateur(instance.pk)
+    # Un filleul modifié change les statistiques de son parrain
+    if instance.parrain_id:
+        from .statistiques import invalider_statistiques_parrainage
+        invalider_statistiques_parrainage(instance.parrain_id)
+
+@receiver(post_save, sender=HistoriqueParrainage)
+@receiver(post_delete, sender=HistoriqueParrainage)
+def invalider_statistiques_parrain(sender, instance, **kwargs):
+    """Nouvelle action de parrainage : les statistiques du parrain sont recalculées à la prochaine lecture"""
+    from .statistiques import invalider_statistiques_parrainage
+    invalider_statistiques_parrainage(instance.parrain_id)
+
 @receiver(post_save, sender='reservation.Reservation')
 def parrainage_reservation(sender, instance, created, **kwargs):
     """Déclenche les récompenses lors des réservations"""
@@ -509,6 +691,7 @@ class DocumentUtilisateur(models.Model):
     # Soit un fichier soit une image
     fichier = models.FileField(
         upload_to=document_upload_to,
+        storage=stockage_documents,
         blank=True,
         null=True,
         verbose_name="Fichier document",
@@ -516,6 +699,7 @@ class DocumentUtilisateur(models.Model):
     )
     image = models.ImageField(
         upload_to=document_upload_to,
+        storage=stockage_documents,
         blank=True,
         null=True,
         verbose_name="Image du document",
@@ -534,6 +718,12 @@ class DocumentUtilisateur(models.Model):
         blank=True,
         verbose_name="Date d'expiration"
     )
+    # Date d'expiration déjà signalée à l'utilisateur (une nouvelle date relance l'alerte)
+    expiration_notifiee = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Expiration notifiée"
+    )
     
     commentaire_moderateur = models.TextField(
         blank=True,
@@ -551,6 +741,9 @@ class DocumentUtilisateur(models.Model):
         related_name='documents_moderes'
     )
     
+    # Document principal d'une demande pour devenir propriétaire/hôte
+    est_demande_vendor = models.BooleanField(default=False, verbose_name="Demande vendor")
+    
     # Nouveaux champs pour les entreprises
     structure_type = models.CharField(
         max_length=50,
@@ -587,6 +780,20 @@ class DocumentUtilisateur(models.Model):
         verbose_name = "Document utilisateur"
         verbose_name_plural = "Documents utilisateur"
         unique_together = ('utilisateur', 'type_document')  # Un seul document par type
+        indexes = [
+            # Index partiel : seule la file des demandes vendor est parcourue par la modération
+            models.Index(
+                fields=['statut_verification', '-date_upload'],
+                condition=models.Q(est_demande_vendor=True),
+                name='doc_demande_vendor_idx',
+            ),
+            # Balayage des expirations (commande verifier_expirations_documents)
+            models.Index(
+                fields=['date_expiration'],
+                condition=models.Q(date_expiration__isnull=False),
+                name='doc_expiration_idx',
+            ),
+        ]
     
     def clean(self):
         """Validation personnalisée"""
@@ -656,4 +863,219 @@ class AccountDeletionLog(models.Model):
         verbose_name_plural = "Suppressions de compte"
 
     def __str__(self):
-        return f"Suppression user#{self.user_id} - {self.deleted_at:%Y-%m-%d %H:%M}"
\ No newline at end of file
+        return f"Suppression user#{self.user_id} - {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class CodeOTP(models.Model):
+    """Code à usage unique envoyé par email (activation, mot de passe, suppression)"""
+
+    class Usage(models.TextChoices):
+        ACTIVATION = 'activation', 'Activation du compte'
+        REINITIALISATION = 'reinitialisation', 'Réinitialisation du mot de passe'
+        SUPPRESSION = 'suppression', 'Suppression du compte'
+
+    utilisateur = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='codes_otp',
+        verbose_name="Utilisateur"
+    )
+    usage = models.CharField(max_length=20, choices=Usage.choices, verbose_name="Usage")
+    code_hash = models.CharField(max_length=64, verbose_name="Empreinte du code")
+    expire_le = models.DateTimeField(verbose_name="Expire le")
+    tentatives = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    utilise = models.BooleanField(default=False, verbose_name="Utilisé")
+    adresse_ip = models.GenericIPAddressField(null=True, blank=True, verbose_name="Adresse IP")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['utilisateur', 'usage', '-created_at'], name='otp_utilisateur_usage_idx'),
+            models.Index(fields=['adresse_ip', 'created_at'], name='otp_ip_date_idx'),
+            models.Index(fields=['created_at'], name='otp_date_idx'),
+        ]
+        verbose_name = "Code OTP"
+        verbose_name_plural = "Codes OTP"
+
+    def __str__(self):
+        return f"OTP {self.get_usage_display()} - {self.utilisateur_id} ({self.created_at:%Y-%m-%d %H:%M})"
+
+
+# ==================== STOCKAGE DÉDUPLIQUÉ ====================
+
+class BlobFichier(models.Model):
+    """Contenu stocké une seule fois, identifié par son empreinte SHA-256 (voir Auths/stockage.py)"""
+
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="Empreinte SHA-256")
+    cle_stockage = models.CharField(max_length=255, unique=True, verbose_name="Clé de stockage")
+    taille = models.PositiveBigIntegerField(verbose_name="Taille (octets)")
+    nb_references = models.PositiveIntegerField(default=1, verbose_name="Nombre de références")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Fichier stocké"
+        verbose_name_plural = "Fichiers stockés"
+
+    def __str__(self):
+        return f"{self.cle_stockage} ({self.nb_references} réf.)"
+
+
+CHAMPS_FICHIERS_UTILISATEUR = ('carte_identite', 'permis_conduire')
+CHAMPS_FICHIERS_DOCUMENT = ('fichier', 'image')
+
+
+@receiver(pre_save, sender=CustomUser)
+def memoriser_fichiers_utilisateur(sender, instance, update_fields=None, **kwargs):
+    memoriser_fichiers(instance, CHAMPS_FICHIERS_UTILISATEUR, update_fields)
+
+
+@receiver(pre_save, sender=DocumentUtilisateur)
+def memoriser_fichiers_document(sender, instance, update_fields=None, **kwargs):
+    memoriser_fichiers(instance, CHAMPS_FICHIERS_DOCUMENT, update_fields)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=DocumentUtilisateur)
+def liberer_fichiers_remplaces_auths(sender, instance, **kwargs):
+    liberer_fichiers_remplaces(instance)
+
+
+@receiver(post_delete, sender=CustomUser)
+def liberer_fichiers_utilisateur(sender, instance, **kwargs):
+    liberer_fichiers(instance, CHAMPS_FICHIERS_UTILISATEUR)
+
+
+@receiver(post_delete, sender=DocumentUtilisateur)
+def liberer_fichiers_document(sender, instance, **kwargs):
+    liberer_fichiers(instance, CHAMPS_FICHIERS_DOCUMENT)
+
+
+# ==================== FILE DE MODÉRATION ====================
+
+class ElementModeration(models.Model):
+    """
+    Élément de la file de modération (document utilisateur ou bien à vérifier).
+
+    Un modérateur réserve des éléments pour une durée limitée (bail) ; les
+    éléments dont le bail a expiré retournent dans la file.
+    """
+
+    class TypeElement(models.TextChoices):
+        DOCUMENT = 'document', 'Document utilisateur'
+        BIEN = 'bien', 'Bien'
+
+    class Statut(models.TextChoices):
+        EN_ATTENTE = 'en_attente', 'En attente'
+        EN_COURS = 'en_cours', 'En cours de traitement'
+        TRAITE = 'traite', 'Traité'
+
+    class Decision(models.TextChoices):
+        APPROUVE = 'approuve', 'Approuvé'
+        REFUSE = 'refuse', 'Refusé'
+
+    type_element = models.CharField(max_length=20, choices=TypeElement.choices, verbose_name="Type")
+    document = models.OneToOneField(
+        DocumentUtilisateur,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='element_moderation',
+        verbose_name="Document"
+    )
+    bien = models.OneToOneField(
+        'reservation.Bien',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='element_moderation',
+        verbose_name="Bien"
+    )
+    priorite = models.SmallIntegerField(default=0, verbose_name="Priorité")  # Plus élevée = traitée d'abord
+    statut = models.CharField(
+        max_length=20, choices=Statut.choices, default=Statut.EN_ATTENTE, verbose_name="Statut"
+    )
+    moderateur = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='elements_moderation_reserves',
+        verbose_name="Réservé par"
+    )
+    reserve_le = models.DateTimeField(null=True, blank=True, verbose_name="Réservé le")
+    reserve_jusqu_a = models.DateTimeField(null=True, blank=True, verbose_name="Bail jusqu'à")
+    decision = models.CharField(
+        max_length=20, choices=Decision.choices, null=True, blank=True, verbose_name="Décision"
+    )
+    traite_par = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='elements_moderation_traites',
+        verbose_name="Traité par"
+    )
+    traite_le = models.DateTimeField(null=True, blank=True, verbose_name="Traité le")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Entré dans la file le")
+
+    class Meta:
+        verbose_name = "Élément de modération"
+        verbose_name_plural = "File de modération"
+        indexes = [
+            # Prochains éléments à réserver : priorité puis ancienneté, file d'attente seule
+            models.Index(
+                fields=['-priorite', 'created_at'],
+                condition=models.Q(statut='en_attente'),
+                name='moderation_file_idx',
+            ),
+            # Baux expirés à libérer
+            models.Index(
+                fields=['reserve_jusqu_a'],
+                condition=models.Q(statut='en_cours'),
+                name='moderation_bail_idx',
+            ),
+            # Débit par modérateur
+            models.Index(fields=['traite_par', 'traite_le'], name='moderation_debit_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(type_element='document', document__isnull=False, bien__isnull=True)
+                    | models.Q(type_element='bien', bien__isnull=False, document__isnull=True)
+                ),
+                name='moderation_un_seul_objet',
+            ),
+        ]
+
+    def __str__(self):
+        objet_id = self.document_id if self.type_element == self.TypeElement.DOCUMENT else self.bien_id
+        return f"{self.get_type_element_display()} #{objet_id} ({self.get_statut_display()})"
+
+
+@receiver(post_save, sender=DocumentUtilisateur)
+def file_moderation_document(sender, instance, update_fields=None, **kwargs):
+    """Met le document dans la file tant qu'il est en attente, l'en retire une fois modéré"""
+    from .moderation import cloturer_elements, mettre_en_file
+
+    if update_fields is not None and 'statut_verification' not in update_fields:
+        return
+    if instance.statut_verification == 'en_attente':
+        mettre_en_file(document=instance)
+    elif instance.statut_verification in ('approuve', 'refuse'):
+        cloturer_elements(documents=[instance.pk], decision=instance.statut_verification,
+                          moderateur=instance.moderateur)
+
+
+@receiver(post_save, sender='reservation.Bien')
+def file_moderation_bien(sender, instance, created, update_fields=None, **kwargs):
+    """Un nouveau bien non vérifié entre dans la file ; vérifié, il en sort"""
+    from .moderation import cloturer_elements, mettre_en_file
+
+    if update_fields is not None and 'est_verifie' not in update_fields:
+        return
+    if instance.est_verifie:
+        cloturer_elements(biens=[instance.pk], decision=ElementModeration.Decision.APPROUVE)
+    elif created:
+        mettre_en_file(bien=instance)
@@ -0,0 +1,270 @@
+"""
+File de modération partagée entre modérateurs.
+
+Chaque modérateur réserve les N prochains éléments (priorité puis ancienneté)
+avec ``SELECT … FOR UPDATE SKIP LOCKED`` : deux modérateurs ne reçoivent jamais
+le même élément et aucun n'attend le verrou de l'autre. Une réservation est un
+bail ; à son expiration l'élément retourne dans la file.
+
+Une décision sur un document de demande vendor passe par
+``traiter_demande_vendor``, comme l'admin : toute la demande est traitée,
+l'utilisateur devient vendor à l'approbation et reçoit l'email de décision.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import ElementModeration
+
+DUREE_BAIL = timedelta(minutes=getattr(settings, 'MODERATION_DUREE_BAIL_MINUTES', 15))
+RESERVATION_MAX = 50
+
+# Les demandes vendor bloquent l'activité d'un hôte : elles passent avant le reste
+PRIORITE_DEMANDE_VENDOR = 10
+PRIORITE_BIEN = 5
+PRIORITE_DOCUMENT = 0
+
+
+def mettre_en_file(document=None, bien=None):
+    """Ajoute (ou remet en attente) l'élément de modération d'un document ou d'un bien"""
+    if document is not None:
+        cle = {'document': document}
+        valeurs = {
+            'type_element': ElementModeration.TypeElement.DOCUMENT,
+            'priorite': PRIORITE_DEMANDE_VENDOR if document.est_demande_vendor else PRIORITE_DOCUMENT,
+        }
+    else:
+        cle = {'bien': bien}
+        valeurs = {'type_element': ElementModeration.TypeElement.BIEN, 'priorite': PRIORITE_BIEN}
+
+    element, cree = ElementModeration.objects.get_or_create(defaults=valeurs, **cle)
+    if not cree and element.statut == ElementModeration.Statut.TRAITE:
+        # Document renvoyé après un refus : retour dans la file avec une nouvelle ancienneté
+        ElementModeration.objects.filter(pk=element.pk).update(
+            statut=ElementModeration.Statut.EN_ATTENTE, moderateur=None, reserve_le=None,
+            reserve_jusqu_a=None, decision=None, traite_par=None, traite_le=None,
+            created_at=timezone.now(), **valeurs
+        )
+    return element
+
+
+def cloturer_elements(documents=(), biens=(), decision=None, moderateur=None):
+    """Marque comme traités les éléments des objets modérés hors de la file (admin, API existante)"""
+    filtre = Q(document_id__in=list(documents)) | Q(bien_id__in=list(biens))
+    return ElementModeration.objects.filter(filtre).exclude(
+        statut=ElementModeration.Statut.TRAITE
+    ).update(
+        statut=ElementModeration.Statut.TRAITE,
+        decision=decision,
+        traite_par=moderateur,
+        traite_le=timezone.now(),
+        reserve_jusqu_a=None,
+    )
+
+
+def liberer_baux_expires():
+    """Remet dans la file, en un seul UPDATE, les éléments dont le bail a expiré"""
+    return ElementModeration.objects.filter(
+        statut=ElementModeration.Statut.EN_COURS, reserve_jusqu_a__lt=timezone.now()
+    ).update(
+        statut=ElementModeration.Statut.EN_ATTENTE, moderateur=None, reserve_le=None, reserve_jusqu_a=None
+    )
+
+
+def reserver_elements(moderateur, nombre, type_element=None):
+    """
+    Réserve jusqu'à ``nombre`` éléments pour ``moderateur`` et les retourne.
+
+    Les éléments déjà réservés par ce modérateur et encore sous bail sont
+    comptés dans le nombre demandé (et leur bail prolongé).
+    """
+    nombre = max(1, min(int(nombre), RESERVATION_MAX))
+    liberer_baux_expires()
+    maintenant = timezone.now()
+    fin_bail = maintenant + DUREE_BAIL
+
+    with transaction.atomic():
+        deja_reserves = ElementModeration.objects.filter(
+            statut=ElementModeration.Statut.EN_COURS, moderateur=moderateur
+        )
+        if type_element:
+            deja_reserves = deja_reserves.filter(type_element=type_element)
+        ids = list(deja_reserves.order_by('reserve_le').values_list('id', flat=True)[:nombre])
+
+        if len(ids) < nombre:
+            file = ElementModeration.objects.filter(statut=ElementModeration.Statut.EN_ATTENTE)
+            if type_element:
+                file = file.filter(type_element=type_element)
+            if connection.features.has_select_for_update_skip_locked:
+                file = file.select_for_update(skip_locked=True)
+            nouveaux = list(
+                file.order_by('-priorite', 'created_at').values_list('id', flat=True)[:nombre - len(ids)]
+            )
+            # Mise à jour conditionnelle : sans verrou de ligne (SQLite), seul le premier l'emporte
+            ElementModeration.objects.filter(
+                id__in=nouveaux, statut=ElementModeration.Statut.EN_ATTENTE
+            ).update(
+                statut=ElementModeration.Statut.EN_COURS, moderateur=moderateur, reserve_le=maintenant
+            )
+            ids += nouveaux
+
+        ElementModeration.objects.filter(
+            id__in=ids, statut=ElementModeration.Statut.EN_COURS, moderateur=moderateur
+        ).update(reserve_jusqu_a=fin_bail)
+
+    return list(
+        ElementModeration.objects.filter(
+            id__in=ids, statut=ElementModeration.Statut.EN_COURS, moderateur=moderateur
+        )
+        .select_related('document__utilisateur', 'bien__owner')
+        .order_by('-priorite', 'created_at')
+    )
+
+
+def liberer_element(element, moderateur):
+    """Rend un élément réservé à la file avant la fin du bail"""
+    return ElementModeration.objects.filter(
+        pk=element.pk, statut=ElementModeration.Statut.EN_COURS, moderateur=moderateur
+    ).update(
+        statut=ElementModeration.Statut.EN_ATTENTE, moderateur=None, reserve_le=None, reserve_jusqu_a=None
+    )
+
+
+def decider(element, moderateur, decision, commentaire=''):
+    """
+    Applique la décision à l'objet modéré et clôt l'élément.
+
+    Retourne False si le modérateur ne détient plus le bail (expiré ou repris).
+    """
+    maintenant = timezone.now()
+    with transaction.atomic():
+        clos = ElementModeration.objects.filter(
+            pk=element.pk,
+            statut=ElementModeration.Statut.EN_COURS,
+            moderateur=moderateur,
+            reserve_jusqu_a__gte=maintenant,
+        ).update(
+            statut=ElementModeration.Statut.TRAITE,
+            decision=decision,
+            traite_par=moderateur,
+            traite_le=maintenant,
+            reserve_jusqu_a=None,
+        )
+        if not clos:
+            return False
+
+        if element.type_element == ElementModeration.TypeElement.DOCUMENT:
+            from .models import DocumentUtilisateur
+
+            document = DocumentUtilisateur.objects.select_related('utilisateur').get(pk=element.document_id)
+            if document.est_demande_vendor:
+                # Même effet que l'admin : toute la demande, statut vendor et email
+                traiter_demande_vendor(document.utilisateur, decision, moderateur, commentaire)
+            else:
+                DocumentUtilisateur.objects.filter(pk=document.pk).update(
+                    statut_verification=decision,
+                    commentaire_moderateur=commentaire or None,
+                    moderateur=moderateur,
+                    date_verification=maintenant,
+                )
+        else:
+            from reservation.models import Bien
+
+            # Refusé, le bien reste (ou redevient) non publié et son propriétaire est prévenu
+            Bien.objects.filter(pk=element.bien_id).update(
+                est_verifie=decision == ElementModeration.Decision.APPROUVE
+            )
+            if decision == ElementModeration.Decision.REFUSE:
+                bien = Bien.objects.select_related('owner').get(pk=element.bien_id)
+                transaction.on_commit(lambda: _notifier_refus_bien(bien, commentaire))
+    return True
+
+
+# ==================== DEMANDES VENDOR ====================
+
+COMMENTAIRE_REFUS_VENDOR = "Demande refusée par l'administration"
+
+
+def _envoyer(sujet, message, user):
+    send_mail(
+        subject=sujet,
+        message=message,
+        from_email=settings.EMAIL_HOST_USER,
+        recipient_list=[user.email],
+        fail_silently=True,
+    )
+
+
+def _notifier_demande_vendor(user, decision):
+    nom = user.get_full_name() or user.username
+    if decision == ElementModeration.Decision.APPROUVE:
+        _envoyer(
+            '🎉 Demande vendor approuvée - BabiLoc',
+            f'Félicitations {nom} !\n\nVotre demande pour devenir propriétaire/hôte a été approuvée.\n\n'
+            f'Vous pouvez maintenant publier vos biens sur BabiLoc.\n\nL\'équipe BabiLoc',
+            user,
+        )
+    else:
+        _envoyer(
+            '❌ Demande vendor refusée - BabiLoc',
+            f'Bonjour {nom},\n\nNous regrettons de vous informer que votre demande pour devenir '
+            f'propriétaire/hôte a été refusée.\n\nRaison: Documents non conformes ou incomplets.\n\n'
+            f'Vous pouvez soumettre une nouvelle demande avec des documents mis à jour.\n\nL\'équipe BabiLoc',
+            user,
+        )
+
+
+def _notifier_refus_bien(bien, commentaire):
+    owner = bien.owner
+    raison = f"\n\nRaison: {commentaire}" if commentaire else ''
+    _envoyer(
+        '❌ Bien non publié - BabiLoc',
+        f'Bonjour {owner.get_full_name() or owner.username},\n\nVotre bien « {bien.nom} » n\'a pas été validé '
+        f'par notre équipe et n\'est pas publié.{raison}\n\nL\'équipe BabiLoc',
+        owner,
+    )
+
+
+def traiter_demande_vendor(user, decision, moderateur, commentaire=None):
+    """
+    Décision sur toute la demande vendor d'un utilisateur (chemin commun à la
+    file de modération, à l'admin et à vendor_action) : statut de ses documents
+    vendor, clôture de leurs éléments de file, statut vendor à l'approbation et
+    email de décision après le commit
+    """
+    from .models import DocumentUtilisateur
+
+    approuve = decision == ElementModeration.Decision.APPROUVE
+    valeurs = {'statut_verification': decision, 'moderateur': moderateur, 'date_verification': timezone.now()}
+    if commentaire or not approuve:
+        valeurs['commentaire_moderateur'] = commentaire or COMMENTAIRE_REFUS_VENDOR
+
+    with transaction.atomic():
+        documents = DocumentUtilisateur.objects.filter(utilisateur=user, est_demande_vendor=True)
+        ids = list(documents.values_list('id', flat=True))
+        documents.update(**valeurs)
+        cloturer_elements(documents=ids, decision=decision, moderateur=moderateur)
+        if approuve:
+            user.is_vendor = True
+            user.est_verifie = True
+            user.save()
+        transaction.on_commit(lambda: _notifier_demande_vendor(user, decision))
+
+
+def debit_moderateurs(depuis):
+    """Éléments traités par modérateur depuis ``depuis`` et durée moyenne de traitement"""
+    return list(
+        ElementModeration.objects.filter(traite_le__gte=depuis, traite_par__isnull=False)
+        .values('traite_par_id', 'traite_par__username')
+        .annotate(
+            traites=Count('id'),
+            approuves=Count('id', filter=Q(decision=ElementModeration.Decision.APPROUVE)),
+            refuses=Count('id', filter=Q(decision=ElementModeration.Decision.REFUSE)),
+            duree_moyenne=Avg(ExpressionWrapper(F('traite_le') - F('reserve_le'), output_field=DurationField())),
+        )
+        .order_by('-traites')
+    )
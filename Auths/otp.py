@@ -0,0 +1,133 @@
+"""
+Émission et vérification des codes OTP envoyés par email.
+
+Les codes sont stockés (empreinte seulement) dans la table CodeOTP, sans
+écriture sur la ligne utilisateur : durée de validité, nombre de tentatives
+et limites d'émission par utilisateur et par adresse IP.
+"""
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import CodeOTP
+
+DUREE_VALIDITE = timedelta(seconds=getattr(settings, 'OTP_DUREE_VALIDITE_SECONDES', 120))
+TENTATIVES_MAX = getattr(settings, 'OTP_TENTATIVES_MAX', 5)
+
+# (nombre d'émissions autorisées, fenêtre glissante)
+LIMITE_PAR_UTILISATEUR = (getattr(settings, 'OTP_LIMITE_PAR_UTILISATEUR', 5), timedelta(minutes=15))
+LIMITE_PAR_IP = (getattr(settings, 'OTP_LIMITE_PAR_IP', 20), timedelta(hours=1))
+
+
+class LimiteOTPAtteinte(Exception):
+    """Trop de codes demandés : ``reessayer_dans`` secondes avant le prochain envoi."""
+
+    def __init__(self, message, reessayer_dans):
+        super().__init__(message)
+        self.reessayer_dans = reessayer_dans
+
+
+def adresse_ip_client(request):
+    """
+    Adresse IP du client : dernier saut de X-Forwarded-For, ajouté par notre
+    proxy (les entrées précédentes viennent du client et ne sont pas fiables),
+    sinon REMOTE_ADDR
+    """
+    return (
+        request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[-1].strip()
+        or request.META.get('REMOTE_ADDR')
+        or None
+    )
+
+
+def _empreinte(user_id, usage, code):
+    return salted_hmac('Auths.otp', f"{user_id}:{usage}:{code}").hexdigest()
+
+
+def _verifier_limite(queryset, limite, message):
+    maximum, fenetre = limite
+    depuis = timezone.now() - fenetre
+    dates = list(
+        queryset.filter(created_at__gte=depuis)
+        .order_by('-created_at')
+        .values_list('created_at', flat=True)[:maximum]
+    )
+    if len(dates) >= maximum:
+        reessayer_dans = int((dates[-1] + fenetre - timezone.now()).total_seconds()) + 1
+        raise LimiteOTPAtteinte(message, max(reessayer_dans, 1))
+
+
+def verifier_limites(user=None, adresse_ip=None):
+    """Lève LimiteOTPAtteinte si l'utilisateur ou l'adresse IP a trop demandé de codes"""
+    if user is not None:
+        _verifier_limite(
+            CodeOTP.objects.filter(utilisateur=user), LIMITE_PAR_UTILISATEUR,
+            "Trop de codes demandés pour ce compte. Réessayez plus tard."
+        )
+    if adresse_ip:
+        _verifier_limite(
+            CodeOTP.objects.filter(adresse_ip=adresse_ip), LIMITE_PAR_IP,
+            "Trop de codes demandés depuis cette adresse. Réessayez plus tard."
+        )
+
+
+def emettre_otp(user, usage, adresse_ip=None, verifier=True):
+    """
+    Crée un nouveau code à 4 chiffres pour l'usage donné et le retourne en clair
+    (pour l'email). Les codes précédents du même usage sont invalidés.
+    ``verifier=False`` : limites déjà contrôlées par l'appelant (inscription,
+    avant la création du compte) ; le code compte quand même pour l'adresse IP.
+    """
+    if verifier:
+        verifier_limites(user, adresse_ip)
+
+    maintenant = timezone.now()
+    CodeOTP.objects.filter(
+        utilisateur=user, usage=usage, utilise=False, expire_le__gt=maintenant
+    ).update(expire_le=maintenant)
+
+    code = str(1000 + secrets.randbelow(9000))
+    CodeOTP.objects.create(
+        utilisateur=user,
+        usage=usage,
+        code_hash=_empreinte(user.pk, usage, code),
+        expire_le=maintenant + DUREE_VALIDITE,
+        adresse_ip=adresse_ip,
+    )
+    return code
+
+
+def verifier_otp(user, usage, code):
+    """
+    Consomme le code s'il est correct, non expiré et sous la limite de tentatives.
+    Chaque vérification compte une tentative, réservée avant la comparaison ; un
+    code ne peut être consommé qu'une fois.
+    """
+    otp = (
+        CodeOTP.objects.filter(
+            utilisateur=user, usage=usage, utilise=False, expire_le__gt=timezone.now()
+        )
+        .order_by('-created_at')
+        .only('id', 'code_hash', 'tentatives')
+        .first()
+    )
+    if otp is None:
+        return False
+
+    # Réservation atomique de la tentative : des essais simultanés ne dépassent pas la limite
+    if not CodeOTP.objects.filter(pk=otp.pk, tentatives__lt=TENTATIVES_MAX).update(
+        tentatives=F('tentatives') + 1
+    ):
+        return False
+
+    if not constant_time_compare(otp.code_hash, _empreinte(user.pk, usage, str(code).strip())):
+        return False
+
+    # Mise à jour conditionnelle : deux requêtes simultanées ne peuvent pas consommer le même code
+    return CodeOTP.objects.filter(
+        pk=otp.pk, utilise=False, tentatives__lte=TENTATIVES_MAX
+    ).update(utilise=True) == 1
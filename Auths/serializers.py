@@ -8,7 +8,7 @@ from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
 from django.core.exceptions import ValidationError
 from django.utils import timezone  # ✅ Add this import
-from .models import CustomUser, DocumentUtilisateur, HistoriqueParrainage, CodePromoParrainage, AccountDeletionLog
+from .models import CustomUser, DocumentUtilisateur, HistoriqueParrainage, CodePromoParrainage, AccountDeletionLog, ElementModeration
 from reservation.models import Bien  # ✅ Changé de BienSerializer vers le modèle
 from django.db.models import Sum, Count
 from decimal import Decimal
@@ -359,6 +359,9 @@ class FilleulSerializer(serializers.ModelSerializer):
     
     def get_revenus_generes(self, obj):
         """Calcule les revenus générés par ce filleul"""
+        # Annoté par les vues de liste (une seule requête pour tous les filleuls)
+        if hasattr(obj, 'revenus_generes_total'):
+            return obj.revenus_generes_total or 0
         from django.db.models import Sum
         return obj.historique_filleul.aggregate(
             total=Sum('montant_recompense')
@@ -518,4 +521,34 @@ class AccountDeletionLogSerializer(serializers.ModelSerializer):
             'reservations_count', 'favoris_count', 'avis_count', 'hard_delete',
             'deleted_at', 'performed_by', 'performed_by_username'
         ]
-        read_only_fields = fields
\ No newline at end of file
+        read_only_fields = fields
+
+
+class BienModerationSerializer(serializers.ModelSerializer):
+    """Résumé d'un bien à vérifier"""
+    owner_username = serializers.CharField(source='owner.username', read_only=True)
+
+    class Meta:
+        model = Bien
+        fields = ['id', 'nom', 'description', 'owner', 'owner_username', 'created_at']
+        read_only_fields = fields
+
+
+class ElementModerationSerializer(serializers.ModelSerializer):
+    """Élément réservé dans la file de modération"""
+    document = DocumentUtilisateurSerializer(read_only=True)
+    bien = BienModerationSerializer(read_only=True)
+
+    class Meta:
+        model = ElementModeration
+        fields = [
+            'id', 'type_element', 'priorite', 'statut', 'reserve_jusqu_a',
+            'created_at', 'document', 'bien'
+        ]
+        read_only_fields = fields
+
+
+class DecisionModerationSerializer(serializers.Serializer):
+    decision = serializers.ChoiceField(choices=ElementModeration.Decision.choices)
+    commentaire = serializers.CharField(required=False, allow_blank=True)
+
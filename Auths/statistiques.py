@@ -0,0 +1,105 @@
+"""
+Statistiques de parrainage d'un utilisateur, calculées en trois requêtes
+groupées et mises en cache.
+
+Le cache est invalidé à chaque écriture d'un HistoriqueParrainage ou d'un
+filleul du parrain (signaux dans Auths/models.py) ; la clé contient le mois
+courant pour que « ce mois » bascule d'elle-même.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+CACHE_TIMEOUT = 60 * 60
+NB_MOIS_EVOLUTION = 6
+
+
+def _cle(user_id, mois):
+    return f"parrainage:stats:{user_id}:{mois}"
+
+
+def _mois_precedents(reference, nombre):
+    """['2025-06', '2025-05', ...] en partant du mois de ``reference``"""
+    annee, mois = reference.year, reference.month
+    resultat = []
+    for _ in range(nombre):
+        resultat.append(f"{annee:04d}-{mois:02d}")
+        mois -= 1
+        if mois == 0:
+            annee, mois = annee - 1, 12
+    return resultat
+
+
+def _calculer(user):
+    from .models import CustomUser, HistoriqueParrainage
+
+    # Revenus par mois (toute la période : le total s'en déduit)
+    revenus_par_mois = {}
+    revenus_total = 0
+    for ligne in (
+        HistoriqueParrainage.objects.filter(parrain=user)
+        .annotate(mois=TruncMonth('date_action'))
+        .values('mois')
+        .annotate(total=Sum('montant_recompense'))
+        .order_by()
+    ):
+        total = ligne['total'] or 0
+        revenus_total += total
+        if ligne['mois']:
+            revenus_par_mois[ligne['mois'].strftime('%Y-%m')] = total
+
+    # Filleuls par mois de parrainage (totaux et actifs dans la même requête)
+    filleuls_par_mois = {}
+    filleuls_total = filleuls_actifs = 0
+    for ligne in (
+        CustomUser.objects.filter(parrain=user)
+        .annotate(mois=TruncMonth('date_parrainage'))
+        .values('mois')
+        .annotate(nombre=Count('id'), actifs=Count('id', filter=Q(parrainage_actif=True)))
+        .order_by()
+    ):
+        filleuls_total += ligne['nombre']
+        filleuls_actifs += ligne['actifs']
+        if ligne['mois']:
+            filleuls_par_mois[ligne['mois'].strftime('%Y-%m')] = ligne['nombre']
+
+    top_actions = list(
+        HistoriqueParrainage.objects.filter(parrain=user)
+        .values('type_action')
+        .annotate(count=Count('id'), total_revenus=Sum('montant_recompense'))
+        .order_by('-total_revenus')[:5]
+    )
+
+    mois = _mois_precedents(timezone.localtime(), NB_MOIS_EVOLUTION)
+    return {
+        'nombre_filleuls_total': filleuls_total,
+        'nombre_filleuls_actifs': filleuls_actifs,
+        'revenus_total': revenus_total,
+        'revenus_ce_mois': revenus_par_mois.get(mois[0], 0),
+        'filleuls_ce_mois': filleuls_par_mois.get(mois[0], 0),
+        'evolution_mensuelle': [
+            {
+                'mois': m,
+                'revenus': revenus_par_mois.get(m, 0),
+                'nouveaux_filleuls': filleuls_par_mois.get(m, 0),
+            }
+            for m in mois
+        ],
+        'top_actions': top_actions,
+    }
+
+
+def statistiques_parrainage(user):
+    """Statistiques de parrainage de ``user`` (cache, sinon trois requêtes groupées)"""
+    cle = _cle(user.pk, timezone.localtime().strftime('%Y-%m'))
+    stats = cache.get(cle)
+    if stats is None:
+        stats = _calculer(user)
+        cache.set(cle, stats, CACHE_TIMEOUT)
+    # Les points sont portés par l'utilisateur déjà chargé : jamais mis en cache
+    return {**stats, 'points_total': user.points_parrainage}
+
+
+def invalider_statistiques_parrainage(user_id):
+    cache.delete(_cle(user_id, timezone.localtime().strftime('%Y-%m')))
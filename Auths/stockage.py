@@ -0,0 +1,210 @@
+"""
+Stockage dédupliqué des documents (pièces d'identité, justificatifs, documents de biens).
+
+Chaque fichier est identifié par l'empreinte SHA-256 de son contenu, calculée
+pendant la réception de la requête (gestionnaires d'upload ci-dessous) ou, à
+défaut, en parcourant le fichier par morceaux. La table BlobFichier associe
+l'empreinte à la clé de stockage : un contenu déjà connu n'est jamais renvoyé
+au backend (Cloudinary), seule sa référence est comptée. ``delete`` retire
+une référence et ne supprime le fichier qu'à la dernière.
+
+Le backend est un alias de ``settings.STORAGES`` (``DOCUMENTS_STORAGE_BACKEND``) :
+``local_files`` permet de travailler hors ligne sur le système de fichiers.
+"""
+import hashlib
+import logging
+import os
+
+from django.core.files.base import File
+from django.core.files.storage import Storage, storages
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+PREFIXE_BLOBS = 'blobs'
+
+
+# ==================== EMPREINTE PENDANT LA RÉCEPTION ====================
+
+class _HachageMixin:
+    """Calcule le SHA-256 au fil des morceaux reçus et le pose sur le fichier obtenu"""
+
+    def new_file(self, *args, **kwargs):
+        # Avant super() : le gestionnaire mémoire interrompt la chaîne via StopFutureHandlers
+        self._sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        fichier = super().file_complete(file_size)
+        if fichier is not None:
+            fichier.sha256 = self._sha256.hexdigest()
+        return fichier
+
+
+class MemoryHachageUploadHandler(_HachageMixin, MemoryFileUploadHandler):
+    pass
+
+
+class TemporaryHachageUploadHandler(_HachageMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def empreinte_fichier(content):
+    """(sha256, taille) du fichier, sans le charger entièrement en mémoire"""
+    empreinte = getattr(content, 'sha256', None)
+    if empreinte and getattr(content, 'size', None) is not None:
+        return empreinte, content.size
+
+    sha256 = hashlib.sha256()
+    taille = 0
+    for morceau in content.chunks():
+        sha256.update(morceau)
+        taille += len(morceau)
+    return sha256.hexdigest(), taille
+
+
+# ==================== STOCKAGE ====================
+
+class StockageDeduplique(Storage):
+    """Storage adressé par contenu, délégant la lecture et l'écriture à un backend configuré"""
+
+    def __init__(self, backend='default'):
+        self.alias_backend = backend
+
+    @cached_property
+    def backend(self):
+        return storages[self.alias_backend]
+
+    def _cle(self, empreinte, name):
+        extension = os.path.splitext(name)[1].lower()[:10]
+        return f"{PREFIXE_BLOBS}/{empreinte[:2]}/{empreinte}{extension}"
+
+    def _referencer(self, empreinte):
+        """Ajoute une référence au blob existant ; retourne sa clé, ou None s'il est inconnu"""
+        from .models import BlobFichier
+
+        if not BlobFichier.objects.filter(sha256=empreinte).update(nb_references=F('nb_references') + 1):
+            return None
+        return BlobFichier.objects.filter(sha256=empreinte).values_list('cle_stockage', flat=True).get()
+
+    def save(self, name, content, max_length=None):
+        from .models import BlobFichier
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        empreinte, taille = empreinte_fichier(content)
+        cle = self._referencer(empreinte)
+        if cle is not None:
+            return cle
+
+        # Contenu inconnu : un seul envoi vers le backend, sous une clé déterministe
+        if content.seekable():
+            content.seek(0)
+        cle = self.backend.save(self._cle(empreinte, name), content, max_length=max_length)
+        try:
+            with transaction.atomic():
+                BlobFichier.objects.create(sha256=empreinte, cle_stockage=cle, taille=taille, nb_references=1)
+        except IntegrityError:
+            # Envoi concurrent du même contenu : on garde le blob enregistré en premier
+            existante = self._referencer(empreinte)
+            if existante is None:
+                raise
+            if existante != cle:
+                self.backend.delete(cle)
+            return existante
+        return cle
+
+    def delete(self, name):
+        """Retire une référence ; le fichier n'est supprimé du backend qu'à la dernière"""
+        from .models import BlobFichier
+
+        if not name:
+            return
+        with transaction.atomic():
+            blob = BlobFichier.objects.select_for_update().filter(cle_stockage=name).first()
+            if blob is None:
+                # Fichier antérieur à la déduplication : jamais supprimé automatiquement
+                return
+            if blob.nb_references > 1:
+                BlobFichier.objects.filter(pk=blob.pk).update(nb_references=F('nb_references') - 1)
+                return
+            blob.delete()
+        transaction.on_commit(lambda: self._supprimer_du_backend(name))
+
+    def _supprimer_du_backend(self, name):
+        try:
+            self.backend.delete(name)
+        except Exception as e:
+            logger.warning("Suppression du blob %s impossible : %s", name, e)
+
+    # Le reste est délégué au backend (les anciens chemins y restent lisibles)
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+def stockage_documents():
+    """Storage des champs de documents (callable : rien n'est figé dans les migrations)"""
+    return storages['documents']
+
+
+# ==================== RÉFÉRENCES DES INSTANCES ====================
+
+def memoriser_fichiers(instance, champs, update_fields=None):
+    """
+    pre_save : retient les fichiers en base qui perdront leur référence,
+    c'est-à-dire effacés, remplacés ou renvoyés (même contenu : une nouvelle
+    référence est prise à l'envoi, l'ancienne doit être rendue)
+    """
+    if update_fields is not None:
+        champs = [champ for champ in champs if champ in update_fields]
+    instance._fichiers_a_liberer = []
+    if instance.pk is None or not champs:
+        return
+    precedents = type(instance)._default_manager.filter(pk=instance.pk).values(*champs).first() or {}
+    for champ, ancien in precedents.items():
+        fichier = getattr(instance, champ)
+        if ancien and (fichier.name != ancien or not fichier._committed):
+            instance._fichiers_a_liberer.append((champ, ancien))
+
+
+def liberer_fichiers_remplaces(instance):
+    """post_save : retire une référence aux fichiers retenus par ``memoriser_fichiers``"""
+    for champ, ancien in getattr(instance, '_fichiers_a_liberer', []):
+        instance._meta.get_field(champ).storage.delete(ancien)
+    instance._fichiers_a_liberer = []
+
+
+def liberer_fichiers(instance, champs):
+    """post_delete : retire une référence à chaque fichier de l'instance supprimée"""
+    for champ in champs:
+        nom = getattr(instance, champ).name
+        if nom:
+            instance._meta.get_field(champ).storage.delete(nom)
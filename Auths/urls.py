@@ -11,7 +11,7 @@ from .views import (
     DocumentModerationView,
     DebugUserStatusView,
     GetUserByIdView,
-    MonParrainageView, MesFilleulsView, HistoriqueParrainageView,
+    MonParrainageView, MesFilleulsView, HistoriqueParrainageView, ArbreParrainageView,
     generer_code_promo, statistiques_parrainage, verifier_code_parrainage,
     demander_retrait, valider_code_promo,
     DevenirVendorView,
@@ -22,6 +22,8 @@ from .views import (
     AccountDeletionLogDetailView,
     DeleteAccountRequestOTPView, DeleteAccountConfirmOTPView,  # <- add
     documents_has_types, document_get_by_type,
+    FileModerationReserverView, ElementModerationDecisionView, ElementModerationLibererView,
+    DebitModerationView,
 )
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -42,6 +44,7 @@ urlpatterns = [
     path('parrainage/mon-parrainage/', MonParrainageView.as_view(), name='mon-parrainage'),
     path('parrainage/mes-filleuls/', MesFilleulsView.as_view(), name='mes-filleuls'),
     path('parrainage/historique/', HistoriqueParrainageView.as_view(), name='historique-parrainage'),
+    path('parrainage/arbre/', ArbreParrainageView.as_view(), name='arbre-parrainage'),
     path('parrainage/statistiques/', statistiques_parrainage, name='statistiques-parrainage'),
     
     # Codes de parrainage
@@ -67,6 +70,10 @@ urlpatterns = [
     # Modération
     path('admin/documents/moderation/', DocumentsModerationView.as_view(), name='documents-moderation'),
     path('admin/documents/<int:pk>/moderer/', DocumentModerationView.as_view(), name='document-moderer'),
+    path('admin/moderation/reserver/', FileModerationReserverView.as_view(), name='moderation-reserver'),
+    path('admin/moderation/<int:pk>/decider/', ElementModerationDecisionView.as_view(), name='moderation-decider'),
+    path('admin/moderation/<int:pk>/liberer/', ElementModerationLibererView.as_view(), name='moderation-liberer'),
+    path('admin/moderation/debit/', DebitModerationView.as_view(), name='moderation-debit'),
 
     # Debug
     path('debug-user-status/', DebugUserStatusView.as_view(), name='debug-user-status'),  # Temporaire
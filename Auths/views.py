@@ -1,4 +1,9 @@
-from .models import CustomUser, DocumentUtilisateur,HistoriqueParrainage,CodePromoParrainage, AccountDeletionLog
+from .models import CustomUser, DocumentUtilisateur,HistoriqueParrainage,CodePromoParrainage, AccountDeletionLog, CodeOTP, SoldeParrainage, RetraitParrainage, ElementModeration
+from . import moderation
+from .codes import inserer_avec_code
+from .statistiques import statistiques_parrainage as calculer_statistiques_parrainage
+from .arbre_parrainage import PROFONDEUR_MAX as PROFONDEUR_MAX_ARBRE, membres_arbre, resume_arbre
+from .otp import LimiteOTPAtteinte, adresse_ip_client, emettre_otp, verifier_limites, verifier_otp
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
 from django.contrib.auth.tokens import default_token_generator
@@ -32,6 +37,8 @@ from .serializers import (
     CodePromotionParrainageSerializer,
     ParrainageSerializer,
     AccountDeletionLogSerializer,  # <- add
+    ElementModerationSerializer,
+    DecisionModerationSerializer,
 )
 # Add missing imports
 from rest_framework.decorators import api_view, permission_classes
@@ -39,13 +46,13 @@ from rest_framework.permissions import IsAuthenticated
 from django.http import HttpResponse
 from django.template import TemplateDoesNotExist
 from django.utils import timezone
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Max, Q
 from datetime import timedelta
-import random
-import string
 from django.db import models  # <- add (utilisé dans AccountDeletionLogListView)
 from django.urls import reverse  # utile si besoin plus tard
 from django.db import transaction
+from django.shortcuts import get_object_or_404
+from decimal import Decimal, InvalidOperation
 
 User = get_user_model()
 
@@ -205,7 +212,10 @@ class ForgotPasswordView(APIView):
             return Response({'error': "Aucun utilisateur avec cet email"}, status=status.HTTP_404_NOT_FOUND)
 
         # Générer OTP au lieu du lien
-        otp_code = user.generate_otp()
+        try:
+            otp_code = emettre_otp(user, CodeOTP.Usage.REINITIALISATION, adresse_ip_client(request))
+        except LimiteOTPAtteinte as e:
+            return Response({'error': str(e), 'retry_after': e.reessayer_dans}, status=status.HTTP_429_TOO_MANY_REQUESTS)
 
         # Email avec OTP
         subject = "Code de vérification pour réinitialiser le mot de passe"
@@ -219,11 +229,11 @@ class ForgotPasswordView(APIView):
                 <html><body>
                   <p>Bonjour {user.username},</p>
                   <p>Votre code de vérification est : <strong>{otp_code}</strong></p>
-                  <p>Ce code expire dans 5 minutes.</p>
+                  <p>Ce code expire dans 2 minutes.</p>
                   <p>L'équipe BabiLoc</p>
                 </body></html>
             """
-        plain_message = f"Bonjour {user.username},\n\nVotre code de vérification est : {otp_code}\n\nCe code expire dans 5 minutes."
+        plain_message = f"Bonjour {user.username},\n\nVotre code de vérification est : {otp_code}\n\nCe code expire dans 2 minutes."
 
         email_message = EmailMultiAlternatives(
             subject=subject,
@@ -268,9 +278,12 @@ class ResetPasswordConfirmView(APIView):
         except User.DoesNotExist:
             return Response({'error': 'Utilisateur non trouvé'}, status=404)
 
-        if user.verify_otp(otp_code):
+        if verifier_otp(user, CodeOTP.Usage.REINITIALISATION, otp_code):
+            # Le code reçu par email vaut aussi vérification du compte
             user.set_password(new_password)
-            user.save()
+            user.is_active = True
+            user.otp_verified = True
+            user.save(update_fields=['password', 'is_active', 'otp_verified'])
             return Response({'message': 'Mot de passe réinitialisé avec succès'})
         else:
             return Response({'error': 'Code OTP invalide ou expiré'}, status=400)
@@ -359,12 +372,19 @@ class RegisterView(APIView):
         tags=['Authentification']
     )
     def post(self, request):
+        adresse_ip = adresse_ip_client(request)
+        try:
+            verifier_limites(adresse_ip=adresse_ip)
+        except LimiteOTPAtteinte as e:
+            return Response({'error': str(e), 'retry_after': e.reessayer_dans}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
             
-            # Générer le code OTP
-            otp_code = user.generate_otp()
+            # Générer le code OTP (limite par IP déjà vérifiée avant la création du compte :
+            # un second contrôle ici laisserait un compte créé sans code ni réponse)
+            otp_code = emettre_otp(user, CodeOTP.Usage.ACTIVATION, adresse_ip=adresse_ip, verifier=False)
 
             try:
                 # Sujet du mail
@@ -381,7 +401,7 @@ class RegisterView(APIView):
                     f"Bonjour {user.username},\n\n"
                     f"Merci de vous être inscrit sur Babiloc.\n"
                     f"Votre code d'activation est : {otp_code}\n\n"
-                    f"Ce code expire dans 5 minutes.\n\n"
+                    f"Ce code expire dans 2 minutes.\n\n"
                     f"L'équipe Babiloc."
                 )
 
@@ -468,7 +488,11 @@ class VerifyOTPView(APIView):
         except CustomUser.DoesNotExist:
             return Response({'error': 'Utilisateur non trouvé'}, status=404)
 
-        if user.verify_otp(otp_code):
+        if verifier_otp(user, CodeOTP.Usage.ACTIVATION, otp_code):
+            user.is_active = True
+            user.otp_verified = True
+            user.save(update_fields=['is_active', 'otp_verified'])
+
             # Générer les tokens JWT
             refresh = RefreshToken.for_user(user)
             
@@ -517,11 +541,14 @@ class ResendOTPView(APIView):
             return Response({'error': 'Compte déjà activé'}, status=400)
 
         # Générer un nouveau code OTP
-        otp_code = user.generate_otp()
+        try:
+            otp_code = emettre_otp(user, CodeOTP.Usage.ACTIVATION, adresse_ip_client(request))
+        except LimiteOTPAtteinte as e:
+            return Response({'error': str(e), 'retry_after': e.reessayer_dans}, status=status.HTTP_429_TOO_MANY_REQUESTS)
 
         # Renvoyer l'email
         subject = "Nouveau code d'activation"
-        plain_message = f"Bonjour {user.username},\n\nVotre nouveau code d'activation est : {otp_code}\n\nCe code expire dans 5 minutes."
+        plain_message = f"Bonjour {user.username},\n\nVotre nouveau code d'activation est : {otp_code}\n\nCe code expire dans 2 minutes."
 
         email_message = EmailMultiAlternatives(
             subject=subject,
@@ -742,6 +769,135 @@ class DocumentModerationView(generics.UpdateAPIView):
     def put(self, request, *args, **kwargs):
         return super().put(request, *args, **kwargs)
 
+class FileModerationReserverView(APIView):
+    """
+    Réserve les prochains éléments de la file de modération pour le modérateur connecté
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description=(
+            "Réserver les N prochains éléments (priorité puis ancienneté). Chaque élément est "
+            "réservé pour une durée limitée ; passé ce délai, il retourne dans la file."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'nombre': openapi.Schema(type=openapi.TYPE_INTEGER, description=f"1 à {moderation.RESERVATION_MAX} (défaut 10)"),
+                'type_element': openapi.Schema(type=openapi.TYPE_STRING, enum=['document', 'bien']),
+            }
+        ),
+        responses={
+            200: ElementModerationSerializer(many=True),
+            400: "Données invalides",
+            403: "Permission refusée"
+        },
+        tags=['Modération']
+    )
+    def post(self, request):
+        type_element = request.data.get('type_element')
+        if type_element and type_element not in ElementModeration.TypeElement.values:
+            return Response({'error': "type_element doit être 'document' ou 'bien'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            nombre = int(request.data.get('nombre', 10))
+        except (TypeError, ValueError):
+            return Response({'error': 'Nombre invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        elements = moderation.reserver_elements(request.user, nombre, type_element)
+        return Response(ElementModerationSerializer(elements, many=True, context={'request': request}).data)
+
+
+class ElementModerationDecisionView(APIView):
+    """
+    Approuver ou refuser un élément réservé
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Appliquer une décision à un élément réservé (le bail doit être encore valide)",
+        request_body=DecisionModerationSerializer,
+        responses={
+            200: "Décision enregistrée",
+            400: "Données invalides",
+            404: "Élément non trouvé",
+            409: "Élément non réservé par ce modérateur ou bail expiré"
+        },
+        tags=['Modération']
+    )
+    def post(self, request, pk):
+        serializer = DecisionModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        element = get_object_or_404(ElementModeration, pk=pk)
+        if not moderation.decider(
+            element, request.user,
+            serializer.validated_data['decision'],
+            serializer.validated_data.get('commentaire', '')
+        ):
+            return Response(
+                {'error': "Cet élément ne vous est plus réservé (bail expiré ou déjà traité)"},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'message': 'Décision enregistrée', 'id': element.pk})
+
+
+class ElementModerationLibererView(APIView):
+    """
+    Rendre un élément réservé à la file
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Rendre un élément réservé à la file sans décision",
+        responses={200: "Élément libéré", 404: "Élément non trouvé", 409: "Élément non réservé par ce modérateur"},
+        tags=['Modération']
+    )
+    def post(self, request, pk):
+        element = get_object_or_404(ElementModeration, pk=pk)
+        if not moderation.liberer_element(element, request.user):
+            return Response({'error': "Cet élément ne vous est pas réservé"}, status=status.HTTP_409_CONFLICT)
+        return Response({'message': 'Élément rendu à la file', 'id': element.pk})
+
+
+class DebitModerationView(APIView):
+    """
+    Débit des modérateurs et état de la file
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Éléments traités par modérateur (24 h et 7 jours) et taille de la file",
+        tags=['Modération']
+    )
+    def get(self, request):
+        maintenant = timezone.now()
+        file = ElementModeration.objects.aggregate(
+            en_attente=Count('id', filter=Q(statut=ElementModeration.Statut.EN_ATTENTE)),
+            en_cours=Count('id', filter=Q(statut=ElementModeration.Statut.EN_COURS)),
+        )
+        
+        def serialiser(lignes):
+            return [
+                {
+                    'moderateur_id': ligne['traite_par_id'],
+                    'moderateur': ligne['traite_par__username'],
+                    'traites': ligne['traites'],
+                    'approuves': ligne['approuves'],
+                    'refuses': ligne['refuses'],
+                    'duree_moyenne_secondes': (
+                        round(ligne['duree_moyenne'].total_seconds()) if ligne['duree_moyenne'] else None
+                    ),
+                }
+                for ligne in lignes
+            ]
+        
+        return Response({
+            'file': file,
+            'dernieres_24h': serialiser(moderation.debit_moderateurs(maintenant - timedelta(hours=24))),
+            'derniers_7_jours': serialiser(moderation.debit_moderateurs(maintenant - timedelta(days=7))),
+        })
+
+
 # Garder pour compatibilité mais déprécié
 class ActivateAccountView(APIView):
     def get(self, request, uidb64, token):
@@ -774,8 +930,8 @@ class DebugUserStatusView(APIView):
                         'email': openapi.Schema(type=openapi.TYPE_STRING),
                         'is_active': openapi.Schema(type=openapi.TYPE_BOOLEAN),
                         'otp_verified': openapi.Schema(type=openapi.TYPE_BOOLEAN),
-                        'otp_code': openapi.Schema(type=openapi.TYPE_STRING),
-                        'otp_created_at': openapi.Schema(type=openapi.TYPE_STRING),
+                        'otp_actif': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'otp_expire_le': openapi.Schema(type=openapi.TYPE_STRING),
                     }
                 )
             ),
@@ -789,14 +945,18 @@ class DebugUserStatusView(APIView):
         if email:
             try:
                 user = CustomUser.objects.get(email=email)
+                # Le code lui-même n'est jamais exposé (seule son empreinte est stockée)
+                otp_actif = user.codes_otp.filter(
+                    utilise=False, expire_le__gt=timezone.now()
+                ).order_by('-created_at').values_list('expire_le', flat=True).first()
                 return Response({
                     'id': user.id,
                     'username': user.username,
                     'email': user.email,
                     'is_active': user.is_active,
                     'otp_verified': user.otp_verified,
-                    'otp_code': user.otp_code,
-                    'otp_created_at': str(user.otp_created_at) if user.otp_created_at else None,
+                    'otp_actif': otp_actif is not None,
+                    'otp_expire_le': str(otp_actif) if otp_actif else None,
                 })
             except CustomUser.DoesNotExist:
                 return Response({'error': 'Utilisateur non trouvé'}, status=404)
@@ -810,7 +970,7 @@ class ParrainageStatsView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        return calculer_statistiques_parrainage(self.request.user)
 
 
 class FilleulsListView(generics.ListAPIView):
@@ -819,7 +979,7 @@ class FilleulsListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return self.request.user.filleuls.all()
+        return self.request.user.filleuls.all().annotate(revenus_generes_total=Sum('historique_filleul__montant_recompense'))
 
 
 class HistoriqueParrainageView(generics.ListAPIView):
@@ -898,22 +1058,19 @@ class GenerationCodePromoView(APIView):
         
         serializer = GenerationCodePromoSerializer(data=request.data)
         if serializer.is_valid():
-            # Générer un code unique
-            while True:
-                code = 'PROMO' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-                if not CodePromoParrainage.objects.filter(code=code).exists():
-                    break
-            
             # Calculer la date d'expiration
             date_expiration = timezone.now() + timedelta(days=serializer.validated_data['duree_jours'])
             
-            # Créer le code promo
-            code_promo = CodePromoParrainage.objects.create(
-                code=code,
-                utilisateur=request.user,
-                reduction_percent=serializer.validated_data['reduction_percent'],
-                montant_min=serializer.validated_data['montant_min'],
-                date_expiration=date_expiration
+            # Créer le code promo (code unique garanti par l'index, nouvel essai en cas de collision)
+            code_promo = inserer_avec_code(
+                lambda code: CodePromoParrainage.objects.create(
+                    code=code,
+                    utilisateur=request.user,
+                    reduction_percent=serializer.validated_data['reduction_percent'],
+                    montant_min=serializer.validated_data['montant_min'],
+                    date_expiration=date_expiration
+                ),
+                'code', prefixe='PROMO'
             )
             
             return Response(
@@ -1019,12 +1176,18 @@ def parrainage_dashboard(request):
         'recompenses_totales': user.get_recompenses_parrainage(),
     }
     
+    # Statistiques détaillées (même calcul mis en cache que /parrainage/statistiques/)
+    statistiques = calculer_statistiques_parrainage(user)
+    
     # Filleuls
-    filleuls = FilleulSerializer(user.filleuls.all(), many=True).data
+    filleuls = FilleulSerializer(
+        user.filleuls.annotate(revenus_generes_total=Sum('historique_filleul__montant_recompense')),
+        many=True
+    ).data
     
     # Historique récent
     historique = HistoriqueParrainageSerializer(
-        user.historique_parrainage.all()[:10], 
+        user.historiques_parrainage.all()[:10], 
         many=True
     ).data
     
@@ -1039,6 +1202,7 @@ def parrainage_dashboard(request):
     
     return Response({
         'stats': stats,
+        'statistiques': statistiques,
         'filleuls': filleuls,
         'historique': historique,
         'codes_promo_actifs': codes_promo
@@ -1082,7 +1246,64 @@ class MesFilleulsView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
     
     def get_queryset(self):
-        return self.request.user.filleuls.all().order_by('-date_parrainage')
+        return self.request.user.filleuls.annotate(revenus_generes_total=Sum('historique_filleul__montant_recompense')).order_by('-date_parrainage')
+
+
+class ArbreParrainageView(APIView):
+    """Arbre de parrainage sur plusieurs niveaux (filleuls des filleuls)"""
+    
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @swagger_auto_schema(
+        operation_description=(
+            "Résumé par niveau de l'arbre de parrainage (membres, actifs, récompenses générées). "
+            "Avec `niveau`, retourne aussi une page des membres de ce niveau."
+        ),
+        manual_parameters=[
+            openapi.Parameter('profondeur', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"Nombre de niveaux (1 à {PROFONDEUR_MAX_ARBRE}, défaut 3)"),
+            openapi.Parameter('niveau', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Lister les membres de ce niveau"),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('user_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Racine de l'arbre (administrateurs uniquement)"),
+        ],
+        responses={
+            200: "Résumé de l'arbre",
+            400: "Paramètres invalides",
+            401: "Non authentifié"
+        },
+        tags=['Parrainage']
+    )
+    def get(self, request):
+        try:
+            profondeur = int(request.query_params.get('profondeur', 3))
+            niveau = int(request.query_params['niveau']) if request.query_params.get('niveau') else None
+            page = max(int(request.query_params.get('page', 1)), 1)
+            racine_id = int(request.query_params.get('user_id') or request.user.id)
+        except ValueError:
+            return Response({'error': 'Paramètres invalides'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not 1 <= profondeur <= PROFONDEUR_MAX_ARBRE:
+            return Response(
+                {'error': f'La profondeur doit être comprise entre 1 et {PROFONDEUR_MAX_ARBRE}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if racine_id != request.user.id and not request.user.is_staff:
+            return Response({'error': 'Accès refusé'}, status=status.HTTP_403_FORBIDDEN)
+        
+        data = resume_arbre(racine_id, profondeur)
+        if niveau is not None:
+            if not 1 <= niveau <= profondeur:
+                return Response({'error': 'Niveau hors de la profondeur demandée'}, status=status.HTTP_400_BAD_REQUEST)
+            taille = settings.REST_FRAMEWORK['PAGE_SIZE']
+            data = {
+                **data,
+                'niveau': niveau,
+                'page': page,
+                'membres': membres_arbre(racine_id, profondeur, niveau, limite=taille, decalage=(page - 1) * taille),
+            }
+        return Response(data)
 
 
 class HistoriqueParrainageView(generics.ListAPIView):
@@ -1163,16 +1384,15 @@ def generer_code_promo(request):
             'error': 'Vous devez avoir au moins 100 points de parrainage'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Générer le code
-    import string
-    code = f"PARRAIN{user.id}{random.randint(100, 999)}"
-    
-    # Créer le code promo
-    code_promo = CodePromoParrainage.objects.create(
-        code=code,
-        parrain=user,
-        pourcentage_reduction=pourcentage,
-        date_expiration=timezone.now() + timedelta(days=duree_jours)
+    # Créer le code promo (code unique garanti par l'index, nouvel essai en cas de collision)
+    code_promo = inserer_avec_code(
+        lambda code: CodePromoParrainage.objects.create(
+            code=code,
+            parrain=user,
+            pourcentage_reduction=pourcentage,
+            date_expiration=timezone.now() + timedelta(days=duree_jours)
+        ),
+        'code', prefixe='PARRAIN'
     )
     
     # Déduire les points
@@ -1195,71 +1415,7 @@ def generer_code_promo(request):
 )
 def statistiques_parrainage(request):
     """Statistiques détaillées de parrainage"""
-    
-    user = request.user
-    
-    # Statistiques de base
-    filleuls_total = user.filleuls.count()
-    filleuls_actifs = user.filleuls.filter(parrainage_actif=True).count()
-    
-    # Revenus
-    revenus_total = user.historiques_parrainage.aggregate(
-        total=Sum('montant_recompense')
-    )['total'] or 0
-    
-    points_total = user.points_parrainage
-    
-    # Ce mois
-    debut_mois = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    revenus_ce_mois = user.historiques_parrainage.filter(
-        date_action__gte=debut_mois
-    ).aggregate(total=Sum('montant_recompense'))['total'] or 0
-    
-    filleuls_ce_mois = user.filleuls.filter(
-        date_parrainage__gte=debut_mois
-    ).count()
-    
-    # Évolution mensuelle (6 derniers mois)
-    evolution_mensuelle = []
-    for i in range(6):
-        date_debut = (timezone.now() - timedelta(days=30*i)).replace(day=1)
-        date_fin = (date_debut + timedelta(days=32)).replace(day=1)
-        
-        revenus_mois = user.historiques_parrainage.filter(
-            date_action__gte=date_debut,
-            date_action__lt=date_fin
-        ).aggregate(total=Sum('montant_recompense'))['total'] or 0
-        
-        filleuls_mois = user.filleuls.filter(
-            date_parrainage__gte=date_debut,
-            date_parrainage__lt=date_fin
-        ).count()
-        
-        evolution_mensuelle.append({
-            'mois': date_debut.strftime('%Y-%m'),
-            'revenus': revenus_mois,
-            'nouveaux_filleuls': filleuls_mois
-        })
-    
-    # Top actions
-    top_actions = user.historiques_parrainage.values('type_action').annotate(
-        count=Count('id'),
-        total_revenus=Sum('montant_recompense')
-    ).order_by('-total_revenus')[:5]
-    
-    data = {
-        'nombre_filleuls_total': filleuls_total,
-        'nombre_filleuls_actifs': filleuls_actifs,
-        'revenus_total': revenus_total,
-        'points_total': points_total,
-        'revenus_ce_mois': revenus_ce_mois,
-        'filleuls_ce_mois': filleuls_ce_mois,
-        'evolution_mensuelle': evolution_mensuelle,
-        'top_actions': list(top_actions)
-    }
-    
-    return Response(data)
+    return Response(calculer_statistiques_parrainage(request.user))
 
 
 @api_view(['POST'])
@@ -1336,33 +1492,41 @@ def demander_retrait(request):
     """Demander le retrait des gains de parrainage"""
     
     user = request.user
-    montant = request.data.get('montant')
     mode_paiement = request.data.get('mode_paiement', 'mobile_money')
     
-    if not montant or montant <= 0:
+    try:
+        montant = Decimal(str(request.data.get('montant')))
+    except (InvalidOperation, ValueError):
+        montant = None
+    if not montant or not montant.is_finite() or montant <= 0:
         return Response({
             'error': 'Montant invalide'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Vérifier le solde disponible
-    solde_disponible = user.get_revenus_parrainage()
-    if montant > solde_disponible:
-        return Response({
-            'error': f'Solde insuffisant. Disponible: {solde_disponible} FCFA'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Créer la demande de retrait (vous devrez implémenter le modèle)
-    # DemandeRetrait.objects.create(
-    #     user=user,
-    #     montant=montant,
-    #     mode_paiement=mode_paiement,
-    #     statut='en_attente'
-    # )
+    with transaction.atomic():
+        # Verrouiller le solde : deux demandes simultanées ne peuvent pas retirer le même montant
+        SoldeParrainage.objects.get_or_create(utilisateur=user)
+        solde = SoldeParrainage.objects.select_for_update().get(utilisateur=user)
+        
+        solde_disponible = solde.solde_disponible
+        if montant > solde_disponible:
+            return Response({
+                'error': f'Solde insuffisant. Disponible: {solde_disponible} FCFA'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Le signal du registre ajoute le montant à montant_retire (même transaction)
+        retrait = RetraitParrainage.objects.create(
+            utilisateur=user,
+            montant=montant,
+            mode_paiement=mode_paiement
+        )
     
     return Response({
         'message': 'Demande de retrait enregistrée',
+        'retrait_id': retrait.id,
         'montant': montant,
-        'mode_paiement': mode_paiement
+        'mode_paiement': mode_paiement,
+        'solde_disponible': solde_disponible - montant
     })
 
 
@@ -1529,6 +1693,7 @@ class DevenirVendorView(APIView):
                 nom=f"Pièce d'identité - Demande vendor",
                 type_document='carte_identite',
                 fichier=piece_identite,
+                est_demande_vendor=True,
                 structure_type=structure_type,
                 agence_nom=request.data.get('agence_nom', ''),
                 agence_adresse=request.data.get('agence_adresse', ''),
@@ -1594,32 +1759,27 @@ from django.shortcuts import render, redirect
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_exempt
 import json
 
 @staff_member_required
 def vendor_admin_dashboard(request):
     """Dashboard admin pour gérer les demandes vendor"""
-    # Statistiques des demandes vendor
-    demandes_en_attente = DocumentUtilisateur.objects.filter(
-        nom__icontains='Demande vendor',
-        statut_verification='en_attente'
-    ).count()
-    
-    demandes_approuvees = DocumentUtilisateur.objects.filter(
-        nom__icontains='Demande vendor',
-        statut_verification='approuve'
-    ).count()
-    
-    demandes_refusees = DocumentUtilisateur.objects.filter(
-        nom__icontains='Demande vendor',
-        statut_verification='refuse'
-    ).count()
+    demandes_vendor = DocumentUtilisateur.objects.filter(est_demande_vendor=True)
+    
+    # Statistiques des demandes vendor (un seul agrégat conditionnel)
+    compteurs = demandes_vendor.aggregate(
+        en_attente=Count('id', filter=Q(statut_verification='en_attente')),
+        approuvees=Count('id', filter=Q(statut_verification='approuve')),
+        refusees=Count('id', filter=Q(statut_verification='refuse')),
+    )
+    demandes_en_attente = compteurs['en_attente']
+    demandes_approuvees = compteurs['approuvees']
+    demandes_refusees = compteurs['refusees']
     
     # Dernières demandes
-    dernieres_demandes = DocumentUtilisateur.objects.filter(
-        nom__icontains='Demande vendor'
-    ).select_related('utilisateur').order_by('-date_upload')[:10]
+    dernieres_demandes = demandes_vendor.select_related('utilisateur').order_by('-date_upload')[:10]
     
     context = {
         'demandes_en_attente': demandes_en_attente,
@@ -1638,9 +1798,7 @@ def vendor_requests_list(request):
     structure_filter = request.GET.get('structure', 'all')
     
     # Base queryset
-    queryset = DocumentUtilisateur.objects.filter(
-        nom__icontains='Demande vendor'
-    ).select_related('utilisateur', 'moderateur')
+    queryset = DocumentUtilisateur.objects.filter(est_demande_vendor=True)
     
     # Filtres
     if status_filter != 'all':
@@ -1649,25 +1807,29 @@ def vendor_requests_list(request):
     if structure_filter != 'all':
         queryset = queryset.filter(structure_type=structure_filter)
     
-    # Regrouper par utilisateur pour éviter les doublons
-    demandes = {}
-    for doc in queryset.order_by('-date_upload'):
-        user_id = doc.utilisateur.id
-        if user_id not in demandes:
-            # Compter tous les documents de cette demande
-            docs_count = DocumentUtilisateur.objects.filter(
-                utilisateur=doc.utilisateur,
-                nom__icontains='Demande vendor'
-            ).count()
-            
-            demandes[user_id] = {
-                'document': doc,
-                'documents_count': docs_count,
-                'user': doc.utilisateur,
-            }
+    # Une ligne par utilisateur : dernière demande et nombre de documents en un seul GROUP BY
+    par_utilisateur = (
+        queryset.values('utilisateur_id')
+        .annotate(dernier_id=Max('id'), derniere_date=Max('date_upload'), documents_count=Count('id'))
+        .order_by('-derniere_date', '-utilisateur_id')
+    )
+    page_obj = Paginator(par_utilisateur, 25).get_page(request.GET.get('page'))
+    
+    documents = DocumentUtilisateur.objects.select_related('utilisateur', 'moderateur').in_bulk(
+        [ligne['dernier_id'] for ligne in page_obj]
+    )
+    demandes = [
+        {
+            'document': documents[ligne['dernier_id']],
+            'documents_count': ligne['documents_count'],
+            'user': documents[ligne['dernier_id']].utilisateur,
+        }
+        for ligne in page_obj
+    ]
     
     context = {
-        'demandes': list(demandes.values()),
+        'demandes': demandes,
+        'page_obj': page_obj,
         'status_filter': status_filter,
         'structure_filter': structure_filter,
     }
@@ -1686,63 +1848,17 @@ def vendor_action(request):
         try:
             user = CustomUser.objects.get(id=user_id)
             
-            # Récupérer tous les documents de cette demande
-            documents = DocumentUtilisateur.objects.filter(
-                utilisateur=user,
-                nom__icontains='Demande vendor'
-            )
-            
             if action == 'approve':
-                # Approuver tous les documents
-                documents.update(
-                    statut_verification='approuve',
-                    moderateur=request.user
-                )
-                
-                # Activer le statut vendor
-                user.is_vendor = True
-                user.est_verifie = True
-                user.save()
-                
-                # Email de confirmation
-                try:
-                    from django.core.mail import send_mail
-                    send_mail(
-                        subject='🎉 Demande vendor approuvée - BabiLoc',
-                        message=f'Félicitations {user.get_full_name() or user.username} !\n\nVotre demande pour devenir propriétaire/hôte a été approuvée.\n\nVous pouvez maintenant publier vos biens sur BabiLoc.\n\nL\'équipe BabiLoc',
-                        from_email=settings.EMAIL_HOST_USER,
-                        recipient_list=[user.email],
-                        fail_silently=True
-                    )
-                except:
-                    pass
-                
+                # Documents de la demande, activation du vendor et email de confirmation
+                moderation.traiter_demande_vendor(user, 'approuve', request.user)
                 return JsonResponse({
                     'success': True,
                     'message': f'Demande de {user.get_full_name() or user.username} approuvée avec succès'
                 })
             
             elif action == 'reject':
-                # Refuser tous les documents
-                documents.update(
-                    statut_verification='refuse',
-                    moderateur=request.user,
-                    commentaire_moderateur="Demande refusée par l'administration"
-                )
-                
-                # Email de refus
-                try:
-                    from django.core.mail import send_mail
-                    send_mail(
-                        subject='❌ Demande vendor refusée - BabiLoc',
-                        message=f'Bonjour {user.get_full_name() or user.username},\n\nNous regrettons de vous informer que votre demande pour devenir propriétaire/hôte a été refusée.\n\nRaison: Documents non conformes ou incomplets.\n\nVous pouvez soumettre une nouvelle demande avec des documents mis à jour.\n\nL\'équipe BabiLoc',
-                        from_email=settings.EMAIL_HOST_USER,
-                        recipient_list=[user.email],
-                        fail_silently=True
-                    )
-                except:
-                    pass
-                
+                # Documents de la demande et email de refus
+                moderation.traiter_demande_vendor(user, 'refuse', request.user)
                 return JsonResponse({
                     'success': True,
                     'message': f'Demande de {user.get_full_name() or user.username} refusée'
@@ -1939,7 +2055,6 @@ class DeleteAccountView(APIView):
         user.first_name = ''
         user.last_name = ''
         user.number = None
-        user.otp_code = None
         user.username = f"deleted_user_{uid}"
         user.email = f"deleted_{uid}@deleted.local"
 
@@ -1957,7 +2072,7 @@ class DeleteAccountView(APIView):
         # Sauvegarde sécurisée: inclure seulement les champs existants
         update_fields = [
             'is_active', 'is_vendor', 'est_verifie', 'first_name', 'last_name',
-            'number', 'otp_code', 'username', 'email'
+            'number', 'username', 'email'
         ]
         for extra in ['photo_profil', 'image_banniere']:
             if hasattr(user, extra):
@@ -1996,10 +2111,10 @@ class DeleteAccountRequestOTPView(APIView):
                 return Response({'error': 'Mot de passe incorrect'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Générer un OTP spécifique (sans toucher à otp_verified)
-        otp_code = str(random.randint(1000, 9999))
-        user.otp_code = otp_code
-        user.otp_created_at = timezone.now()
-        user.save(update_fields=['otp_code', 'otp_created_at'])
+        try:
+            otp_code = emettre_otp(user, CodeOTP.Usage.SUPPRESSION, adresse_ip_client(request))
+        except LimiteOTPAtteinte as e:
+            return Response({'error': str(e), 'retry_after': e.reessayer_dans}, status=status.HTTP_429_TOO_MANY_REQUESTS)
 
         # Envoi email OTP
         subject = "Confirmez la suppression de votre compte - Code OTP"
@@ -2085,15 +2200,10 @@ class DeleteAccountConfirmOTPView(APIView):
         if not otp_code:
             return Response({'error': 'Code OTP requis'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Valider l’OTP via la fenêtre de validité existante
-        if not (str(user.otp_code) == str(otp_code) and user.is_otp_valid()):
+        # Valider et consommer l’OTP de suppression
+        if not verifier_otp(user, CodeOTP.Usage.SUPPRESSION, otp_code):
             return Response({'error': 'Code OTP invalide ou expiré'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Nettoyer l’OTP
-        user.otp_code = None
-        user.otp_created_at = None
-        user.save(update_fields=['otp_code', 'otp_created_at'])
-
         # Récupérer infos pour audit
         reason = request.data.get('reason', 'confirmed_via_otp')
         ip = (
@@ -3,6 +3,9 @@ ASGI config for babiloc_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Les requêtes HTTP sont servies par Django ; les WebSockets du chat (/ws/chat/)
+par chat/websocket.py. Lancement : uvicorn babiloc_backend.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +16,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'babiloc_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Après l'initialisation de Django (modèles chargés)
+from chat.websocket import application_websocket, cycle_de_vie  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await application_websocket(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await cycle_de_vie(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -121,6 +121,24 @@ DATABASES = {
     )
 }
 
+# Cache : Redis partagé entre les workers si REDIS_URL est défini,
+# sinon mémoire locale (propre à chaque processus)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'babiloc',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -143,9 +161,8 @@ AUTH_USER_MODEL = 'Auths.CustomUser'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'Auths.authentication.CachedJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',  # Swagger (USE_SESSION_AUTH) et admin
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -236,6 +253,8 @@ CLOUDINARY_STORAGE = {
     'RESOURCE_TYPE': 'raw',  # Change from 'auto' to 'raw' for non-image files
 }
 
+MEDIA_ROOT = BASE_DIR / 'media'
+
 STORAGES = {
     'default': {
         'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage',
@@ -243,6 +262,16 @@ STORAGES = {
     'raw_files': {
         'BACKEND': 'cloudinary_storage.storage.RawMediaCloudinaryStorage',
     },
+    # Système de fichiers local (développement hors ligne)
+    'local_files': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': MEDIA_ROOT, 'base_url': '/media/'},
+    },
+    # Documents dédupliqués par empreinte SHA-256, écrits dans l'un des stockages ci-dessus
+    'documents': {
+        'BACKEND': 'Auths.stockage.StockageDeduplique',
+        'OPTIONS': {'backend': config('DOCUMENTS_STORAGE_BACKEND', default='default')},
+    },
     'staticfiles': {
         'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
     },
@@ -250,8 +279,13 @@ STORAGES = {
 
 MEDIA_URL = '/media/'
 
-# Maximum file upload size (50MB)
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
+# Au-delà de 2,5 Mo un fichier reçu est écrit sur disque plutôt que gardé en mémoire ;
+# son empreinte SHA-256 est calculée pendant la réception (Auths/stockage.py)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+FILE_UPLOAD_HANDLERS = [
+    'Auths.stockage.MemoryHachageUploadHandler',
+    'Auths.stockage.TemporaryHachageUploadHandler',
+]
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
 
 # Default primary key field type
@@ -321,6 +355,37 @@ SUPABASE_URL = config('SUPABASE_URL', default='')
 SUPABASE_ANON_KEY = config('SUPABASE_ANON_KEY', default='')
 SUPABASE_SERVICE_KEY = config('SUPABASE_SERVICE_KEY', default='')
 
+# Client Supabase du chat (chat/supabase_client.py)
+# 'supabase' ou 'memoire' (stockage en mémoire pour les tests de charge hors ligne)
+SUPABASE_BACKEND = config('SUPABASE_BACKEND', default='supabase')
+SUPABASE_MEMOIRE_LATENCE_MS = config('SUPABASE_MEMOIRE_LATENCE_MS', default=0, cast=int)
+SUPABASE_TIMEOUT = config('SUPABASE_TIMEOUT', default=5.0, cast=float)  # secondes, par requête HTTP
+SUPABASE_TIMEOUT_CONNEXION = config('SUPABASE_TIMEOUT_CONNEXION', default=2.0, cast=float)
+SUPABASE_BUDGET = config('SUPABASE_BUDGET', default=8.0, cast=float)  # secondes, tentatives comprises
+SUPABASE_POOL_CONNEXIONS = config('SUPABASE_POOL_CONNEXIONS', default=10, cast=int)
+SUPABASE_TENTATIVES = config('SUPABASE_TENTATIVES', default=3, cast=int)
+SUPABASE_ATTENTE_BASE = 0.1  # secondes, doublée à chaque tentative (tirage aléatoire jusqu'à cette valeur)
+SUPABASE_ATTENTE_MAX = 1.0
+SUPABASE_DISJONCTEUR_SEUIL = config('SUPABASE_DISJONCTEUR_SEUIL', default=5, cast=int)  # échecs consécutifs
+SUPABASE_DISJONCTEUR_PAUSE = config('SUPABASE_DISJONCTEUR_PAUSE', default=30, cast=int)  # secondes
+SUPABASE_APPEL_LENT_MS = 1000
+
+# Temps réel du chat par WebSocket (chat/websocket.py, servi par babiloc_backend/asgi.py)
+# Avec Redis, les événements publiés par tous les processus atteignent tous les serveurs WebSocket
+CHAT_TEMPS_REEL_REDIS_URL = config('CHAT_TEMPS_REEL_REDIS_URL', default=REDIS_URL)
+CHAT_TEMPS_REEL_DELAI_ENVOI = 5  # secondes ; au-delà, la connexion est jugée bloquée et fermée
+
+# Cycle de vie des salons de chat (commande cycle_vie_salons_chat, voir chat/cycle_vie.py)
+CHAT_FERMETURE_APRES_JOURS = config('CHAT_FERMETURE_APRES_JOURS', default=7, cast=int)  # après Reservation.date_fin
+CHAT_ARCHIVAGE_APRES_JOURS = config('CHAT_ARCHIVAGE_APRES_JOURS', default=30, cast=int)  # après la fermeture
+
+# Pièces jointes du chat (chat/pieces_jointes.py) : reçues sur disque, images traitées par un pool de threads
+CHAT_PIECE_JOINTE_TAILLE_MAX = config('CHAT_PIECE_JOINTE_TAILLE_MAX', default=20971520, cast=int)  # 20MB
+CHAT_IMAGE_PIXELS_MAX = 50_000_000  # au-delà, l'image est refusée (décompression abusive)
+CHAT_MINIATURE_TAILLE = 400  # pixels, plus grand côté
+CHAT_MINIATURES_WORKERS = config('CHAT_MINIATURES_WORKERS', default=2, cast=int)
+CHAT_MINIATURES_DELAI = 30  # secondes d'attente du traitement d'une image, file d'attente comprise
+
 # HTTPS/Proxy (App Platform)
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=True, cast=bool)
\ No newline at end of file
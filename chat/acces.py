@@ -0,0 +1,61 @@
+"""
+Contrôle d'accès aux salons de chat à partir de la table locale ChatRoom.
+
+Les identifiants Supabase des salons d'un utilisateur (client ou hôte) sont
+mis en cache sous forme d'ensemble : l'autorisation d'une requête de chat est
+un test d'appartenance, sans aller-retour vers Supabase. L'ensemble est
+invalidé à chaque création, modification ou suppression d'un salon (signaux
+dans chat/signals.py) ; un refus est confirmé en base.
+
+Une invalidation n'atteint tous les workers qu'avec un cache partagé (Redis,
+REDIS_URL) : avec le cache mémoire local, un accès retiré resterait accordé
+jusqu'à l'expiration dans les autres processus. Dans ce cas le cache n'est pas
+utilisé et chaque contrôle est une requête indexée sur ChatRoom.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+CACHE_TIMEOUT = 60 * 5
+CACHES_LOCAUX = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHE_PARTAGE = settings.CACHES['default']['BACKEND'] not in CACHES_LOCAUX
+
+
+def _cle(user_id):
+    return f"chat:salons:{user_id}"
+
+
+def _requete_salons(user_id):
+    from .models import ChatRoom
+
+    return ChatRoom.objects.filter(Q(user_id=user_id) | Q(host_id=user_id)).exclude(supabase_id__isnull=True)
+
+
+def salons_ids(user_id):
+    """Identifiants Supabase des salons de l'utilisateur (cache partagé, sinon une requête)"""
+    if not CACHE_PARTAGE:
+        return frozenset(_requete_salons(user_id).values_list('supabase_id', flat=True))
+    ids = cache.get(_cle(user_id))
+    if ids is None:
+        ids = frozenset(_requete_salons(user_id).values_list('supabase_id', flat=True))
+        cache.set(_cle(user_id), ids, CACHE_TIMEOUT)
+    return ids
+
+
+def a_acces(user_id, chat_room_id):
+    """L'utilisateur participe-t-il au salon Supabase ``chat_room_id`` ?"""
+    if not CACHE_PARTAGE:
+        return _requete_salons(user_id).filter(supabase_id=chat_room_id).exists()
+    if chat_room_id in salons_ids(user_id):
+        return True
+    if _requete_salons(user_id).filter(supabase_id=chat_room_id).exists():
+        invalider_salons(user_id)
+        return True
+    return False
+
+
+def invalider_salons(*user_ids):
+    cache.delete_many([_cle(user_id) for user_id in user_ids if user_id])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ChatRoom, ChatMessage
+from .models import ChatRoom, ChatMessage, ParticipantChat, PieceJointeChat
 
 @admin.register(ChatRoom)
 class ChatRoomAdmin(admin.ModelAdmin):
@@ -42,7 +42,7 @@ class ChatMessageAdmin(admin.ModelAdmin):
     search_fields = [
         'message', 'sender__username', 'chat_room__property_name'
     ]
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'supabase_id']
     ordering = ['-created_at']
     
     fieldsets = (
@@ -53,7 +53,7 @@ class ChatMessageAdmin(admin.ModelAdmin):
             'fields': ('message',)
         }),
         ('Métadonnées', {
-            'fields': ('created_at',),
+            'fields': ('created_at', 'supabase_id'),
             'classes': ('collapse',)
         }),
     )
@@ -83,3 +83,18 @@ class ChatMessageAdmin(admin.ModelAdmin):
         self.message_user(request, f"{updated} message(s) marqué(s) comme non lu(s)")
     
     mark_as_unread.short_description = "Marquer comme non lu"
+
+@admin.register(ParticipantChat)
+class ParticipantChatAdmin(admin.ModelAdmin):
+    list_display = ['id', 'chat_room', 'utilisateur', 'nb_non_lus', 'lu_le']
+    search_fields = ['utilisateur__username', 'chat_room__supabase_id']
+    raw_id_fields = ['chat_room', 'utilisateur']
+    readonly_fields = ['dernier_message_lu_id', 'lu_le']
+
+@admin.register(PieceJointeChat)
+class PieceJointeChatAdmin(admin.ModelAdmin):
+    list_display = ['id', 'chat_room', 'envoyeur', 'type_piece', 'nom_original', 'taille', 'created_at']
+    list_filter = ['type_piece', 'created_at']
+    search_fields = ['nom_original', 'envoyeur__username', 'chat_room__supabase_id']
+    raw_id_fields = ['chat_room', 'message', 'envoyeur']
+    readonly_fields = ['type_mime', 'taille', 'largeur', 'hauteur', 'created_at']
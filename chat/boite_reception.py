@@ -0,0 +1,148 @@
+"""
+Boîte de réception du chat : projection locale des conversations.
+
+Chaque ParticipantChat porte, pour son utilisateur, ce qu'affiche la liste des
+conversations (autre participant, bien, dates et statut de la réservation,
+dernier message, non lus). La projection est tenue à jour par les événements
+(création du salon, sauvegarde d'une réservation, d'un bien ou de ses photos,
+envoi d'un message) et la liste est servie par une requête sur l'index
+(utilisateur, -dernier_message_le), au lieu de plusieurs requêtes par salon.
+Les salons archivés (chat/cycle_vie.py) sont hors de cet index partiel et
+n'apparaissent que sur demande.
+"""
+from .models import ParticipantChat
+
+LONGUEUR_APERCU = 255
+CHAMPS_PROJECTION = [
+    'role', 'autre_participant', 'bien', 'nom_bien', 'image_bien_url',
+    'date_debut', 'date_fin', 'statut_reservation',
+]
+
+
+def apercu(message):
+    message = ' '.join((message or '').split())
+    if len(message) <= LONGUEUR_APERCU:
+        return message
+    return message[:LONGUEUR_APERCU - 1] + '…'
+
+
+def image_bien_url(bien_id):
+    """URL de la première photo du bien (celle qu'affichait la liste des conversations)"""
+    from reservation.models import Media
+
+    media = Media.objects.filter(bien_id=bien_id).order_by('id').only('image').first()
+    return media.image.url if media and media.image else ''
+
+
+def synchroniser_participants(chat_room):
+    """
+    Crée ou met à jour la projection du client et de l'hôte d'un salon, sans
+    toucher à l'état de lecture ni au dernier message déjà enregistrés.
+    """
+    from reservation.models import Reservation
+
+    reservation = Reservation.objects.select_related('bien').get(pk=chat_room.reservation_id)
+    commun = {
+        'bien_id': reservation.bien_id,
+        'nom_bien': reservation.bien.nom,
+        'image_bien_url': image_bien_url(reservation.bien_id),
+        'date_debut': reservation.date_debut,
+        'date_fin': reservation.date_fin,
+        'statut_reservation': reservation.status or '',
+        'dernier_message_le': chat_room.last_message_at or chat_room.created_at,
+    }
+    participants = {
+        chat_room.user_id: ParticipantChat(
+            chat_room=chat_room, utilisateur_id=chat_room.user_id,
+            role='guest', autre_participant_id=chat_room.host_id, **commun
+        ),
+        # Si le client est aussi l'hôte, la ligne « hôte » l'emporte
+        chat_room.host_id: ParticipantChat(
+            chat_room=chat_room, utilisateur_id=chat_room.host_id,
+            role='host', autre_participant_id=chat_room.user_id, **commun
+        ),
+    }
+    ParticipantChat.objects.bulk_create(
+        list(participants.values()),
+        update_conflicts=True,
+        unique_fields=['chat_room', 'utilisateur'],
+        update_fields=CHAMPS_PROJECTION,
+    )
+
+
+def mettre_a_jour_reservation(reservation):
+    """Retourne True si le statut affiché a changé"""
+    participants = ParticipantChat.objects.filter(chat_room__reservation_id=reservation.pk)
+    statut_modifie = participants.exclude(statut_reservation=reservation.status or '').exists()
+    participants.update(
+        date_debut=reservation.date_debut,
+        date_fin=reservation.date_fin,
+        statut_reservation=reservation.status or '',
+    )
+    return statut_modifie
+
+
+def mettre_a_jour_nom_bien(bien):
+    ParticipantChat.objects.filter(bien_id=bien.pk).exclude(nom_bien=bien.nom).update(nom_bien=bien.nom)
+
+
+def mettre_a_jour_image_bien(bien_id):
+    ParticipantChat.objects.filter(bien_id=bien_id).update(image_bien_url=image_bien_url(bien_id))
+
+
+def conversations(user, archives=False):
+    """
+    Conversations de ``user``, la plus récente d'abord : une requête. Par défaut
+    sans les salons archivés (index partiel participant_boite_idx) ; ``archives``
+    True pour les seuls salons archivés, None pour tous.
+    """
+    participants = ParticipantChat.objects.filter(utilisateur=user)
+    if archives is not None:
+        participants = participants.filter(archive=archives)
+    return participants.select_related('chat_room', 'autre_participant').order_by('-dernier_message_le')
+
+
+def _nom(user):
+    return f"{user.first_name} {user.last_name}".strip() or user.username
+
+
+def serialiser_conversation(participant, request, favoris):
+    """Format historique de UserChatRoomsView (champs des salons Supabase + détails)"""
+    room = participant.chat_room
+    autre = participant.autre_participant
+    nom_moi = _nom(request.user)
+    nom_autre = _nom(autre) if autre else None
+    est_hote = participant.role == 'host'
+
+    return {
+        'id': room.supabase_id,
+        'local_id': room.id,
+        'reservation_id': room.reservation_id,
+        'user_id': room.user_id,
+        'host_id': room.host_id,
+        'property_name': participant.nom_bien,
+        'status': room.status,
+        'created_at': room.created_at.isoformat(),
+        'last_message_at': participant.dernier_message_le.isoformat(),
+        'last_message': participant.apercu_dernier_message,
+        'unread_count': participant.nb_non_lus,
+        'reservation_details': {
+            'id': room.reservation_id,
+            'property_name': participant.nom_bien,
+            'guest_name': nom_autre if est_hote else nom_moi,
+            'host_name': nom_moi if est_hote else nom_autre,
+            'status': participant.statut_reservation,
+            'check_in': participant.date_debut.isoformat() if participant.date_debut else None,
+            'check_out': participant.date_fin.isoformat() if participant.date_fin else None,
+            'property_image': (
+                request.build_absolute_uri(participant.image_bien_url) if participant.image_bien_url else None
+            ),
+            'bien_id': participant.bien_id,
+            'is_favori': participant.bien_id in favoris,
+        },
+        'other_user': {
+            'id': autre.id,
+            'name': nom_autre,
+            'role': 'guest' if est_hote else 'host',
+        } if autre else None,
+    }
@@ -0,0 +1,82 @@
+"""
+Cycle de vie des salons de chat : actif → fermé → archivé.
+
+Un balayage périodique (commande ``cycle_vie_salons_chat``) :
+- ferme les salons actifs dont la réservation est annulée ou terminée depuis
+  plus de CHAT_FERMETURE_APRES_JOURS (``Reservation.date_fin``) ;
+- archive les salons fermés depuis plus de CHAT_ARCHIVAGE_APRES_JOURS
+  (``statut_modifie_le``, index chatroom_cycle_idx).
+
+Les salons sont traités par lots : un UPDATE Supabase pour le lot
+(``id in (...)``), puis un UPDATE local des salons et, à l'archivage, de leurs
+participants (``archive``), que l'index partiel de la boîte de réception
+exclut. Si Supabase échoue, le lot n'est pas modifié localement et le balayage
+s'arrête : il reprendra au même point au prochain passage.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChatRoom, ParticipantChat
+from .supabase_service import chat_supabase_service
+
+logger = logging.getLogger(__name__)
+
+JOURS_AVANT_FERMETURE = getattr(settings, 'CHAT_FERMETURE_APRES_JOURS', 7)
+JOURS_AVANT_ARCHIVAGE = getattr(settings, 'CHAT_ARCHIVAGE_APRES_JOURS', 30)
+
+
+class CycleVieInterrompu(RuntimeError):
+    def __init__(self, message, total):
+        super().__init__(message)
+        self.total = total
+
+
+def salons_a_fermer(maintenant=None, jours=JOURS_AVANT_FERMETURE):
+    maintenant = maintenant or timezone.now()
+    return ChatRoom.objects.filter(status='active').filter(
+        Q(reservation__status='cancelled') | Q(reservation__date_fin__lt=maintenant - timedelta(days=jours))
+    )
+
+
+def salons_a_archiver(maintenant=None, jours=JOURS_AVANT_ARCHIVAGE):
+    maintenant = maintenant or timezone.now()
+    return ChatRoom.objects.filter(status='closed', statut_modifie_le__lt=maintenant - timedelta(days=jours))
+
+
+def changer_statut(salons, statut, taille_lot=500, maintenant=None):
+    """Passe ``salons`` au statut ``statut`` lot par lot ; retourne leur nombre"""
+    maintenant = maintenant or timezone.now()
+    total = 0
+    while True:
+        lot = list(salons.order_by().values_list('id', 'supabase_id')[:taille_lot])
+        if not lot:
+            return total
+
+        supabase_ids = [supabase_id for _, supabase_id in lot if supabase_id]
+        if supabase_ids:
+            result = chat_supabase_service.update_rooms_status(supabase_ids, statut)
+            if not result['success']:
+                raise CycleVieInterrompu(f"Supabase : {result['error']}", total)
+
+        ids = [pk for pk, _ in lot]
+        with transaction.atomic():
+            ChatRoom.objects.filter(id__in=ids).update(status=statut, statut_modifie_le=maintenant)
+            if statut == 'archived':
+                ParticipantChat.objects.filter(chat_room_id__in=ids).update(archive=True)
+        total += len(ids)
+        logger.info(f"{len(ids)} salon(s) passé(s) au statut {statut}")
+
+
+def fermer_salons(taille_lot=500, jours=JOURS_AVANT_FERMETURE, maintenant=None):
+    maintenant = maintenant or timezone.now()
+    return changer_statut(salons_a_fermer(maintenant, jours), 'closed', taille_lot, maintenant)
+
+
+def archiver_salons(taille_lot=500, jours=JOURS_AVANT_ARCHIVAGE, maintenant=None):
+    maintenant = maintenant or timezone.now()
+    return changer_statut(salons_a_archiver(maintenant, jours), 'archived', taille_lot, maintenant)
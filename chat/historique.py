@@ -0,0 +1,254 @@
+"""
+Historique local des messages de chat.
+
+Les messages sont écrits dans ChatMessage au moment de l'envoi (en plus de
+Supabase, qui assure la diffusion temps réel) et complétés par la commande
+``synchroniser_messages_chat``. Un salon dont l'historique Supabase n'a jamais
+été copié (``messages_synchronises_jusqu_a`` vide) l'est entièrement à sa
+première lecture, même s'il a déjà des messages écrits à l'envoi.
+
+L'historique est servi localement par pages, avec des curseurs ``before`` /
+``after`` sur (chat_room, created_at, id) : une requête sur l'index, quelle que
+soit la profondeur de la page.
+"""
+import base64
+import logging
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage, ChatRoom, ParticipantChat, PieceJointeChat
+from .pieces_jointes import serialiser_piece_jointe
+from .temps_reel import publier_message
+
+logger = logging.getLogger(__name__)
+
+TAILLE_PAGE_DEFAUT = 50
+TAILLE_PAGE_MAX = 100
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+class SynchronisationImpossible(RuntimeError):
+    pass
+
+
+# ==================== ÉCRITURE ====================
+
+def date_supabase(valeur):
+    date = parse_datetime(valeur) if isinstance(valeur, str) else valeur
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        # Le service envoie des dates UTC sans fuseau
+        date = timezone.make_aware(date, dt_timezone.utc)
+    return date
+
+
+def _message(chat_room, donnees, sender_id):
+    return ChatMessage(
+        supabase_id=str(donnees['id']) if donnees.get('id') is not None else None,
+        chat_room=chat_room,
+        sender_id=sender_id,
+        message=donnees.get('message') or '',
+        message_type=donnees.get('message_type') or 'text',
+        created_at=date_supabase(donnees.get('created_at')),
+    )
+
+
+def ecrire_message(chat_room, sender, donnees, piece_jointe=None):
+    """
+    Copie locale d'un message que l'on vient d'envoyer à Supabase (``donnees`` :
+    ligne insérée), poussée aux participants connectés en WebSocket ; la pièce
+    jointe éventuelle y est rattachée. Une ligne déjà copiée (même ID Supabase)
+    n'est ni réécrite ni publiée une seconde fois.
+    """
+    message = _message(chat_room, donnees, sender.pk if sender else None)
+    try:
+        # Point de sauvegarde : la transaction englobante reste utilisable après un doublon
+        with transaction.atomic():
+            message.save(force_insert=True)
+        insere = True
+    except IntegrityError:
+        existant = ChatMessage.objects.filter(supabase_id=message.supabase_id).first() if message.supabase_id else None
+        if existant is None:
+            raise
+        message, insere = existant, False
+    if piece_jointe is not None:
+        PieceJointeChat.objects.filter(pk=piece_jointe.pk).update(message=message)
+        message.piece_jointe = piece_jointe
+    if insere:
+        publier_message(chat_room, message)
+    return message
+
+
+def enregistrer_messages(chat_room, lignes):
+    """Insère les lignes Supabase absentes de la copie locale ; retourne le nombre de lignes traitées"""
+    if not lignes:
+        return 0
+    User = get_user_model()
+    expediteurs = {ligne.get('sender_id') for ligne in lignes} - {None}
+    # Un expéditeur supprimé localement devient « Système » plutôt que de faire échouer l'insertion
+    connus = set(User.objects.filter(pk__in=expediteurs).values_list('pk', flat=True))
+    ChatMessage.objects.bulk_create(
+        [_message(chat_room, ligne, ligne.get('sender_id') if ligne.get('sender_id') in connus else None)
+         for ligne in lignes],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return len(lignes)
+
+
+def synchroniser_salon(chat_room, taille_lot=500, complet=False):
+    """
+    Copie les messages Supabase du salon absents localement ; retourne le nombre
+    de lignes lues. Lève SynchronisationImpossible si Supabase ne répond pas.
+    """
+    from .supabase_service import chat_supabase_service
+
+    # Reprise au dernier message synchronisé (inclus : l'insertion ignore les doublons) ;
+    # les messages écrits à l'envoi ne comptent pas
+    depuis = None if complet else chat_room.messages_synchronises_jusqu_a
+    dernier = depuis
+
+    total = decalage = 0
+    while True:
+        result = chat_supabase_service.list_messages_since(
+            chat_room.supabase_id, depuis.isoformat() if depuis else None, decalage, taille_lot
+        )
+        if not result['success']:
+            raise SynchronisationImpossible(f"Salon {chat_room.supabase_id} : {result['error']}")
+        total += enregistrer_messages(chat_room, result['data'])
+        dates = [date_supabase(ligne.get('created_at')) for ligne in result['data']]
+        dernier = max([d for d in (dernier, *dates) if d], default=None)
+        if len(result['data']) < taille_lot:
+            break
+        decalage += taille_lot
+
+    if dernier:
+        ChatRoom.objects.filter(pk=chat_room.pk).update(messages_synchronises_jusqu_a=dernier)
+        chat_room.messages_synchronises_jusqu_a = dernier
+    return total
+
+
+def amorcer_salon(chat_room):
+    """
+    Salon dont l'historique Supabase n'a jamais été copié : copie complète.
+    Retourne False si Supabase est indisponible (nouvel essai à la prochaine lecture).
+    """
+    try:
+        synchroniser_salon(chat_room)
+    except SynchronisationImpossible as e:
+        logger.warning(str(e))
+        return False
+    return True
+
+
+def ecrire_message_bienvenue(chat_room, donnees):
+    """
+    Copie locale du message de bienvenue inséré à la création du salon : c'est
+    tout l'historique d'un salon neuf, marqué comme synchronisé jusqu'à lui
+    """
+    message = ecrire_message(chat_room, None, donnees)
+    ChatRoom.objects.filter(pk=chat_room.pk).update(messages_synchronises_jusqu_a=message.created_at)
+    chat_room.messages_synchronises_jusqu_a = message.created_at
+
+
+# ==================== LECTURE ====================
+
+def encoder_curseur(message):
+    brut = f"{message.created_at.isoformat()}|{message.pk}"
+    return base64.urlsafe_b64encode(brut.encode()).decode()
+
+
+def decoder_curseur(curseur):
+    try:
+        date, pk = base64.urlsafe_b64decode(curseur.encode()).decode().rsplit('|', 1)
+        date = parse_datetime(date)
+        if date is None:
+            raise ValueError(curseur)
+        return date, int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CurseurInvalide("Curseur invalide") from e
+
+
+def page_messages(chat_room, limite=TAILLE_PAGE_DEFAUT, avant=None, apres=None):
+    """
+    Messages du salon par ordre chronologique : les ``limite`` derniers, ceux qui
+    précèdent le curseur ``avant`` ou ceux qui suivent le curseur ``apres``.
+    Retourne (messages, il_en_reste).
+    """
+    limite = max(1, min(int(limite), TAILLE_PAGE_MAX))
+    messages = ChatMessage.objects.filter(chat_room=chat_room).select_related('sender', 'piece_jointe')
+
+    if apres:
+        date, pk = decoder_curseur(apres)
+        messages = messages.filter(Q(created_at__gt=date) | Q(created_at=date, id__gt=pk))
+        page = list(messages.order_by('created_at', 'id')[:limite + 1])
+        return page[:limite], len(page) > limite
+
+    if avant:
+        date, pk = decoder_curseur(avant)
+        messages = messages.filter(Q(created_at__lt=date) | Q(created_at=date, id__lt=pk))
+    page = list(messages.order_by('-created_at', '-id')[:limite + 1])
+    return list(reversed(page[:limite])), len(page) > limite
+
+
+def messages_depuis(chat_room, depuis, limite=TAILLE_PAGE_MAX):
+    """
+    Messages du salon créés après ``depuis``, par ordre chronologique : les
+    ``limite`` plus récents. Retourne (messages, il_en_reste) ; s'il en reste,
+    la suite se lit avec le curseur ``before`` du premier message.
+    """
+    page = list(
+        ChatMessage.objects.filter(chat_room=chat_room, created_at__gt=depuis)
+        .select_related('sender', 'piece_jointe')
+        .order_by('-created_at', '-id')[:limite + 1]
+    )
+    return list(reversed(page[:limite])), len(page) > limite
+
+
+def serialiser_messages(messages, chat_room, user):
+    """
+    Format historique des messages Supabase ; ``is_read`` est déduit des
+    filigranes de lecture (le sien pour les messages reçus, celui de l'autre
+    participant pour les messages envoyés)
+    """
+    filigranes = dict(
+        ParticipantChat.objects.filter(chat_room=chat_room).values_list('utilisateur_id', 'lu_le')
+    )
+    mon_filigrane = filigranes.pop(user.pk, None)
+    autre_filigrane = max((d for d in filigranes.values() if d), default=None)
+
+    resultat = []
+    for message in messages:
+        filigrane = autre_filigrane if message.sender_id == user.pk else mon_filigrane
+        if message.sender_id:
+            sender = message.sender
+            sender_info = {
+                'id': sender.id,
+                'name': f"{sender.first_name} {sender.last_name}".strip() or sender.username,
+                'username': sender.username,
+            }
+        else:
+            sender_info = {'name': 'Système', 'username': 'system'}
+        piece_jointe = getattr(message, 'piece_jointe', None)
+        resultat.append({
+            'id': message.supabase_id or str(message.pk),
+            'local_id': message.pk,
+            'chat_room_id': chat_room.supabase_id,
+            'sender_id': message.sender_id,
+            'message': message.message,
+            'message_type': message.message_type,
+            'created_at': message.created_at.isoformat(),
+            'is_read': bool(filigrane and message.created_at <= filigrane),
+            'sender_info': sender_info,
+            'attachment': serialiser_piece_jointe(piece_jointe) if piece_jointe else None,
+        })
+    return resultat
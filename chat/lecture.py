@@ -0,0 +1,146 @@
+"""
+Filigranes de lecture des salons de chat.
+
+Chaque participant d'un salon a une ligne ParticipantChat : dernier message lu,
+date de lecture et compteur de non lus. Un envoi incrémente le compteur des
+autres participants, le marquage comme lu est une écriture sur une seule ligne
+(recopiée dans la table Supabase ``chat_read_watermarks``) au lieu d'une mise
+à jour de chaque message.
+
+La migration 0003 crée les participants des salons existants avec un compteur
+à zéro ; la commande ``amorcer_non_lus_chat`` le reprend ensuite de l'ancien
+état de lecture Supabase (messages ``is_read = false``) pour les participants
+qui n'ont encore rien marqué comme lu.
+"""
+import logging
+
+from collections import Counter
+
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from .boite_reception import apercu
+from .models import ChatRoom, ParticipantChat
+from .temps_reel import publier_lecture
+
+logger = logging.getLogger(__name__)
+
+
+class AmorcageImpossible(RuntimeError):
+    pass
+
+
+def enregistrer_message(chat_room_id, sender_id, message=''):
+    """
+    Un message vient d'être envoyé dans le salon Supabase ``chat_room_id`` : aperçu
+    et date du dernier message pour tous, +1 non lu pour les autres participants
+    """
+    valeurs = {'apercu_dernier_message': apercu(message), 'dernier_message_le': timezone.now()}
+    if sender_id is not None:
+        # Messages système : jamais comptés comme non lus
+        valeurs['nb_non_lus'] = Case(
+            When(utilisateur_id=sender_id, then=F('nb_non_lus')),
+            default=F('nb_non_lus') + 1,
+        )
+    return ParticipantChat.objects.filter(chat_room__supabase_id=chat_room_id).update(**valeurs)
+
+
+def marquer_comme_lu(chat_room_id, user, dernier_message_id=None):
+    """
+    Avance le filigrane de ``user`` dans le salon Supabase ``chat_room_id`` et
+    remet son compteur à zéro. Retourne le nombre de messages qui étaient non lus.
+    """
+    from .supabase_service import chat_supabase_service
+
+    maintenant = timezone.now()
+    valeurs = {'nb_non_lus': 0, 'lu_le': maintenant}
+    if dernier_message_id:
+        valeurs['dernier_message_lu_id'] = str(dernier_message_id)
+
+    participant = ParticipantChat.objects.filter(
+        chat_room__supabase_id=chat_room_id, utilisateur=user
+    ).only('id', 'nb_non_lus', 'dernier_message_lu_id').first()
+
+    if participant is None:
+        # Salon antérieur aux filigranes : la ligne est créée au premier marquage
+        chat_room = ChatRoom.objects.filter(supabase_id=chat_room_id).only('id').first()
+        if chat_room is None:
+            return 0
+        participant, _ = ParticipantChat.objects.update_or_create(
+            chat_room=chat_room, utilisateur=user, defaults=valeurs
+        )
+        non_lus = 0
+    else:
+        non_lus = participant.nb_non_lus
+        ParticipantChat.objects.filter(pk=participant.pk).update(**valeurs)
+
+    dernier_lu = valeurs.get('dernier_message_lu_id', participant.dernier_message_lu_id)
+    chat_supabase_service.upsert_read_watermark(chat_room_id, user.id, dernier_lu, maintenant)
+    # Accusé de lecture pour l'autre participant connecté
+    publier_lecture(chat_room_id, user.id, dernier_lu, maintenant)
+    return non_lus
+
+
+def compter_non_lus(user):
+    """Non lus par salon (clé : ID Supabase) et total, en une requête sur les salons concernés"""
+    room_unread = dict(
+        ParticipantChat.objects.filter(utilisateur=user, nb_non_lus__gt=0, archive=False)
+        .values_list('chat_room__supabase_id', 'nb_non_lus')
+    )
+    return {
+        'success': True,
+        'total_unread': sum(room_unread.values()),
+        'room_unread': room_unread,
+    }
+
+
+def amorcer_non_lus(taille_lot=200, taille_page=1000):
+    """
+    Reprend les compteurs de non lus de l'état ``is_read`` des messages Supabase,
+    pour les participants qui n'ont jamais marqué leur salon comme lu depuis les
+    filigranes (``lu_le`` vide) : ils n'ont lu aucun des messages encore marqués
+    non lus. Les messages système ne comptent pas. Retourne le nombre de
+    participants mis à jour ; lève AmorcageImpossible si Supabase échoue.
+    """
+    from .supabase_service import chat_supabase_service
+
+    salons = (
+        ChatRoom.objects.filter(supabase_id__isnull=False, participations__lu_le__isnull=True)
+        .order_by('id').values_list('id', 'supabase_id').distinct()
+    )
+    total = 0
+    dernier_id = 0
+    while True:
+        lot = dict(salons.filter(id__gt=dernier_id)[:taille_lot])
+        if not lot:
+            return total
+        dernier_id = max(lot)
+
+        non_lus = Counter()
+        participants = {}
+        for pk, room_id, utilisateur_id in ParticipantChat.objects.filter(
+            chat_room_id__in=lot, lu_le__isnull=True
+        ).values_list('id', 'chat_room__supabase_id', 'utilisateur_id'):
+            participants.setdefault(room_id, []).append((pk, utilisateur_id))
+            non_lus[pk] = 0
+
+        offset = 0
+        while True:
+            result = chat_supabase_service.list_unread_messages(list(lot.values()), offset, taille_page)
+            if not result['success']:
+                raise AmorcageImpossible(f"Supabase : {result['error']}")
+            for message in result['data']:
+                sender_id = message.get('sender_id')
+                if sender_id is None:
+                    continue
+                for pk, utilisateur_id in participants.get(str(message['chat_room_id']), []):
+                    if str(utilisateur_id) != str(sender_id):
+                        non_lus[pk] += 1
+            if len(result['data']) < taille_page:
+                break
+            offset += taille_page
+
+        for pk, nombre in non_lus.items():
+            # Un marquage comme lu entre-temps l'emporte
+            total += ParticipantChat.objects.filter(pk=pk, lu_le__isnull=True).update(nb_non_lus=nombre)
+        logger.info(f"Non lus repris pour {len(non_lus)} participant(s) de {len(lot)} salon(s)")
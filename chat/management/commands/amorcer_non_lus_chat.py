@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.lecture import AmorcageImpossible, amorcer_non_lus
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprend les compteurs de non lus (ParticipantChat) de l'état is_read des messages Supabase, "
+        "pour les participants qui n'ont pas encore marqué leur salon comme lu. À lancer une fois après "
+        "la migration chat 0003."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=200, help="Salons lus par requête Supabase")
+
+    def handle(self, *args, **options):
+        try:
+            total = amorcer_non_lus(options['taille_lot'])
+        except AmorcageImpossible as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{total} participant(s) mis à jour"))
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.acces import salons_ids
+
+MARQUEUR = 'charge-temps-reel'
+
+
+def _centile(valeurs, centile):
+    if not valeurs:
+        return 0.0
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * centile / 100))]
+
+
+def _ms(secondes):
+    return f"{secondes * 1000:.1f} ms"
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du WebSocket du chat : ouvre N connexions authentifiées au rythme demandé, "
+        "les garde inactives, et mesure la latence de réception des messages envoyés par l'API. "
+        "Serveur : uvicorn babiloc_backend.asgi:application (SUPABASE_BACKEND=memoire pour rester hors ligne)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--utilisateur', required=True, help="Nom d'utilisateur ou ID dont le jeton est utilisé")
+        parser.add_argument('--url', default='ws://127.0.0.1:8000/ws/chat/', help="URL du WebSocket")
+        parser.add_argument('--api', default='http://127.0.0.1:8000', help="URL de l'API pour l'envoi des messages")
+        parser.add_argument('--connexions', type=int, default=1000)
+        parser.add_argument('--cadence', type=int, default=500, help="Ouvertures de connexion par seconde")
+        parser.add_argument('--duree', type=float, default=10, help="Secondes de maintien des connexions inactives")
+        parser.add_argument('--messages', type=int, default=0, help="Messages envoyés pendant le maintien")
+        parser.add_argument('--salon', help="ID Supabase du salon (par défaut : le premier de l'utilisateur)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        identifiant = options['utilisateur']
+        user = User.objects.filter(
+            **({'pk': int(identifiant)} if identifiant.isdigit() else {'username': identifiant})
+        ).first()
+        if user is None:
+            raise CommandError(f"Utilisateur introuvable : {identifiant}")
+
+        salon = options['salon'] or next(iter(sorted(salons_ids(user.pk))), None)
+        if options['messages'] and not salon:
+            raise CommandError("Aucun salon pour envoyer les messages (--salon)")
+
+        self._augmenter_limite_fichiers(options['connexions'])
+        asyncio.run(self._charger(str(AccessToken.for_user(user)), salon, options))
+
+    def _augmenter_limite_fichiers(self, connexions):
+        try:
+            import resource
+        except ImportError:
+            return
+        souple, dure = resource.getrlimit(resource.RLIMIT_NOFILE)
+        besoin = connexions + 256
+        if souple >= besoin:
+            return
+        cible = besoin if dure == resource.RLIM_INFINITY else min(besoin, dure)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (cible, dure))
+        if cible < besoin:
+            self.stdout.write(self.style.WARNING(
+                f"Limite de descripteurs de fichiers ({dure}) inférieure au besoin ({besoin}) : augmentez ulimit -n"
+            ))
+
+    async def _charger(self, jeton, salon, options):
+        import httpx
+        from websockets.asyncio.client import connect
+
+        url = f"{options['url']}?{urlencode({'token': jeton})}"
+        durees_ouverture, latences, envois = [], [], {}
+        etat = {'echecs': 0, 'fermees': 0, 'arret': False}
+
+        async def ouvrir():
+            debut = time.monotonic()
+            try:
+                websocket = await connect(url, ping_interval=None, open_timeout=30)
+                if json.loads(await websocket.recv()).get('type') != 'connected':
+                    raise ConnectionError("connexion refusée")
+            except Exception:
+                etat['echecs'] += 1
+                return None
+            durees_ouverture.append(time.monotonic() - debut)
+            return websocket
+
+        async def ecouter(websocket):
+            try:
+                async for texte in websocket:
+                    evenement = json.loads(texte)
+                    contenu = evenement.get('data', {}).get('message', '') if evenement.get('type') == 'message' else ''
+                    if contenu.startswith(MARQUEUR):
+                        latences.append(time.monotonic() - envois[int(contenu.split()[1])])
+            except Exception:
+                pass
+            if not etat['arret']:
+                etat['fermees'] += 1
+
+        # Ouverture au rythme demandé
+        debut = time.monotonic()
+        taches = []
+        for i in range(options['connexions']):
+            taches.append(asyncio.create_task(ouvrir()))
+            await asyncio.sleep(max(0, debut + (i + 1) / options['cadence'] - time.monotonic()))
+        websockets = [websocket for websocket in await asyncio.gather(*taches) if websocket]
+        self.stdout.write(
+            f"Connexions : {len(websockets)} ouvertes, {etat['echecs']} échec(s) en {time.monotonic() - debut:.1f}s "
+            f"(ouverture p50 {_ms(_centile(durees_ouverture, 50))}, p95 {_ms(_centile(durees_ouverture, 95))})"
+        )
+        ecoutes = [asyncio.create_task(ecouter(websocket)) for websocket in websockets]
+
+        # Envoi des messages par l'API, puis maintien des connexions inactives
+        debut_maintien = time.monotonic()
+        if options['messages']:
+            async with httpx.AsyncClient(
+                base_url=options['api'], headers={'Authorization': f'Bearer {jeton}'}, timeout=30
+            ) as api:
+                for numero in range(options['messages']):
+                    envois[numero] = time.monotonic()
+                    reponse = await api.post(
+                        f'/api/chat/rooms/{salon}/send/', json={'message': f'{MARQUEUR} {numero}'}
+                    )
+                    if not reponse.is_success:
+                        self.stdout.write(self.style.WARNING(f"Envoi {numero} : HTTP {reponse.status_code}"))
+                    await asyncio.sleep(0.5)
+        await asyncio.sleep(max(0, options['duree'] - (time.monotonic() - debut_maintien)))
+
+        etat['arret'] = True
+        await asyncio.gather(*(websocket.close() for websocket in websockets), return_exceptions=True)
+        await asyncio.gather(*ecoutes, return_exceptions=True)
+
+        if options['messages']:
+            attendues = len(websockets) * options['messages']
+            self.stdout.write(
+                f"Messages : {len(latences)}/{attendues} livraison(s), latence p50 {_ms(_centile(latences, 50))}, "
+                f"p95 {_ms(_centile(latences, 95))}, max {_ms(max(latences, default=0))}"
+            )
+        style = self.style.SUCCESS if not etat['fermees'] and not etat['echecs'] else self.style.WARNING
+        self.stdout.write(style(f"Connexions fermées par le serveur pendant le maintien : {etat['fermees']}"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.cycle_vie import (
+    JOURS_AVANT_ARCHIVAGE, JOURS_AVANT_FERMETURE, CycleVieInterrompu, archiver_salons, fermer_salons,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Ferme les salons de chat des réservations annulées ou terminées, puis archive les salons fermés "
+        "depuis longtemps (local et Supabase). À planifier chaque jour (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=500, help="Salons modifiés par appel Supabase")
+        parser.add_argument('--jours-fermeture', type=int, default=JOURS_AVANT_FERMETURE,
+                            help="Jours après la fin de la réservation avant fermeture")
+        parser.add_argument('--jours-archivage', type=int, default=JOURS_AVANT_ARCHIVAGE,
+                            help="Jours après la fermeture avant archivage")
+
+    def handle(self, *args, **options):
+        try:
+            fermes = fermer_salons(options['taille_lot'], options['jours_fermeture'])
+            archives = archiver_salons(options['taille_lot'], options['jours_archivage'])
+        except CycleVieInterrompu as e:
+            raise CommandError(f"{e} ({e.total} salon(s) traité(s) avant l'interruption)")
+        self.stdout.write(self.style.SUCCESS(f"{fermes} salon(s) fermé(s), {archives} salon(s) archivé(s)"))
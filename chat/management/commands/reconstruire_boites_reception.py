@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from chat.boite_reception import synchroniser_participants
+from chat.models import ChatRoom
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule la projection de la boîte de réception (bien, image, réservation) de tous les salons, "
+        "sans toucher aux non lus ni au dernier message"
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for chat_room in ChatRoom.objects.only('id', 'reservation_id', 'user_id', 'host_id', 'created_at',
+                                               'last_message_at').iterator():
+            synchroniser_participants(chat_room)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} salon(s) resynchronisé(s)"))
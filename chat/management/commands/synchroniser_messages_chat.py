@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.historique import SynchronisationImpossible, synchroniser_salon
+from chat.models import ChatRoom
+
+
+class Command(BaseCommand):
+    help = (
+        "Complète la copie locale des messages de chat (ChatMessage) depuis Supabase, "
+        "à partir du dernier message synchronisé de chaque salon"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=500, help="Messages lus par requête Supabase")
+        parser.add_argument('--complet', action='store_true', help="Relit tout l'historique de chaque salon")
+        parser.add_argument('--salon', help="ID Supabase d'un seul salon")
+
+    def handle(self, *args, **options):
+        salons = ChatRoom.objects.exclude(supabase_id__isnull=True)
+        if options['salon']:
+            salons = salons.filter(supabase_id=options['salon'])
+
+        nb_salons = nb_messages = 0
+        for chat_room in salons.iterator():
+            try:
+                nb_messages += synchroniser_salon(chat_room, options['taille_lot'], options['complet'])
+            except SynchronisationImpossible as e:
+                raise CommandError(str(e))
+            nb_salons += 1
+        self.stdout.write(self.style.SUCCESS(f"{nb_messages} message(s) lu(s) dans {nb_salons} salon(s)"))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def creer_participants(apps, schema_editor):
+    # Compteurs à zéro : l'état de lecture est dans Supabase, repris ensuite par
+    # la commande amorcer_non_lus_chat
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ParticipantChat = apps.get_model('chat', 'ParticipantChat')
+    participants = []
+    for room_id, user_id, host_id in ChatRoom.objects.values_list('id', 'user_id', 'host_id').iterator():
+        for utilisateur_id in {user_id, host_id}:
+            participants.append(ParticipantChat(chat_room_id=room_id, utilisateur_id=utilisateur_id))
+    ParticipantChat.objects.bulk_create(participants, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_signalementchat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantChat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dernier_message_lu_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='Dernier message lu (ID Supabase)')),
+                ('lu_le', models.DateTimeField(blank=True, null=True, verbose_name="Lu jusqu'au")),
+                ('nb_non_lus', models.PositiveIntegerField(default=0, verbose_name='Messages non lus')),
+                ('chat_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='chat.chatroom', verbose_name='Salon de chat')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations_chat', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Participant de chat',
+                'verbose_name_plural': 'Participants de chat',
+                'indexes': [models.Index(condition=models.Q(('nb_non_lus__gt', 0)), fields=['utilisateur'], name='participant_non_lus_idx')],
+                'constraints': [models.UniqueConstraint(fields=('chat_room', 'utilisateur'), name='participant_chat_unique')],
+            },
+        ),
+        migrations.RunPython(creer_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remplir_boites(apps, schema_editor):
+    # Les images des biens sont recopiées par la commande reconstruire_boites_reception
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ParticipantChat = apps.get_model('chat', 'ParticipantChat')
+    salons = ChatRoom.objects.select_related('reservation__bien')
+    for room in salons.iterator():
+        reservation = room.reservation
+        commun = {
+            'bien_id': reservation.bien_id,
+            'nom_bien': reservation.bien.nom,
+            'date_debut': reservation.date_debut,
+            'date_fin': reservation.date_fin,
+            'statut_reservation': reservation.status or '',
+            'dernier_message_le': room.last_message_at,
+        }
+        ParticipantChat.objects.filter(chat_room=room, utilisateur_id=room.user_id).update(
+            role='guest', autre_participant_id=room.host_id, **commun
+        )
+        ParticipantChat.objects.filter(chat_room=room, utilisateur_id=room.host_id).update(
+            role='host', autre_participant_id=room.user_id, **commun
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_participantchat'),
+        ('reservation', '0034_document_date_expiration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participantchat',
+            name='apercu_dernier_message',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Aperçu du dernier message'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='autre_participant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Autre participant'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='bien',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reservation.bien', verbose_name='Bien'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='date_debut',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Début de la réservation'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='date_fin',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin de la réservation'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='dernier_message_le',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernier message'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='image_bien_url',
+            field=models.CharField(blank=True, max_length=500, verbose_name='Image du bien'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='nom_bien',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Nom du bien'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='role',
+            field=models.CharField(choices=[('guest', 'Client'), ('host', 'Hôte')], default='guest', max_length=10, verbose_name='Rôle'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='statut_reservation',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Statut de la réservation'),
+        ),
+        migrations.AddIndex(
+            model_name='participantchat',
+            index=models.Index(fields=['utilisateur', '-dernier_message_le'], name='participant_boite_idx'),
+        ),
+        migrations.RunPython(remplir_boites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:14
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_boite_reception'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['created_at', 'id'], 'verbose_name': 'Message de chat', 'verbose_name_plural': 'Messages de chat'},
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='supabase_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='ID Supabase'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='messages_synchronises_jusqu_a',
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Messages synchronisés jusqu'au"),
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Créé le'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat_room', 'created_at', 'id'], name='chat_message_curseur_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Index plein texte des messages de chat (voir chat/recherche.py), selon la base :
+# PostgreSQL : colonne tsvector générée (tenue à jour à chaque écriture) + index GIN
+# SQLite : table FTS5 à contenu externe tenue à jour par des triggers
+
+from django.db import migrations
+
+POSTGRESQL = [
+    """
+    ALTER TABLE chat_chatmessage ADD COLUMN recherche tsvector
+    GENERATED ALWAYS AS (to_tsvector('french', coalesce(message, ''))) STORED
+    """,
+    "CREATE INDEX chat_message_recherche_idx ON chat_chatmessage USING GIN (recherche)",
+]
+POSTGRESQL_INVERSE = [
+    "DROP INDEX IF EXISTS chat_message_recherche_idx",
+    "ALTER TABLE chat_chatmessage DROP COLUMN IF EXISTS recherche",
+]
+
+SQLITE = [
+    """
+    CREATE VIRTUAL TABLE chat_chatmessage_fts USING fts5(
+        message, content='chat_chatmessage', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER chat_chatmessage_fts_ai AFTER INSERT ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_chatmessage_fts_ad AFTER DELETE ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER chat_chatmessage_fts_au AFTER UPDATE OF message ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO chat_chatmessage_fts(rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    # Indexation des messages déjà copiés
+    "INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts) VALUES ('rebuild')",
+]
+SQLITE_INVERSE = [
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_ai",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_au",
+    "DROP TABLE IF EXISTS chat_chatmessage_fts",
+]
+
+
+def _executer(schema_editor, requetes):
+    for requete in requetes.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(requete)
+
+
+def creer_index_recherche(apps, schema_editor):
+    # Autres bases : la recherche se rabat sur icontains (chat/recherche.py)
+    _executer(schema_editor, {'postgresql': POSTGRESQL, 'sqlite': SQLITE})
+
+
+def supprimer_index_recherche(apps, schema_editor):
+    _executer(schema_editor, {'postgresql': POSTGRESQL_INVERSE, 'sqlite': SQLITE_INVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_historique_messages'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index_recherche, supprimer_index_recherche),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def remplir_statuts(apps, schema_editor):
+    # Salons déjà fermés ou archivés : date du dernier message à défaut de date de changement
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ParticipantChat = apps.get_model('chat', 'ParticipantChat')
+    ChatRoom.objects.exclude(status='active').update(statut_modifie_le=F('last_message_at'))
+    ParticipantChat.objects.filter(chat_room__status='archived').update(archive=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_recherche_messages'),
+        ('reservation', '0035_index_synchronisation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='participantchat',
+            name='participant_non_lus_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='participantchat',
+            name='participant_boite_idx',
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='statut_modifie_le',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Statut modifié le'),
+        ),
+        migrations.AddField(
+            model_name='participantchat',
+            name='archive',
+            field=models.BooleanField(default=False, verbose_name='Archivé'),
+        ),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['status', 'statut_modifie_le'], name='chatroom_cycle_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participantchat',
+            index=models.Index(condition=models.Q(('archive', False), ('nb_non_lus__gt', 0)), fields=['utilisateur'], name='participant_non_lus_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participantchat',
+            index=models.Index(condition=models.Q(('archive', False)), fields=['utilisateur', '-dernier_message_le'], name='participant_boite_idx'),
+        ),
+        migrations.RunPython(remplir_statuts, migrations.RunPython.noop),
+    ]
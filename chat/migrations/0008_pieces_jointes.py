@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:35
+
+import Auths.stockage
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_cycle_vie_salons'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PieceJointeChat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_piece', models.CharField(choices=[('image', 'Image'), ('file', 'Fichier')], max_length=10, verbose_name='Type')),
+                ('fichier', models.FileField(storage=Auths.stockage.stockage_documents, upload_to='chat/pieces_jointes/', verbose_name='Fichier')),
+                ('miniature', models.FileField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to='chat/miniatures/', verbose_name='Miniature')),
+                ('nom_original', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('type_mime', models.CharField(max_length=100, verbose_name='Type MIME')),
+                ('taille', models.PositiveBigIntegerField(verbose_name='Taille (octets)')),
+                ('largeur', models.PositiveIntegerField(blank=True, null=True, verbose_name='Largeur (px)')),
+                ('hauteur', models.PositiveIntegerField(blank=True, null=True, verbose_name='Hauteur (px)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('chat_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pieces_jointes', to='chat.chatroom', verbose_name='Salon de chat')),
+                ('envoyeur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pieces_jointes_chat', to=settings.AUTH_USER_MODEL, verbose_name='Envoyeur')),
+                ('message', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='piece_jointe', to='chat.chatmessage', verbose_name='Message')),
+            ],
+            options={
+                'verbose_name': 'Pièce jointe de chat',
+                'verbose_name_plural': 'Pièces jointes de chat',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
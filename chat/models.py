@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from Auths.stockage import stockage_documents
 from reservation.models import Reservation
 
 User = get_user_model()
@@ -49,11 +51,27 @@ class ChatRoom(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     last_message_at = models.DateTimeField(auto_now=True, verbose_name="Dernier message")
+    # Date du dernier message recopié par synchroniser_messages_chat (reprise incrémentale)
+    messages_synchronises_jusqu_a = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Messages synchronisés jusqu'au"
+    )
+    # Date du dernier changement de statut (fermeture, archivage : voir chat/cycle_vie.py)
+    statut_modifie_le = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Statut modifié le"
+    )
     
     class Meta:
         verbose_name = "Salon de chat"
         verbose_name_plural = "Salons de chat"
         ordering = ['-last_message_at']
+        indexes = [
+            # Cycle de vie : salons fermés depuis plus de N jours
+            models.Index(fields=['status', 'statut_modifie_le'], name='chatroom_cycle_idx'),
+        ]
     
     def __str__(self):
         return f"Chat - {self.property_name} ({self.user.username} ↔ {self.host.username})"
@@ -69,8 +87,16 @@ class ChatRoom(models.Model):
 
 class ChatMessage(models.Model):
     """
-    Modèle local pour les messages (optionnel, pour cache local)
+    Copie locale des messages Supabase : écrite à l'envoi, complétée par la
+    commande synchroniser_messages_chat ; sert l'historique paginé (chat/historique.py)
     """
+    supabase_id = models.CharField(
+        max_length=100,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="ID Supabase"
+    )
     chat_room = models.ForeignKey(
         ChatRoom,
         on_delete=models.CASCADE,
@@ -97,12 +123,17 @@ class ChatMessage(models.Model):
         verbose_name="Type de message"
     )
     is_read = models.BooleanField(default=False, verbose_name="Lu")
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    # Date Supabase conservée à la synchronisation (pas auto_now_add)
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Créé le")
     
     class Meta:
         verbose_name = "Message de chat"
         verbose_name_plural = "Messages de chat"
-        ordering = ['created_at']
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Curseurs de l'historique : (salon, date, id)
+            models.Index(fields=['chat_room', 'created_at', 'id'], name='chat_message_curseur_idx'),
+        ]
     
     def __str__(self):
         sender_name = self.sender.username if self.sender else "Système"
@@ -147,3 +178,159 @@ class SignalementChat(models.Model):
 
     def __str__(self):
         return f"Signalement #{self.id} - room:{self.chat_room.supabase_id or self.chat_room.id} reporter:{self.reporter.username if self.reporter else 'anon'}"
+
+
+class ParticipantChat(models.Model):
+    """
+    État d'un participant dans un salon : filigrane de lecture, compteur de non lus
+    et projection de la boîte de réception.
+
+    Le compteur est incrémenté à chaque message envoyé par un autre participant et
+    remis à zéro au marquage comme lu ; les non lus de tous les salons se lisent
+    donc en une requête, sans parcourir les messages.
+
+    Les champs de projection (bien, réservation, dernier message) sont recopiés
+    par les signaux de chat/signals.py pour que la liste des conversations d'un
+    utilisateur soit servie par une seule requête (voir chat/boite_reception.py).
+    """
+    chat_room = models.ForeignKey(
+        ChatRoom,
+        on_delete=models.CASCADE,
+        related_name='participations',
+        verbose_name="Salon de chat"
+    )
+    utilisateur = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='participations_chat',
+        verbose_name="Utilisateur"
+    )
+    dernier_message_lu_id = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        verbose_name="Dernier message lu (ID Supabase)"
+    )
+    lu_le = models.DateTimeField(null=True, blank=True, verbose_name="Lu jusqu'au")
+    nb_non_lus = models.PositiveIntegerField(default=0, verbose_name="Messages non lus")
+
+    # Projection de la boîte de réception
+    role = models.CharField(
+        max_length=10,
+        choices=[('guest', 'Client'), ('host', 'Hôte')],
+        default='guest',
+        verbose_name="Rôle"
+    )
+    autre_participant = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Autre participant"
+    )
+    bien = models.ForeignKey(
+        'reservation.Bien',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Bien"
+    )
+    nom_bien = models.CharField(max_length=255, blank=True, verbose_name="Nom du bien")
+    image_bien_url = models.CharField(max_length=500, blank=True, verbose_name="Image du bien")
+    date_debut = models.DateTimeField(null=True, blank=True, verbose_name="Début de la réservation")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin de la réservation")
+    statut_reservation = models.CharField(max_length=20, blank=True, verbose_name="Statut de la réservation")
+    apercu_dernier_message = models.CharField(max_length=255, blank=True, verbose_name="Aperçu du dernier message")
+    dernier_message_le = models.DateTimeField(default=timezone.now, verbose_name="Dernier message")
+    # Recopie de ChatRoom.status == 'archived' : exclut le salon de la boîte de réception par défaut
+    archive = models.BooleanField(default=False, verbose_name="Archivé")
+
+    class Meta:
+        verbose_name = "Participant de chat"
+        verbose_name_plural = "Participants de chat"
+        constraints = [
+            models.UniqueConstraint(fields=['chat_room', 'utilisateur'], name='participant_chat_unique'),
+        ]
+        indexes = [
+            # Notifications : salons ayant des non lus pour un utilisateur
+            models.Index(
+                fields=['utilisateur'],
+                condition=models.Q(nb_non_lus__gt=0, archive=False),
+                name='participant_non_lus_idx',
+            ),
+            # Boîte de réception : conversations non archivées d'un utilisateur, la plus récente d'abord
+            models.Index(
+                fields=['utilisateur', '-dernier_message_le'],
+                condition=models.Q(archive=False),
+                name='participant_boite_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.utilisateur_id} dans {self.chat_room_id} ({self.nb_non_lus} non lus)"
+
+
+CHAMPS_FICHIERS_PIECE_JOINTE = ('fichier', 'miniature')
+
+
+class PieceJointeChat(models.Model):
+    """
+    Fichier ou image envoyé dans un salon (voir chat/pieces_jointes.py).
+
+    Les images sont réenregistrées sans métadonnées EXIF, avec leurs dimensions
+    et une miniature : la liste des messages n'affiche que la miniature, le
+    fichier complet n'est chargé qu'à l'ouverture. Les fichiers sont écrits
+    dans le stockage dédupliqué des documents.
+    """
+    chat_room = models.ForeignKey(
+        ChatRoom,
+        on_delete=models.CASCADE,
+        related_name='pieces_jointes',
+        verbose_name="Salon de chat"
+    )
+    # Renseigné une fois le message envoyé
+    message = models.OneToOneField(
+        ChatMessage,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='piece_jointe',
+        verbose_name="Message"
+    )
+    envoyeur = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pieces_jointes_chat',
+        verbose_name="Envoyeur"
+    )
+    type_piece = models.CharField(
+        max_length=10,
+        choices=[('image', 'Image'), ('file', 'Fichier')],
+        verbose_name="Type"
+    )
+    fichier = models.FileField(upload_to='chat/pieces_jointes/', storage=stockage_documents, verbose_name="Fichier")
+    miniature = models.FileField(
+        upload_to='chat/miniatures/',
+        storage=stockage_documents,
+        null=True,
+        blank=True,
+        verbose_name="Miniature"
+    )
+    nom_original = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    type_mime = models.CharField(max_length=100, verbose_name="Type MIME")
+    taille = models.PositiveBigIntegerField(verbose_name="Taille (octets)")
+    largeur = models.PositiveIntegerField(null=True, blank=True, verbose_name="Largeur (px)")
+    hauteur = models.PositiveIntegerField(null=True, blank=True, verbose_name="Hauteur (px)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+
+    class Meta:
+        verbose_name = "Pièce jointe de chat"
+        verbose_name_plural = "Pièces jointes de chat"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.nom_original} ({self.type_piece}, {self.taille} octets)"
@@ -0,0 +1,176 @@
+"""
+Pièces jointes du chat (images et fichiers).
+
+La requête est reçue par PieceJointeUploadHandler : le fichier est écrit sur
+disque morceau par morceau (jamais gardé en mémoire), son empreinte SHA-256
+calculée au passage pour le stockage dédupliqué, et la réception interrompue
+dès que CHAT_PIECE_JOINTE_TAILLE_MAX est dépassée.
+
+Les images (JPEG, PNG, WebP) sont traitées par un pool de threads borné
+(CHAT_MINIATURES_WORKERS) : Pillow libère le GIL pendant le décodage et le
+redimensionnement, et le pool limite le nombre d'images décodées en même temps
+quel que soit le nombre de requêtes. Le traitement applique l'orientation EXIF,
+réenregistre l'image sans ses métadonnées (position GPS, appareil), mesure ses
+dimensions et produit une miniature JPEG ; le tout passe par des fichiers
+temporaires. Seule l'image nettoyée est stockée.
+"""
+import mimetypes
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import StopUpload
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from Auths.stockage import TemporaryHachageUploadHandler
+
+from .models import PieceJointeChat
+
+TAILLE_MAX = getattr(settings, 'CHAT_PIECE_JOINTE_TAILLE_MAX', 20 * 1024 * 1024)
+PIXELS_MAX = getattr(settings, 'CHAT_IMAGE_PIXELS_MAX', 50_000_000)
+TAILLE_MINIATURE = getattr(settings, 'CHAT_MINIATURE_TAILLE', 400)
+NB_WORKERS = getattr(settings, 'CHAT_MINIATURES_WORKERS', 2)
+DELAI_TRAITEMENT = getattr(settings, 'CHAT_MINIATURES_DELAI', 30)
+
+FORMATS_IMAGES = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+EXTENSIONS_IMAGES = {'.jpg', '.jpeg', '.png', '.webp'}
+EXTENSIONS_FICHIERS = {'.pdf', '.txt', '.csv', '.doc', '.docx', '.xls', '.xlsx', '.odt', '.ods'}
+
+
+class PieceJointeRefusee(ValueError):
+    pass
+
+
+# ==================== RÉCEPTION ====================
+
+class PieceJointeUploadHandler(TemporaryHachageUploadHandler):
+    """Reçoit le fichier sur disque et interrompt la réception au-delà de ``taille_max``"""
+
+    def __init__(self, request=None, taille_max=TAILLE_MAX):
+        super().__init__(request)
+        self.taille_max = taille_max
+        self.trop_gros = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.taille_max:
+            self.trop_gros = True
+            # Le reste du corps n'est pas lu
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+# ==================== TRAITEMENT DES IMAGES ====================
+
+_pool = None
+_verrou_pool = threading.Lock()
+
+
+def pool_images():
+    global _pool
+    with _verrou_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=NB_WORKERS, thread_name_prefix='chat-images')
+        return _pool
+
+
+def _sans_transparence(image):
+    if image.mode in ('RGB', 'L'):
+        return image
+    image = image.convert('RGBA')
+    fond = Image.new('RGB', image.size, (255, 255, 255))
+    fond.paste(image, mask=image.getchannel('A'))
+    return fond
+
+
+def traiter_image(source):
+    """
+    Image nettoyée et miniature d'une image reçue (chemin ou fichier), dans des
+    fichiers temporaires : {'format', 'image', 'miniature', 'largeur', 'hauteur'}.
+    Exécuté dans le pool : aucun accès à la base.
+    """
+    try:
+        with Image.open(source) as originale:
+            if originale.format not in FORMATS_IMAGES:
+                raise PieceJointeRefusee(f"Format d'image non pris en charge : {originale.format}")
+            if originale.width * originale.height > PIXELS_MAX:
+                raise PieceJointeRefusee("Image trop grande")
+            format_image = originale.format
+            icc_profile = originale.info.get('icc_profile')
+            # Rotation selon l'orientation EXIF ; la copie obtenue ne garde pas l'EXIF à l'enregistrement
+            image = ImageOps.exif_transpose(originale)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise PieceJointeRefusee("Image illisible") from e
+
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    if format_image == 'JPEG':
+        options['quality'] = 90
+    nettoyee = tempfile.TemporaryFile()
+    image.save(nettoyee, format=format_image, **options)
+
+    vignette = image.copy()
+    vignette.thumbnail((TAILLE_MINIATURE, TAILLE_MINIATURE))
+    miniature = tempfile.TemporaryFile()
+    _sans_transparence(vignette).save(miniature, format='JPEG', quality=80, optimize=True)
+
+    return {
+        'format': format_image,
+        'image': nettoyee,
+        'miniature': miniature,
+        'largeur': image.width,
+        'hauteur': image.height,
+    }
+
+
+# ==================== CRÉATION ====================
+
+def creer_piece_jointe(chat_room, user, fichier):
+    """
+    Enregistre le fichier reçu (traité par le pool si c'est une image) ; lève
+    PieceJointeRefusee si le type n'est pas accepté, TimeoutError si le pool ne
+    l'a pas traité à temps. Le message est rattaché à l'envoi (ecrire_message).
+    """
+    nom = os.path.basename(fichier.name or '')[:255] or 'fichier'
+    racine, extension = os.path.splitext(nom)
+    extension = extension.lower()
+    piece = PieceJointeChat(chat_room=chat_room, envoyeur=user, nom_original=nom)
+
+    if extension in EXTENSIONS_IMAGES:
+        # Chemin du fichier temporaire reçu : Pillow le relit sans copie
+        source = fichier.temporary_file_path() if hasattr(fichier, 'temporary_file_path') else fichier
+        resultat = pool_images().submit(traiter_image, source).result(timeout=DELAI_TRAITEMENT)
+        with resultat['image'] as image, resultat['miniature'] as miniature:
+            piece.type_piece = 'image'
+            piece.type_mime = Image.MIME[resultat['format']]
+            piece.largeur, piece.hauteur = resultat['largeur'], resultat['hauteur']
+            image.seek(0, os.SEEK_END)
+            piece.taille = image.tell()
+            piece.fichier.save(racine + FORMATS_IMAGES[resultat['format']], File(image), save=False)
+            piece.miniature.save(f"{racine}_miniature.jpg", File(miniature), save=False)
+            piece.save()
+        return piece
+
+    if extension not in EXTENSIONS_FICHIERS:
+        raise PieceJointeRefusee(f"Type de fichier non accepté : {extension or 'sans extension'}")
+    piece.type_piece = 'file'
+    piece.type_mime = mimetypes.guess_type(nom)[0] or 'application/octet-stream'
+    piece.taille = fichier.size
+    piece.fichier.save(nom, fichier, save=False)
+    piece.save()
+    return piece
+
+
+def serialiser_piece_jointe(piece):
+    return {
+        'id': piece.pk,
+        'type': piece.type_piece,
+        'name': piece.nom_original,
+        'content_type': piece.type_mime,
+        'size': piece.taille,
+        'width': piece.largeur,
+        'height': piece.hauteur,
+        'url': piece.fichier.url,
+        'thumbnail_url': piece.miniature.url if piece.miniature else None,
+    }
@@ -0,0 +1,125 @@
+"""
+Recherche plein texte dans l'historique local des messages (ChatMessage).
+
+L'index est créé par la migration 0006_recherche_messages et tenu à jour à
+chaque écriture : colonne tsvector générée et index GIN sous PostgreSQL
+(configuration « french » : « arrivée » trouve « arriver »), table FTS5 et
+triggers sous SQLite (accents ignorés, dernier mot cherché en préfixe). Sur
+une autre base, la recherche se rabat sur ``icontains``.
+
+SQLite : une migration qui reconstruit la table chat_chatmessage supprime les
+triggers ; les recréer (SQL de la migration 0006) après une telle migration.
+
+Les résultats sont limités aux salons de l'utilisateur (tous pour l'équipe),
+du plus récent au plus ancien, avec un extrait surligné (``<mark>``, texte
+échappé) et un curseur ``before`` sur (created_at, id) comme l'historique.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, CharField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from .historique import decoder_curseur
+from .models import ChatMessage, ChatRoom
+from .pieces_jointes import serialiser_piece_jointe
+
+TAILLE_PAGE_DEFAUT = 20
+TAILLE_PAGE_MAX = 50
+LONGUEUR_EXTRAIT = 200
+
+# Délimiteurs de surlignage : caractères de contrôle remplacés par <mark> après échappement du texte
+DEBUT, FIN = '\x02', '\x03'
+OPTIONS_EXTRAIT = (
+    f'StartSel="{DEBUT}", StopSel="{FIN}", MaxFragments=2, MinWords=5, MaxWords=20, FragmentDelimiter=" … "'
+)
+
+
+class RechercheVide(ValueError):
+    pass
+
+
+def _expression_fts5(texte):
+    """Mots cités (aucune syntaxe FTS5 exposée), tous requis, le dernier en préfixe"""
+    mots = re.findall(r'\w+', texte)
+    if not mots:
+        raise RechercheVide("Paramètre q requis")
+    return ' '.join(f'"{mot}"' for mot in mots) + '*'
+
+
+def _filtrer(messages, texte):
+    if connection.vendor == 'postgresql':
+        return messages.alias(correspond=RawSQL(
+            "chat_chatmessage.recherche @@ websearch_to_tsquery('french', %s)", [texte],
+            output_field=BooleanField(),
+        )).filter(correspond=True).annotate(extrait=RawSQL(
+            "ts_headline('french', chat_chatmessage.message, websearch_to_tsquery('french', %s), %s)",
+            [texte, OPTIONS_EXTRAIT], output_field=CharField(),
+        ))
+
+    if connection.vendor == 'sqlite':
+        expression = _expression_fts5(texte)
+        return messages.filter(id__in=RawSQL(
+            "SELECT rowid FROM chat_chatmessage_fts WHERE chat_chatmessage_fts MATCH %s", [expression]
+        )).annotate(extrait=RawSQL(
+            "SELECT snippet(chat_chatmessage_fts, 0, char(2), char(3), '…', 16) FROM chat_chatmessage_fts "
+            "WHERE chat_chatmessage_fts MATCH %s AND rowid = chat_chatmessage.id", [expression],
+            output_field=CharField(),
+        ))
+
+    return messages.filter(message__icontains=texte)
+
+
+def rechercher(user, texte, chat_room_id=None, limite=TAILLE_PAGE_DEFAUT, avant=None):
+    """
+    Messages correspondant à ``texte`` dans les salons de ``user`` (tous pour
+    l'équipe), éventuellement restreints au salon Supabase ``chat_room_id``.
+    Retourne (messages, il_en_reste), du plus récent au plus ancien.
+    """
+    texte = (texte or '').strip()
+    if not texte:
+        raise RechercheVide("Paramètre q requis")
+    limite = max(1, min(int(limite), TAILLE_PAGE_MAX))
+
+    messages = ChatMessage.objects.select_related('chat_room', 'sender', 'piece_jointe')
+    if not user.is_staff:
+        messages = messages.filter(chat_room__in=ChatRoom.objects.filter(Q(user=user) | Q(host=user)))
+    if chat_room_id:
+        messages = messages.filter(chat_room__supabase_id=chat_room_id)
+    if avant:
+        date, pk = decoder_curseur(avant)
+        messages = messages.filter(Q(created_at__lt=date) | Q(created_at=date, id__lt=pk))
+
+    page = list(_filtrer(messages, texte).order_by('-created_at', '-id')[:limite + 1])
+    return page[:limite], len(page) > limite
+
+
+def extrait(message):
+    """Extrait surligné, HTML échappé"""
+    brut = getattr(message, 'extrait', None)
+    if not brut:
+        brut = message.message[:LONGUEUR_EXTRAIT]
+    return escape(brut).replace(DEBUT, '<mark>').replace(FIN, '</mark>')
+
+
+def serialiser_resultats(messages):
+    resultat = []
+    for message in messages:
+        sender = message.sender
+        piece_jointe = getattr(message, 'piece_jointe', None)
+        resultat.append({
+            'id': message.supabase_id or str(message.pk),
+            'local_id': message.pk,
+            'chat_room_id': message.chat_room.supabase_id,
+            'sender_id': message.sender_id,
+            'sender_name': (
+                (f"{sender.first_name} {sender.last_name}".strip() or sender.username) if sender else 'Système'
+            ),
+            'message': message.message,
+            'message_type': message.message_type,
+            'created_at': message.created_at.isoformat(),
+            'snippet': extrait(message),
+            'attachment': serialiser_piece_jointe(piece_jointe) if piece_jointe else None,
+        })
+    return resultat
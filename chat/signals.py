@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from reservation.models import Reservation
-from .models import ChatRoom
+from Auths.stockage import liberer_fichiers
+from reservation.models import Bien, Media, Reservation
+from .models import CHAMPS_FICHIERS_PIECE_JOINTE, ChatRoom, PieceJointeChat
+from . import boite_reception, historique
+from .acces import invalider_salons
+from . import temps_reel
 from .supabase_service import chat_supabase_service
 import logging
 
@@ -37,6 +41,8 @@ def create_chat_room_on_reservation(sender, instance, created, **kwargs):
                     property_name=instance.bien.nom,
                     status='active'
                 )
+                if result.get('welcome_message'):
+                    historique.ecrire_message_bienvenue(chat_room, result['welcome_message'])
                 
                 logger.info(f"Chat créé pour réservation {instance.id}: {chat_room.id}")
                 
@@ -44,4 +50,56 @@ def create_chat_room_on_reservation(sender, instance, created, **kwargs):
                 logger.error(f"Échec création chat réservation {instance.id}: {result.get('error')}")
                 
         except Exception as e:
-            logger.error(f"Erreur création chat réservation {instance.id}: {str(e)}")
\ No newline at end of file
+            logger.error(f"Erreur création chat réservation {instance.id}: {str(e)}")
+
+@receiver(post_save, sender=ChatRoom)
+def create_participants_on_chat_room(sender, instance, created, **kwargs):
+    """
+    Crée les filigranes de lecture et la boîte de réception du client et de l'hôte
+    """
+    if created:
+        boite_reception.synchroniser_participants(instance)
+        if instance.supabase_id:
+            temps_reel.publier_nouveau_salon(instance)
+
+@receiver(post_save, sender=ChatRoom)
+@receiver(post_delete, sender=ChatRoom)
+def invalidate_chat_access(sender, instance, **kwargs):
+    """
+    Les salons autorisés du client et de l'hôte sont relus au prochain accès
+    """
+    invalider_salons(instance.user_id, instance.host_id)
+
+# ============================================================================
+# PROJECTION DE LA BOÎTE DE RÉCEPTION (voir chat/boite_reception.py)
+# ============================================================================
+@receiver(post_save, sender=Reservation)
+def update_inbox_on_reservation(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not {'status', 'date_debut', 'date_fin'} & set(update_fields):
+        return
+    if boite_reception.mettre_a_jour_reservation(instance):
+        chat_room_id = (
+            ChatRoom.objects.filter(reservation_id=instance.pk).values_list('supabase_id', flat=True).first()
+        )
+        if chat_room_id:
+            temps_reel.publier_statut_reservation(chat_room_id, instance)
+
+@receiver(post_save, sender=Bien)
+def update_inbox_on_bien(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'nom' not in update_fields):
+        return
+    boite_reception.mettre_a_jour_nom_bien(instance)
+
+@receiver(post_save, sender=Media)
+@receiver(post_delete, sender=Media)
+def update_inbox_on_media(sender, instance, **kwargs):
+    boite_reception.mettre_a_jour_image_bien(instance.bien_id)
+
+# ============================================================================
+# PIÈCES JOINTES (stockage dédupliqué, voir Auths/stockage.py)
+# ============================================================================
+@receiver(post_delete, sender=PieceJointeChat)
+def release_attachment_files(sender, instance, **kwargs):
+    liberer_fichiers(instance, CHAMPS_FICHIERS_PIECE_JOINTE)
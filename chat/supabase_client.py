@@ -0,0 +1,244 @@
+"""
+Accès bas niveau à Supabase pour le chat.
+
+Le client Supabase est créé à la première utilisation (et non plus à l'import,
+donc après le fork des workers gunicorn) sur une connexion HTTP partagée : un
+pool httpx avec des délais courts. Chaque appel passe par
+``ClientSupabase.executer`` :
+
+- nouvelles tentatives bornées, avec attente aléatoire (jitter) et un budget
+  de temps total par appel ; une écriture non idempotente n'est rejouée que si
+  la requête n'a pas pu partir (connexion refusée, pool saturé) ;
+- disjoncteur : après plusieurs échecs consécutifs, les appels échouent
+  immédiatement (SupabaseIndisponible) pendant une pause, puis un seul appel
+  d'essai décide de la reprise ;
+- mesures par opération (appels, erreurs, latence cumulée et maximale),
+  consultables via ``metriques()``.
+
+``SUPABASE_BACKEND = 'memoire'`` remplace Supabase par une implémentation en
+mémoire (chat/supabase_memoire.py) pour tester les vues de chat en charge
+sans réseau.
+"""
+import logging
+import random
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseIndisponible(Exception):
+    """Disjoncteur ouvert : Supabase n'est pas appelé"""
+
+
+# ==================== DISJONCTEUR ====================
+
+class Disjoncteur:
+    FERME = 'ferme'
+    OUVERT = 'ouvert'
+    SEMI_OUVERT = 'semi_ouvert'
+
+    def __init__(self, seuil, pause):
+        self.seuil = seuil
+        self.pause = pause
+        self.etat = self.FERME
+        self.echecs = 0
+        self.ouvert_le = None
+        self._essai_en_cours = False
+        self._verrou = threading.Lock()
+
+    def autoriser(self):
+        with self._verrou:
+            if self.etat == self.FERME:
+                return True
+            if self.etat == self.OUVERT and time.monotonic() - self.ouvert_le >= self.pause:
+                self.etat = self.SEMI_OUVERT
+            if self.etat == self.SEMI_OUVERT and not self._essai_en_cours:
+                # Un seul appel d'essai à la fois
+                self._essai_en_cours = True
+                return True
+            return False
+
+    def succes(self):
+        with self._verrou:
+            if self.etat != self.FERME:
+                logger.info("Supabase de nouveau joignable : disjoncteur refermé")
+            self.etat = self.FERME
+            self.echecs = 0
+            self._essai_en_cours = False
+
+    def echec(self):
+        with self._verrou:
+            self.echecs += 1
+            self._essai_en_cours = False
+            if self.etat == self.SEMI_OUVERT or self.echecs >= self.seuil:
+                if self.etat != self.OUVERT:
+                    logger.warning(
+                        f"Supabase indisponible ({self.echecs} échec(s)) : disjoncteur ouvert pour {self.pause}s"
+                    )
+                self.etat = self.OUVERT
+                self.ouvert_le = time.monotonic()
+
+    def statut(self):
+        return {'etat': self.etat, 'echecs_consecutifs': self.echecs}
+
+
+# ==================== MESURES ====================
+
+class Metriques:
+    def __init__(self):
+        self._operations = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, operation, duree_ms, erreur=None, tentatives=1):
+        with self._verrou:
+            stats = self._operations.setdefault(operation, {
+                'appels': 0, 'erreurs': 0, 'tentatives': 0,
+                'latence_totale_ms': 0.0, 'latence_max_ms': 0.0, 'derniere_erreur': None,
+            })
+            stats['appels'] += 1
+            stats['tentatives'] += tentatives
+            stats['latence_totale_ms'] += duree_ms
+            stats['latence_max_ms'] = max(stats['latence_max_ms'], duree_ms)
+            if erreur is not None:
+                stats['erreurs'] += 1
+                stats['derniere_erreur'] = erreur
+
+    def instantane(self):
+        with self._verrou:
+            return {
+                operation: {
+                    **stats,
+                    'latence_moyenne_ms': round(stats['latence_totale_ms'] / stats['appels'], 1),
+                    'latence_totale_ms': round(stats['latence_totale_ms'], 1),
+                    'latence_max_ms': round(stats['latence_max_ms'], 1),
+                }
+                for operation, stats in self._operations.items()
+            }
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._operations.clear()
+
+
+# ==================== CLIENT ====================
+
+def _panne_serveur(erreur):
+    """Erreur due à l'indisponibilité de Supabase (et non à la requête elle-même) ?"""
+    if isinstance(erreur, httpx.TransportError):
+        return True
+    # Réponse non JSON d'une passerelle (502, 503, 504...) : code HTTP numérique
+    return isinstance(erreur, APIError) and isinstance(erreur.code, int) and erreur.code >= 500
+
+
+def _rejouable(erreur, idempotent):
+    if isinstance(erreur, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        # La requête n'est pas partie : rejouable même pour une insertion
+        return True
+    return idempotent and _panne_serveur(erreur)
+
+
+class ClientSupabase:
+    def __init__(self):
+        self._client = None
+        self._verrou = threading.Lock()
+        self.disjoncteur = Disjoncteur(
+            settings.SUPABASE_DISJONCTEUR_SEUIL, settings.SUPABASE_DISJONCTEUR_PAUSE
+        )
+        self.metriques = Metriques()
+
+    @property
+    def supabase(self):
+        """Client Supabase (ou en mémoire), créé au premier appel"""
+        if self._client is None:
+            with self._verrou:
+                if self._client is None:
+                    self._client = self._creer_client()
+        return self._client
+
+    def _creer_client(self):
+        if settings.SUPABASE_BACKEND == 'memoire':
+            from .supabase_memoire import SupabaseMemoire
+
+            logger.info("Chat : Supabase remplacé par le stockage en mémoire")
+            return SupabaseMemoire(latence_ms=settings.SUPABASE_MEMOIRE_LATENCE_MS)
+
+        from supabase import ClientOptions, create_client
+
+        # Connexion partagée par toutes les requêtes PostgREST du worker
+        http = httpx.Client(
+            timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_TIMEOUT_CONNEXION),
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_POOL_CONNEXIONS,
+                max_keepalive_connections=settings.SUPABASE_POOL_CONNEXIONS,
+            ),
+            follow_redirects=True,
+            http2=True,
+        )
+        return create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_SERVICE_KEY,
+            options=ClientOptions(httpx_client=http, postgrest_client_timeout=settings.SUPABASE_TIMEOUT),
+        )
+
+    def executer(self, operation, requete, idempotent=True):
+        """
+        Exécute ``requete(supabase).execute()`` avec nouvelles tentatives et
+        disjoncteur ; ``operation`` nomme l'appel dans les mesures. Lève
+        SupabaseIndisponible si le disjoncteur est ouvert, sinon la dernière
+        erreur rencontrée.
+        """
+        if not self.disjoncteur.autoriser():
+            self.metriques.enregistrer(operation, 0.0, 'disjoncteur ouvert', tentatives=0)
+            raise SupabaseIndisponible("Supabase indisponible (disjoncteur ouvert)")
+
+        debut = time.monotonic()
+        echeance = debut + settings.SUPABASE_BUDGET
+        tentative = 0
+        while True:
+            tentative += 1
+            try:
+                resultat = requete(self.supabase).execute()
+            except Exception as e:
+                attente = random.uniform(0, min(
+                    settings.SUPABASE_ATTENTE_MAX, settings.SUPABASE_ATTENTE_BASE * 2 ** (tentative - 1)
+                ))
+                if (
+                    tentative < settings.SUPABASE_TENTATIVES
+                    and _rejouable(e, idempotent)
+                    and time.monotonic() + attente < echeance
+                ):
+                    logger.info(f"Supabase {operation} : tentative {tentative} échouée ({e}), nouvel essai")
+                    time.sleep(attente)
+                    continue
+
+                duree_ms = (time.monotonic() - debut) * 1000
+                self.metriques.enregistrer(operation, duree_ms, str(e) or e.__class__.__name__, tentative)
+                if _panne_serveur(e):
+                    self.disjoncteur.echec()
+                else:
+                    # Requête refusée par PostgREST : Supabase répond, le circuit reste fermé
+                    self.disjoncteur.succes()
+                raise
+
+            duree_ms = (time.monotonic() - debut) * 1000
+            self.metriques.enregistrer(operation, duree_ms, tentatives=tentative)
+            self.disjoncteur.succes()
+            if duree_ms > settings.SUPABASE_APPEL_LENT_MS:
+                logger.warning(f"Supabase {operation} lent : {duree_ms:.0f} ms ({tentative} tentative(s))")
+            return resultat
+
+    def statut(self):
+        return {
+            'backend': settings.SUPABASE_BACKEND,
+            'disjoncteur': self.disjoncteur.statut(),
+            'operations': self.metriques.instantane(),
+        }
+
+
+# Instance globale (le client HTTP est créé au premier appel)
+client_supabase = ClientSupabase()
@@ -0,0 +1,162 @@
+"""
+Supabase en mémoire pour le chat (SUPABASE_BACKEND = 'memoire').
+
+Reproduit le sous-ensemble du constructeur de requêtes PostgREST utilisé par
+ChatSupabaseService (insert / update / upsert / select, filtres eq, in_, or_ et gte,
+order, limit, range) sur des tables en mémoire, par processus. Sert à tester
+les vues de chat et à les charger hors ligne ; une latence simulée
+(SUPABASE_MEMOIRE_LATENCE_MS) approche le coût d'un aller-retour réseau.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime
+
+
+class ReponseMemoire:
+    def __init__(self, data):
+        self.data = data
+        self.count = None
+
+
+def _comparable(valeur):
+    # Les identifiants arrivent en chaîne dans les filtres or_()
+    return str(valeur) if valeur is not None else None
+
+
+class RequeteMemoire:
+    def __init__(self, base, table):
+        self._base = base
+        self._table = table
+        self._action = 'select'
+        self._donnees = None
+        self._conflit = None
+        self._filtres = []
+        self._tri = []
+        self._debut = 0
+        self._limite = None
+
+    # ---------- actions ----------
+
+    def select(self, *colonnes, **kwargs):
+        self._action = 'select'
+        return self
+
+    def insert(self, donnees, **kwargs):
+        self._action, self._donnees = 'insert', donnees
+        return self
+
+    def update(self, donnees, **kwargs):
+        self._action, self._donnees = 'update', donnees
+        return self
+
+    def upsert(self, donnees, on_conflict='id', **kwargs):
+        self._action, self._donnees = 'upsert', donnees
+        self._conflit = [colonne.strip() for colonne in on_conflict.split(',')]
+        return self
+
+    # ---------- filtres ----------
+
+    def eq(self, colonne, valeur):
+        self._filtres.append(lambda ligne: _comparable(ligne.get(colonne)) == _comparable(valeur))
+        return self
+
+    def in_(self, colonne, valeurs):
+        valeurs = {_comparable(valeur) for valeur in valeurs}
+        self._filtres.append(lambda ligne: _comparable(ligne.get(colonne)) in valeurs)
+        return self
+
+    def gte(self, colonne, valeur):
+        self._filtres.append(lambda ligne: ligne.get(colonne) is not None and ligne[colonne] >= valeur)
+        return self
+
+    def or_(self, filtres, **kwargs):
+        # Seule la forme « col.eq.valeur,col.eq.valeur » est utilisée
+        conditions = [condition.split('.', 2) for condition in filtres.split(',')]
+        self._filtres.append(lambda ligne: any(
+            _comparable(ligne.get(colonne)) == valeur for colonne, _, valeur in conditions
+        ))
+        return self
+
+    def order(self, colonne, desc=False, **kwargs):
+        self._tri.append((colonne, desc))
+        return self
+
+    def limit(self, nombre, **kwargs):
+        self._limite = nombre
+        return self
+
+    def range(self, debut, fin, **kwargs):
+        self._debut, self._limite = debut, fin - debut + 1
+        return self
+
+    # ---------- exécution ----------
+
+    def _selection(self, lignes):
+        return [ligne for ligne in lignes if all(filtre(ligne) for filtre in self._filtres)]
+
+    def execute(self):
+        self._base.simuler_latence()
+        with self._base.verrou:
+            lignes = self._base.tables.setdefault(self._table, [])
+
+            if self._action == 'insert':
+                nouvelles = [self._base.nouvelle_ligne(donnees) for donnees in self._liste()]
+                lignes.extend(nouvelles)
+                return ReponseMemoire([dict(ligne) for ligne in nouvelles])
+
+            if self._action == 'update':
+                modifiees = self._selection(lignes)
+                for ligne in modifiees:
+                    ligne.update(self._donnees)
+                return ReponseMemoire([dict(ligne) for ligne in modifiees])
+
+            if self._action == 'upsert':
+                resultat = []
+                for donnees in self._liste():
+                    existante = next((
+                        ligne for ligne in lignes
+                        if all(_comparable(ligne.get(c)) == _comparable(donnees.get(c)) for c in self._conflit)
+                    ), None)
+                    if existante is None:
+                        existante = self._base.nouvelle_ligne(donnees)
+                        lignes.append(existante)
+                    else:
+                        existante.update(donnees)
+                    resultat.append(dict(existante))
+                return ReponseMemoire(resultat)
+
+            selection = self._selection(lignes)
+            for colonne, desc in reversed(self._tri):
+                selection.sort(
+                    key=lambda ligne: (ligne.get(colonne) is None, _comparable(ligne.get(colonne)) or ''),
+                    reverse=desc,
+                )
+            fin = None if self._limite is None else self._debut + self._limite
+            return ReponseMemoire([dict(ligne) for ligne in selection[self._debut:fin]])
+
+    def _liste(self):
+        return self._donnees if isinstance(self._donnees, list) else [self._donnees]
+
+
+class SupabaseMemoire:
+    def __init__(self, latence_ms=0):
+        self.latence_ms = latence_ms
+        self.tables = {}
+        self.verrou = threading.Lock()
+
+    def table(self, nom):
+        return RequeteMemoire(self, nom)
+
+    from_ = table
+
+    def nouvelle_ligne(self, donnees):
+        return {'id': str(uuid.uuid4()), 'created_at': datetime.utcnow().isoformat(), **donnees}
+
+    def simuler_latence(self):
+        if self.latence_ms:
+            time.sleep(self.latence_ms / 1000)
+
+    def vider(self):
+        with self.verrou:
+            self.tables.clear()
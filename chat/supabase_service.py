@@ -1,17 +1,17 @@
-from supabase import create_client
-from django.conf import settings
 import logging
 from datetime import datetime
-from .models import ChatRoom
+from .supabase_client import client_supabase
 
 logger = logging.getLogger(__name__)
 
 class ChatSupabaseService:
-    def __init__(self):
-        self.supabase = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_KEY
-        )
+    def __init__(self, client=None):
+        # Nouvelles tentatives, disjoncteur et mesures : voir chat/supabase_client.py
+        self.client = client or client_supabase
+    
+    @property
+    def supabase(self):
+        return self.client.supabase
     
     def create_chat_room(self, reservation_id, user_id, host_id, property_name):
         """
@@ -30,19 +30,22 @@ class ChatSupabaseService:
             }
             
             # Créer dans Supabase
-            result = self.supabase.table('chat_rooms').insert(chat_room_data).execute()
+            result = self.client.executer(
+                'chat_rooms.insert', lambda sb: sb.table('chat_rooms').insert(chat_room_data), idempotent=False
+            )
             
             if result.data:
                 supabase_room = result.data[0]
                 logger.info(f"Chat room créée dans Supabase: {supabase_room['id']}")
                 
-                # Envoyer message de bienvenue
-                self.send_welcome_message(supabase_room['id'], property_name)
+                # Envoyer message de bienvenue (ligne insérée, recopiée localement par l'appelant)
+                welcome_message = self.send_welcome_message(supabase_room['id'], property_name)
                 
                 return {
                     'success': True,
                     'supabase_id': supabase_room['id'],
-                    'data': supabase_room
+                    'data': supabase_room,
+                    'welcome_message': welcome_message
                 }
             else:
                 logger.error("Aucune donnée retournée de Supabase")
@@ -54,7 +57,7 @@ class ChatSupabaseService:
     
     def send_welcome_message(self, chat_room_id, property_name):
         """
-        Envoie un message de bienvenue automatique
+        Envoie un message de bienvenue automatique ; retourne la ligne insérée (None en cas d'échec)
         """
         try:
             welcome_message = {
@@ -66,16 +69,18 @@ class ChatSupabaseService:
                 'is_read': False
             }
             
-            result = self.supabase.table('chat_messages').insert(welcome_message).execute()
+            result = self.client.executer(
+                'chat_messages.insert', lambda sb: sb.table('chat_messages').insert(welcome_message), idempotent=False
+            )
             
             if result.data:
                 logger.info(f"Message de bienvenue envoyé: {chat_room_id}")
-                return True
-            return False
+                return result.data[0]
+            return None
             
         except Exception as e:
             logger.error(f"Erreur envoi message bienvenue: {str(e)}")
-            return False
+            return None
     
     def send_message(self, chat_room_id, sender_id, message, message_type='text'):
         """
@@ -91,12 +96,14 @@ class ChatSupabaseService:
                 'is_read': False
             }
             
-            result = self.supabase.table('chat_messages').insert(message_data).execute()
+            result = self.client.executer(
+                'chat_messages.insert', lambda sb: sb.table('chat_messages').insert(message_data), idempotent=False
+            )
             
             # Mettre à jour le timestamp de la room
-            self.supabase.table('chat_rooms').update({
+            self.client.executer('chat_rooms.update', lambda sb: sb.table('chat_rooms').update({
                 'last_message_at': datetime.utcnow().isoformat()
-            }).eq('id', chat_room_id).execute()
+            }).eq('id', chat_room_id))
             
             if result.data:
                 return {
@@ -115,9 +122,9 @@ class ChatSupabaseService:
         Récupère les rooms de chat d'un utilisateur
         """
         try:
-            result = self.supabase.table('chat_rooms').select('*').or_(
+            result = self.client.executer('chat_rooms.select', lambda sb: sb.table('chat_rooms').select('*').or_(
                 f'user_id.eq.{user_id},host_id.eq.{user_id}'
-            ).order('last_message_at', desc=True).execute()
+            ).order('last_message_at', desc=True))
             
             return {
                 'success': True,
@@ -133,9 +140,9 @@ class ChatSupabaseService:
         Récupère les messages d'une room
         """
         try:
-            result = self.supabase.table('chat_messages').select('*').eq(
+            result = self.client.executer('chat_messages.select', lambda sb: sb.table('chat_messages').select('*').eq(
                 'chat_room_id', chat_room_id
-            ).order('created_at', desc=True).limit(limit).execute()
+            ).order('created_at', desc=True).limit(limit))
             
             return {
                 'success': True,
@@ -146,61 +153,87 @@ class ChatSupabaseService:
             logger.error(f"Erreur récupération messages: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def mark_messages_as_read(self, chat_room_id, user_id):
+    def list_messages_since(self, chat_room_id, since=None, offset=0, limit=500):
         """
-        Marque tous les messages non lus d'une conversation comme lus pour un utilisateur
+        Page de messages d'une room par ordre chronologique, à partir de ``since``
+        (inclus) ; utilisé pour compléter la copie locale
         """
         try:
-            result = self.supabase.table('chat_messages').update({
-                'is_read': True
-            }).eq('chat_room_id', chat_room_id).neq('sender_id', user_id).eq('is_read', False).execute()
+            def requete(sb):
+                query = sb.table('chat_messages').select('*').eq('chat_room_id', chat_room_id)
+                if since:
+                    query = query.gte('created_at', since)
+                return query.order('created_at').order('id').range(offset, offset + limit - 1)
+            
+            result = self.client.executer('chat_messages.sync', requete)
             
-            if result.data:
-                logger.info(f"Messages marqués comme lus: {len(result.data)} messages")
-                return {
-                    'success': True,
-                    'messages_updated': len(result.data)
-                }
             return {
                 'success': True,
-                'messages_updated': 0
+                'data': result.data or []
             }
             
         except Exception as e:
-            logger.error(f"Erreur marquage messages lus: {str(e)}")
+            logger.error(f"Erreur synchronisation messages: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def get_unread_count(self, user_id):
+    def list_unread_messages(self, chat_room_ids, offset=0, limit=1000):
         """
-        Récupère le nombre de messages non lus pour un utilisateur
+        Page des messages encore marqués ``is_read = false`` d'un lot de rooms
+        (état de lecture antérieur aux filigranes)
         """
         try:
-            # Récupérer toutes les rooms de l'utilisateur
-            user_rooms = self.get_chat_rooms_for_user(user_id)
-            if not user_rooms['success']:
-                return {'success': False, 'error': 'Erreur récupération rooms'}
-            
-            total_unread = 0
-            room_unread = {}
-            
-            for room in user_rooms['data']:
-                # Compter les messages non lus dans chaque room (pas envoyés par l'utilisateur)
-                result = self.supabase.table('chat_messages').select('id').eq(
-                    'chat_room_id', room['id']
-                ).neq('sender_id', user_id).eq('is_read', False).execute()
-                
-                unread_count = len(result.data) if result.data else 0
-                room_unread[room['id']] = unread_count
-                total_unread += unread_count
-            
+            result = self.client.executer('chat_messages.unread', lambda sb: sb.table('chat_messages').select(
+                'id,chat_room_id,sender_id'
+            ).in_('chat_room_id', list(chat_room_ids)).eq('is_read', False).order('id').range(
+                offset, offset + limit - 1
+            ))
+    
             return {
                 'success': True,
-                'total_unread': total_unread,
-                'room_unread': room_unread
+                'data': result.data or []
             }
+    
+        except Exception as e:
+            logger.error(f"Erreur récupération messages non lus: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def ping(self, table='chat_rooms'):
+        """
+        Lecture minimale d'une table (diagnostic) ; lève l'erreur rencontrée
+        """
+        return self.client.executer(f'{table}.ping', lambda sb: sb.table(table).select('id').limit(1))
+    
+    def upsert_read_watermark(self, chat_room_id, user_id, last_read_message_id, last_read_at):
+        """
+        Recopie le filigrane de lecture d'un participant dans Supabase (une ligne
+        par salon et utilisateur ; la table ``chat_read_watermarks`` doit avoir
+        une contrainte unique sur (chat_room_id, user_id) : docs/supabase_chat_read_watermarks.sql)
+        """
+        try:
+            self.client.executer('chat_read_watermarks.upsert', lambda sb: sb.table('chat_read_watermarks').upsert({
+                'chat_room_id': chat_room_id,
+                'user_id': user_id,
+                'last_read_message_id': last_read_message_id,
+                'last_read_at': last_read_at.isoformat(),
+            }, on_conflict='chat_room_id,user_id'))
+            return {'success': True}
+            
+        except Exception as e:
+            logger.error(f"Erreur recopie filigrane de lecture: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def update_rooms_status(self, chat_room_ids, status):
+        """
+        Change le statut d'un lot de rooms en un appel (cycle de vie des salons)
+        """
+        try:
+            self.client.executer('chat_rooms.update_status', lambda sb: sb.table('chat_rooms').update({
+                'status': status
+            }).in_('id', list(chat_room_ids)))
+            return {'success': True}
             
         except Exception as e:
-            logger.error(f"Erreur comptage messages non lus: {str(e)}")
+            logger.error(f"Erreur changement de statut des rooms: {str(e)}")
             return {'success': False, 'error': str(e)}
 
 # Instance globale
@@ -0,0 +1,121 @@
+"""
+Synchronisation différentielle pour l'application mobile.
+
+``GET /api/chat/sync/?since=<jeton>`` renvoie en un appel ce qui a changé
+depuis le jeton : conversations ayant reçu des messages, été lues, fermées ou
+archivées, nouveaux messages de ces conversations, réservations modifiées
+(comme client ou comme hôte), favoris et compteurs de non lus. Sans jeton,
+l'état complet est renvoyé (hors historique des messages, lu avec
+ChatMessagesView, et hors salons archivés).
+
+Le jeton encode l'heure du serveur (jamais décroissante d'un jeton au suivant)
+et l'empreinte des favoris, ce qui détecte aussi les retraits sans table de
+suppressions. Les requêtes portent sur les index updated_at / created_at /
+dernier_message_le et relisent MARGE avant le jeton : une écriture horodatée
+avant la lecture précédente mais validée après n'est pas perdue, le client
+fusionne donc les éléments par identifiant.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+from reservation.favoris import empreinte_favoris, favoris_ids_requete
+from reservation.models import Favori, Reservation
+from reservation.serializers import FavoriListSerializer, ReservationListSerializer
+
+from .boite_reception import conversations, serialiser_conversation
+from .historique import encoder_curseur, messages_depuis, serialiser_messages
+from .lecture import compter_non_lus
+
+VERSION_JETON = 1
+MARGE = timedelta(seconds=5)
+_EPOQUE = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class JetonInvalide(ValueError):
+    pass
+
+
+def encoder_jeton(date, empreinte):
+    micro = (date - _EPOQUE) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(f"{VERSION_JETON}|{micro}|{empreinte}".encode()).decode()
+
+
+def decoder_jeton(jeton):
+    try:
+        version, micro, empreinte = base64.urlsafe_b64decode(jeton.encode()).decode().split('|')
+        if int(version) != VERSION_JETON:
+            raise ValueError(jeton)
+        return _EPOQUE + timedelta(microseconds=int(micro)), int(empreinte)
+    except (ValueError, UnicodeDecodeError, OverflowError) as e:
+        raise JetonInvalide("Jeton de synchronisation invalide") from e
+
+
+def _messages(participants, depuis, user):
+    messages = {}
+    for participant in participants:
+        if participant.dernier_message_le <= depuis:
+            # Conversation seulement lue depuis le jeton
+            continue
+        chat_room = participant.chat_room
+        page, il_en_reste = messages_depuis(chat_room, depuis)
+        if page:
+            messages[chat_room.supabase_id] = {
+                'data': serialiser_messages(page, chat_room, user),
+                'has_more': il_en_reste,
+                'before': encoder_curseur(page[0]),
+            }
+    return messages
+
+
+def synchroniser(request, jeton=None):
+    """Changements depuis ``jeton`` (état complet si None) et nouveau jeton"""
+    user = request.user
+    maintenant = timezone.now()
+    depuis = empreinte = None
+    if jeton:
+        date_jeton, empreinte = decoder_jeton(jeton)
+        depuis = date_jeton - MARGE
+        maintenant = max(maintenant, date_jeton)
+
+    favoris = favoris_ids_requete(request)
+    nouvelle_empreinte = empreinte_favoris(favoris)
+    contexte = {'request': request}
+
+    if depuis:
+        # Salons fermés ou archivés depuis le jeton : renvoyés avec leur statut (le client retire les archivés)
+        participants = conversations(user, archives=None).filter(
+            Q(dernier_message_le__gt=depuis) | Q(lu_le__gt=depuis) | Q(chat_room__statut_modifie_le__gt=depuis)
+        )
+    else:
+        participants = conversations(user)
+    participants = list(participants)
+
+    reservations = Reservation.objects.filter(Q(user=user) | Q(bien__owner=user))
+    if depuis:
+        reservations = reservations.filter(updated_at__gt=depuis)
+    reservations = reservations.select_related('user', 'bien__owner', 'bien__ville')
+
+    donnees_favoris = None
+    if depuis is None or empreinte != nouvelle_empreinte:
+        ajouts = Favori.objects.filter(user=user).select_related('bien__ville').prefetch_related('bien__tarifs')
+        if depuis:
+            ajouts = ajouts.filter(created_at__gt=depuis)
+        donnees_favoris = {
+            # Liste complète des biens favoris (le client en déduit les retraits) et détail des ajouts
+            'ids': sorted(favoris),
+            'ajouts': FavoriListSerializer(ajouts, many=True, context=contexte).data,
+        }
+
+    return {
+        'success': True,
+        'token': encoder_jeton(maintenant, nouvelle_empreinte),
+        'full': depuis is None,
+        'rooms': [serialiser_conversation(participant, request, favoris) for participant in participants],
+        'messages': _messages(participants, depuis, user) if depuis else {},
+        'reservations': ReservationListSerializer(reservations, many=True, context=contexte).data,
+        'favoris': donnees_favoris,
+        'unread': compter_non_lus(user),
+    }
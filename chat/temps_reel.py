@@ -0,0 +1,118 @@
+"""
+Événements temps réel du chat (publication).
+
+Le code Django (vues, signaux) publie des événements sur des canaux
+``salon:<id Supabase>`` ou ``utilisateur:<id>`` ; le hub WebSocket
+(chat/websocket.py) les pousse aux connexions abonnées. La publication a lieu
+après le commit de la transaction courante :
+
+- avec CHAT_TEMPS_REEL_REDIS_URL (par défaut REDIS_URL), l'événement passe par
+  le canal Redis ``CANAL_REDIS`` et atteint les hubs de tous les processus
+  (workers gunicorn qui publient, serveurs ASGI qui diffusent) ;
+- sans Redis, il n'est remis qu'au hub du processus courant (serveur ASGI
+  servant à la fois l'API et les WebSockets).
+
+Les clients abonnés aux ``postgres_changes`` Supabase continuent de
+fonctionner : ce transport s'y ajoute.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CANAL_REDIS = 'babiloc:chat:temps_reel'
+
+_redis = None
+
+
+def canal_salon(chat_room_id):
+    return f"salon:{chat_room_id}"
+
+
+def canal_utilisateur(user_id):
+    return f"utilisateur:{user_id}"
+
+
+def _client_redis():
+    global _redis
+    if _redis is None:
+        import redis
+
+        _redis = redis.Redis.from_url(settings.CHAT_TEMPS_REEL_REDIS_URL, socket_timeout=2)
+    return _redis
+
+
+def _envoyer(charge):
+    if settings.CHAT_TEMPS_REEL_REDIS_URL:
+        try:
+            _client_redis().publish(CANAL_REDIS, charge)
+        except Exception as e:
+            logger.error(f"Erreur publication temps réel: {str(e)}")
+        return
+
+    from .websocket import hub
+
+    hub.depuis_thread(charge)
+
+
+def publier(canal, evenement):
+    """Publie ``evenement`` (dict sérialisable) sur ``canal`` après le commit"""
+    # Canal en première ligne : le hub diffuse le JSON tel quel, sans le relire
+    charge = f"{canal}\n{json.dumps(evenement, cls=DjangoJSONEncoder)}"
+    transaction.on_commit(lambda: _envoyer(charge))
+
+
+# ==================== ÉVÉNEMENTS ====================
+
+def publier_message(chat_room, message):
+    from .pieces_jointes import serialiser_piece_jointe
+
+    piece_jointe = getattr(message, 'piece_jointe', None)
+    publier(canal_salon(chat_room.supabase_id), {
+        'type': 'message',
+        'room': chat_room.supabase_id,
+        'data': {
+            'id': message.supabase_id or str(message.pk),
+            'chat_room_id': chat_room.supabase_id,
+            'sender_id': message.sender_id,
+            'message': message.message,
+            'message_type': message.message_type,
+            'created_at': message.created_at,
+            'attachment': serialiser_piece_jointe(piece_jointe) if piece_jointe else None,
+        },
+    })
+
+
+def publier_lecture(chat_room_id, user_id, dernier_message_id, lu_le):
+    publier(canal_salon(chat_room_id), {
+        'type': 'read',
+        'room': chat_room_id,
+        'user_id': user_id,
+        'last_read_message_id': dernier_message_id,
+        'read_at': lu_le,
+    })
+
+
+def publier_statut_reservation(chat_room_id, reservation):
+    publier(canal_salon(chat_room_id), {
+        'type': 'reservation',
+        'room': chat_room_id,
+        'reservation_id': reservation.pk,
+        'status': reservation.status,
+        'check_in': reservation.date_debut,
+        'check_out': reservation.date_fin,
+    })
+
+
+def publier_nouveau_salon(chat_room):
+    # Le hub abonne les connexions ouvertes des deux participants au nouveau salon
+    for user_id in {chat_room.user_id, chat_room.host_id}:
+        publier(canal_utilisateur(user_id), {
+            'type': 'room_created',
+            'room': chat_room.supabase_id,
+            'reservation_id': chat_room.reservation_id,
+        })
@@ -3,9 +3,12 @@ from .views import (
     UserChatRoomsView,
     ChatMessagesView,
     SendMessageView,
+    SendAttachmentView,
     ChatByReservationView,
     MarkMessagesAsReadView,
     ChatNotificationsView,
+    SynchronisationView,
+    RechercheMessagesView,
     RealtimeStatusView,
     TestRealtimeMessageView,
     SignalementCreateView,
@@ -25,6 +28,9 @@ urlpatterns = [
     # Envoyer un message
     path('rooms/<str:chat_room_id>/send/', SendMessageView.as_view(), name='send-message'),
     
+    # Envoyer une image ou un fichier
+    path('rooms/<str:chat_room_id>/attachments/', SendAttachmentView.as_view(), name='send-attachment'),
+    
     # Marquer comme lu
     path('rooms/<str:chat_room_id>/mark-read/', MarkMessagesAsReadView.as_view(), name='mark-messages-read'),
     
@@ -34,6 +40,12 @@ urlpatterns = [
     # Notifications
     path('notifications/', ChatNotificationsView.as_view(), name='chat-notifications'),
     
+    # Recherche dans l'historique
+    path('search/', RechercheMessagesView.as_view(), name='chat-search'),
+    
+    # Synchronisation différentielle (application mobile)
+    path('sync/', SynchronisationView.as_view(), name='chat-sync'),
+    
     # ✅ NOUVEAUX ENDPOINTS TEMPS RÉEL
     path('realtime/status/', RealtimeStatusView.as_view(), name='realtime-status'),
     path('test-realtime/', TestRealtimeMessageView.as_view(), name='test-realtime'),
@@ -1,13 +1,25 @@
 from django.shortcuts import render
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .supabase_service import chat_supabase_service
+from .websocket import CHEMIN as CHEMIN_WEBSOCKET, hub
+from .lecture import compter_non_lus, enregistrer_message, marquer_comme_lu
+from .boite_reception import conversations, serialiser_conversation
+from .acces import a_acces, salons_ids
+from .historique import (
+    TAILLE_PAGE_DEFAUT, CurseurInvalide, amorcer_salon, ecrire_message, encoder_curseur, page_messages,
+    serialiser_messages,
+)
+from .synchronisation import JetonInvalide, synchroniser
+from . import pieces_jointes, recherche
 from .models import ChatRoom, ChatMessage, SignalementChat
 from reservation.models import Reservation
+from reservation.favoris import favoris_ids_requete
 from django.shortcuts import get_object_or_404
 from .serializers import ChatRoomSerializer, ChatMessageSerializer
 from django.utils import timezone
@@ -19,7 +31,11 @@ class UserChatRoomsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     @swagger_auto_schema(
-        operation_description="Récupérer toutes les conversations de l'utilisateur connecté",
+        operation_description="Récupérer toutes les conversations de l'utilisateur connecté (hors salons archivés)",
+        manual_parameters=[
+            openapi.Parameter('archived', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, required=False,
+                              description="true : seulement les conversations archivées"),
+        ],
         responses={
             200: openapi.Response(
                 description="Liste des conversations",
@@ -38,6 +54,8 @@ class UserChatRoomsView(APIView):
                                     'status': openapi.Schema(type=openapi.TYPE_STRING),
                                     'created_at': openapi.Schema(type=openapi.TYPE_STRING),
                                     'last_message_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'last_message': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'unread_count': openapi.Schema(type=openapi.TYPE_INTEGER),
                                     'other_user': openapi.Schema(
                                         type=openapi.TYPE_OBJECT,
                                         properties={
@@ -53,7 +71,9 @@ class UserChatRoomsView(APIView):
                                             'property_name': openapi.Schema(type=openapi.TYPE_STRING),
                                             'status': openapi.Schema(type=openapi.TYPE_STRING),
                                             'check_in': openapi.Schema(type=openapi.TYPE_STRING),
-                                            'check_out': openapi.Schema(type=openapi.TYPE_STRING)
+                                            'check_out': openapi.Schema(type=openapi.TYPE_STRING),
+                                            'bien_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                            'is_favori': openapi.Schema(type=openapi.TYPE_BOOLEAN)
                                         }
                                     )
                                 }
@@ -67,50 +87,14 @@ class UserChatRoomsView(APIView):
         tags=['Chat']
     )
     def get(self, request):
-        # Récupérer depuis Supabase
-        result = chat_supabase_service.get_chat_rooms_for_user(request.user.id)
-        
-        if result['success']:
-            # Enrichir avec les données locales
-            for room in result['data']:
-                try:
-                    # Récupérer les détails de la réservation
-                    reservation = Reservation.objects.select_related('bien', 'user').get(
-                        id=room['reservation_id']
-                    )
-                    
-                    room['reservation_details'] = {
-                        'id': reservation.id,
-                        'property_name': reservation.bien.nom,
-                        'guest_name': f"{reservation.user.first_name} {reservation.user.last_name}".strip() or reservation.user.username,
-                        'host_name': f"{reservation.bien.owner.first_name} {reservation.bien.owner.last_name}".strip() or reservation.bien.owner.username,
-                        'status': reservation.status,
-                        'check_in': reservation.date_debut.isoformat(),
-                        'check_out': reservation.date_fin.isoformat(),
-                        'property_image': request.build_absolute_uri(reservation.bien.media.first().image.url) if reservation.bien.media.exists() else None
-                    }
-                    
-                    # Déterminer qui est l'autre participant
-                    if room['user_id'] == request.user.id:
-                        room['other_user'] = {
-                            'id': room['host_id'],
-                            'name': room['reservation_details']['host_name'],
-                            'role': 'host'
-                        }
-                    else:
-                        room['other_user'] = {
-                            'id': room['user_id'],
-                            'name': room['reservation_details']['guest_name'],
-                            'role': 'guest'
-                        }
-                        
-                except Reservation.DoesNotExist:
-                    room['reservation_details'] = None
-                    room['other_user'] = None
-        
-            return Response(result, status=status.HTTP_200_OK)
-        
-        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        # Projection locale : une requête, triée par dernier message
+        favoris = favoris_ids_requete(request)
+        archives = str(request.query_params.get('archived', '')).lower() in ['1', 'true', 'yes']
+        data = [
+            serialiser_conversation(participant, request, favoris)
+            for participant in conversations(request.user, archives=archives)
+        ]
+        return Response({'success': True, 'data': data}, status=status.HTTP_200_OK)
 
 class ChatMessagesView(APIView):
     """
@@ -131,8 +115,20 @@ class ChatMessagesView(APIView):
             openapi.Parameter(
                 'limit',
                 openapi.IN_QUERY,
-                description="Nombre de messages à récupérer (défaut: 50)",
+                description="Nombre de messages à récupérer (défaut: 50, max: 100)",
                 type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'before',
+                openapi.IN_QUERY,
+                description="Curseur : messages plus anciens que celui-ci (valeur 'before' d'une réponse)",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'after',
+                openapi.IN_QUERY,
+                description="Curseur : messages plus récents que celui-ci (valeur 'after' d'une réponse)",
+                type=openapi.TYPE_STRING
             )
         ],
         responses={
@@ -164,7 +160,10 @@ class ChatMessagesView(APIView):
                                     )
                                 }
                             )
-                        )
+                        ),
+                        'has_more': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'before': openapi.Schema(type=openapi.TYPE_STRING),
+                        'after': openapi.Schema(type=openapi.TYPE_STRING)
                     }
                 )
             ),
@@ -175,46 +174,41 @@ class ChatMessagesView(APIView):
         tags=['Chat']
     )
     def get(self, request, chat_room_id):
-        # Vérifier l'accès à cette conversation
-        user_rooms = chat_supabase_service.get_chat_rooms_for_user(request.user.id)
-        if not user_rooms['success']:
-            return Response({'error': 'Erreur lors de la vérification des permissions'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
-        
-        # Vérifier si l'utilisateur a accès à cette room
-        user_has_access = any(room['id'] == chat_room_id for room in user_rooms['data'])
-        if not user_has_access:
+        # Vérifier l'accès (salons locaux de l'utilisateur, en cache)
+        if not a_acces(request.user.id, chat_room_id):
             return Response({
                 'error': 'Accès refusé à cette conversation',
                 'debug': {
                     'user_id': request.user.id,
                     'requested_room_id': chat_room_id,
-                    'available_room_ids': [room['id'] for room in user_rooms['data']]
+                    'available_room_ids': sorted(salons_ids(request.user.id))
                 }
             }, status=status.HTTP_403_FORBIDDEN)
         
-        limit = int(request.query_params.get('limit', 50))
-        result = chat_supabase_service.get_chat_messages(chat_room_id, limit)
-        
-        if result['success']:
-            # Enrichir les messages avec les infos utilisateur
-            for message in result['data']:
-                if message['sender_id']:
-                    try:
-                        from django.contrib.auth import get_user_model
-                        User = get_user_model()
-                        sender = User.objects.get(id=message['sender_id'])
-                        message['sender_info'] = {
-                            'id': sender.id,
-                            'name': f"{sender.first_name} {sender.last_name}".strip() or sender.username,
-                            'username': sender.username
-                        }
-                    except:
-                        message['sender_info'] = None
-                else:
-                    message['sender_info'] = {'name': 'Système', 'username': 'system'}
-        
-        return Response(result, status=status.HTTP_200_OK if result['success'] else status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', TAILLE_PAGE_DEFAUT))
+        except ValueError:
+            return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+
+        # Historique local ; Supabase n'est lu que pour amorcer un salon jamais copié
+        chat_room = ChatRoom.objects.get(supabase_id=chat_room_id)
+        if chat_room.messages_synchronises_jusqu_a is None and not before and not after:
+            amorcer_salon(chat_room)
+        try:
+            messages, has_more = page_messages(chat_room, limit, avant=before, apres=after)
+        except CurseurInvalide as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'data': serialiser_messages(messages, chat_room, request.user),
+            'has_more': has_more,
+            # Page précédente (plus ancienne) / suivante (plus récente)
+            'before': encoder_curseur(messages[0]) if messages else before,
+            'after': encoder_curseur(messages[-1]) if messages else after,
+        }, status=status.HTTP_200_OK)
 
 class SendMessageView(APIView):
     """
@@ -271,20 +265,14 @@ class SendMessageView(APIView):
         tags=['Chat']
     )
     def post(self, request, chat_room_id):
-        # Vérifier l'accès
-        user_rooms = chat_supabase_service.get_chat_rooms_for_user(request.user.id)
-        if not user_rooms['success']:
-            return Response({'error': 'Erreur lors de la vérification des permissions'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
-        
-        user_has_access = any(room['id'] == chat_room_id for room in user_rooms['data'])
-        if not user_has_access:
+        # Vérifier l'accès (salons locaux de l'utilisateur, en cache)
+        if not a_acces(request.user.id, chat_room_id):
             return Response({
                 'error': 'Accès refusé à cette conversation',
                 'debug': {
                     'user_id': request.user.id,
                     'requested_room_id': chat_room_id,
-                    'available_room_ids': [room['id'] for room in user_rooms['data']]
+                    'available_room_ids': sorted(salons_ids(request.user.id))
                 }
             }, status=status.HTTP_403_FORBIDDEN)
         
@@ -301,9 +289,117 @@ class SendMessageView(APIView):
             message=message,
             message_type=message_type
         )
+        if result['success']:
+            ecrire_message(ChatRoom.objects.get(supabase_id=chat_room_id), request.user, result['data'])
+            enregistrer_message(chat_room_id, request.user.id, message)
         
         return Response(result, status=status.HTTP_201_CREATED if result['success'] else status.HTTP_400_BAD_REQUEST)
 
+class SendAttachmentView(APIView):
+    """
+    Envoyer une image ou un fichier dans une conversation
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Envoyer une pièce jointe (image JPEG/PNG/WebP ou document). Les images sont "
+            "réenregistrées sans métadonnées EXIF et accompagnées d'une miniature"
+        ),
+        consumes=['multipart/form-data'],
+        manual_parameters=[
+            openapi.Parameter('chat_room_id', openapi.IN_PATH, type=openapi.TYPE_STRING, required=True,
+                              description="ID de la room de chat Supabase"),
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True,
+                              description="Fichier à envoyer"),
+            openapi.Parameter('message', openapi.IN_FORM, type=openapi.TYPE_STRING, required=False,
+                              description="Légende (par défaut : nom du fichier)"),
+        ],
+        responses={
+            201: openapi.Response(
+                description="Pièce jointe envoyée",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'success': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'message_id': openapi.Schema(type=openapi.TYPE_STRING),
+                        'data': openapi.Schema(type=openapi.TYPE_OBJECT),
+                        'attachment': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'type': openapi.Schema(type=openapi.TYPE_STRING, enum=['image', 'file']),
+                                'name': openapi.Schema(type=openapi.TYPE_STRING),
+                                'content_type': openapi.Schema(type=openapi.TYPE_STRING),
+                                'size': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'width': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'height': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'url': openapi.Schema(type=openapi.TYPE_STRING),
+                                'thumbnail_url': openapi.Schema(type=openapi.TYPE_STRING),
+                            }
+                        ),
+                    }
+                )
+            ),
+            400: "Fichier absent, illisible ou type non accepté",
+            403: "Accès refusé",
+            413: "Fichier trop volumineux",
+            503: "Traitement de l'image indisponible",
+        },
+        tags=['Chat']
+    )
+    def post(self, request, chat_room_id):
+        if not a_acces(request.user.id, chat_room_id):
+            return Response({'error': 'Accès refusé à cette conversation'}, status=status.HTTP_403_FORBIDDEN)
+
+        trop_gros = Response({
+            'error': f"Fichier trop volumineux (maximum {pieces_jointes.TAILLE_MAX // (1024 * 1024)} Mo)"
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            taille_annoncee = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            taille_annoncee = 0
+        # Marge pour les en-têtes multipart et la légende
+        if taille_annoncee > pieces_jointes.TAILLE_MAX + 64 * 1024:
+            return trop_gros
+
+        # Fichier reçu sur disque, réception interrompue au-delà de la taille maximale
+        handler = pieces_jointes.PieceJointeUploadHandler(request)
+        request.upload_handlers = [handler]
+        fichier = request.FILES.get('file')
+        if handler.trop_gros or (fichier and fichier.size > pieces_jointes.TAILLE_MAX):
+            return trop_gros
+        if not fichier:
+            return Response({'error': 'Fichier requis (champ file)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        chat_room = get_object_or_404(ChatRoom, supabase_id=chat_room_id)
+        try:
+            piece_jointe = pieces_jointes.creer_piece_jointe(chat_room, request.user, fichier)
+        except pieces_jointes.PieceJointeRefusee as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except TimeoutError:
+            return Response({'error': "Traitement de l'image trop long, réessayez"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        texte = (request.data.get('message') or '').strip() or piece_jointe.nom_original
+        result = chat_supabase_service.send_message(
+            chat_room_id=chat_room_id,
+            sender_id=request.user.id,
+            message=texte,
+            message_type=piece_jointe.type_piece
+        )
+        if not result['success']:
+            piece_jointe.delete()
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+
+        ecrire_message(chat_room, request.user, result['data'], piece_jointe=piece_jointe)
+        enregistrer_message(chat_room_id, request.user.id, texte)
+        return Response({
+            **result,
+            'attachment': pieces_jointes.serialiser_piece_jointe(piece_jointe),
+        }, status=status.HTTP_201_CREATED)
+
 class ChatByReservationView(APIView):
     """
     Récupérer le chat associé à une réservation
@@ -392,7 +488,7 @@ class ChatRealtimeTestView(APIView):
     def get(self, request):
         try:
             # Test simple de la connexion
-            result = chat_supabase_service.supabase.table('chat_rooms').select('id').limit(1).execute()
+            chat_supabase_service.ping()
             
             return Response({
                 'success': True,
@@ -497,7 +593,7 @@ class ChatNotificationsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     @swagger_auto_schema(
-        operation_description="Récupérer le nombre de messages non lus",
+        operation_description="Récupérer le nombre de messages non lus (seuls les salons ayant des non lus figurent dans room_unread)",
         responses={
             200: openapi.Response(
                 description="Notifications récupérées",
@@ -518,8 +614,141 @@ class ChatNotificationsView(APIView):
         tags=['Chat']
     )
     def get(self, request):
-        result = chat_supabase_service.get_unread_count(request.user.id)
-        return Response(result, status=status.HTTP_200_OK if result['success'] else status.HTTP_400_BAD_REQUEST)
+        return Response(compter_non_lus(request.user), status=status.HTTP_200_OK)
+
+class RechercheMessagesView(APIView):
+    """
+    Recherche plein texte dans l'historique des conversations de l'utilisateur
+    (toutes les conversations pour l'équipe de modération)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @swagger_auto_schema(
+        operation_description="Rechercher des messages (du plus récent au plus ancien, extrait surligné avec <mark>)",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              description="Texte recherché"),
+            openapi.Parameter('room', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="ID Supabase d'une conversation (optionnel)"),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Nombre de résultats (défaut: 20, max: 50)"),
+            openapi.Parameter('before', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Curseur : résultats plus anciens (valeur 'before' d'une réponse)"),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Résultats",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'success': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'data': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Items(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'id': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'chat_room_id': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'sender_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'sender_name': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'created_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'snippet': openapi.Schema(type=openapi.TYPE_STRING),
+                                }
+                            )
+                        ),
+                        'has_more': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'before': openapi.Schema(type=openapi.TYPE_STRING),
+                    }
+                )
+            ),
+            400: "Erreur dans la requête",
+            401: "Non authentifié",
+            403: "Accès refusé"
+        },
+        tags=['Chat']
+    )
+    def get(self, request):
+        room = request.query_params.get('room')
+        if room and not request.user.is_staff and not a_acces(request.user.id, room):
+            return Response({'error': 'Accès refusé à cette conversation'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            limit = int(request.query_params.get('limit', recherche.TAILLE_PAGE_DEFAUT))
+        except ValueError:
+            return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+        before = request.query_params.get('before')
+
+        try:
+            messages, has_more = recherche.rechercher(
+                request.user, request.query_params.get('q'), room, limit, avant=before
+            )
+        except (recherche.RechercheVide, CurseurInvalide) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'data': recherche.serialiser_resultats(messages),
+            'has_more': has_more,
+            'before': encoder_curseur(messages[-1]) if messages else before,
+        }, status=status.HTTP_200_OK)
+
+class SynchronisationView(APIView):
+    """
+    Synchronisation différentielle (application mobile) : conversations,
+    messages, réservations et favoris modifiés depuis le dernier jeton
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @swagger_auto_schema(
+        operation_description=(
+            "Renvoie ce qui a changé depuis le jeton `since` (réponse précédente), ou l'état complet sans jeton. "
+            "Les éléments peuvent être renvoyés plusieurs fois : les fusionner par identifiant."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                description="Jeton `token` de la synchronisation précédente"
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Changements depuis le jeton",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'success': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'token': openapi.Schema(type=openapi.TYPE_STRING, description="Jeton à renvoyer au prochain appel"),
+                        'full': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="État complet (appel sans jeton)"),
+                        'rooms': openapi.Schema(
+                            type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT),
+                            description="Conversations modifiées (format de /rooms/)"
+                        ),
+                        'messages': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            description="Par conversation : nouveaux messages (data), has_more et curseur before"
+                        ),
+                        'reservations': openapi.Schema(
+                            type=openapi.TYPE_ARRAY, items=openapi.Items(type=openapi.TYPE_OBJECT),
+                            description="Réservations modifiées, comme client ou comme hôte"
+                        ),
+                        'favoris': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            description="null si inchangés, sinon ids (liste complète) et ajouts (détail)"
+                        ),
+                        'unread': openapi.Schema(type=openapi.TYPE_OBJECT, description="Format de /notifications/"),
+                    }
+                )
+            ),
+            400: "Jeton invalide",
+            401: "Non authentifié"
+        },
+        tags=['Chat', 'Synchronisation']
+    )
+    def get(self, request):
+        try:
+            return Response(synchroniser(request, request.query_params.get('since')), status=status.HTTP_200_OK)
+        except JetonInvalide as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class MarkMessagesAsReadView(APIView):
     """
@@ -529,6 +758,15 @@ class MarkMessagesAsReadView(APIView):
     
     @swagger_auto_schema(
         operation_description="Marquer tous les messages d'une conversation comme lus",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'last_read_message_id': openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description="ID Supabase du dernier message affiché (filigrane de lecture)"
+                )
+            }
+        ),
         responses={
             200: openapi.Response(
                 description="Messages marqués comme lus",
@@ -546,21 +784,15 @@ class MarkMessagesAsReadView(APIView):
         tags=['Chat']
     )
     def post(self, request, chat_room_id):
-        # Vérifier l'accès
-        user_rooms = chat_supabase_service.get_chat_rooms_for_user(request.user.id)
-        if not user_rooms['success']:
-            return Response({'error': 'Erreur lors de la vérification des permissions'}, 
-                           status=status.HTTP_400_BAD_REQUEST)
-        
-        user_has_access = any(room['id'] == chat_room_id for room in user_rooms['data'])
-        if not user_has_access:
+        # Vérifier l'accès (salons locaux de l'utilisateur, en cache)
+        if not a_acces(request.user.id, chat_room_id):
             return Response({'error': 'Accès refusé à cette conversation'}, 
                            status=status.HTTP_403_FORBIDDEN)
         
-        # Marquer comme lus dans Supabase
-        result = chat_supabase_service.mark_messages_as_read(chat_room_id, request.user.id)
+        # Filigrane de lecture : une seule ligne écrite (recopiée dans Supabase)
+        non_lus = marquer_comme_lu(chat_room_id, request.user, request.data.get('last_read_message_id'))
         
-        return Response(result, status=status.HTTP_200_OK if result['success'] else status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True, 'messages_updated': non_lus}, status=status.HTTP_200_OK)
 
 class RealtimeStatusView(APIView):
     """
@@ -580,7 +812,15 @@ class RealtimeStatusView(APIView):
                         'realtime_enabled': openapi.Schema(type=openapi.TYPE_BOOLEAN),
                         'user_id': openapi.Schema(type=openapi.TYPE_INTEGER),
                         'timestamp': openapi.Schema(type=openapi.TYPE_STRING),
-                        'test_results': openapi.Schema(type=openapi.TYPE_OBJECT)
+                        'test_results': openapi.Schema(type=openapi.TYPE_OBJECT),
+                        'client': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            description="Disjoncteur et mesures par opération du client Supabase (worker courant)"
+                        ),
+                        'websocket': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            description="Transport WebSocket intégré (chemin, connexions du processus courant)"
+                        )
                     }
                 )
             ),
@@ -591,7 +831,7 @@ class RealtimeStatusView(APIView):
     def get(self, request):
         try:
             # Test 1: Connexion Supabase de base
-            supabase_test = chat_supabase_service.supabase.table('chat_rooms').select('id').limit(1).execute()
+            chat_supabase_service.ping()
             supabase_connected = True
             
             # Test 2: Vérifier les tables nécessaires
@@ -600,7 +840,7 @@ class RealtimeStatusView(APIView):
             
             for table in tables_to_check:
                 try:
-                    result = chat_supabase_service.supabase.table(table).select('*').limit(1).execute()
+                    result = chat_supabase_service.ping(table)
                     tables_test[table] = {
                         'exists': True,
                         'count': len(result.data) if result.data else 0
@@ -627,8 +867,11 @@ class RealtimeStatusView(APIView):
                         'rooms': user_rooms['data'] if user_rooms['success'] else []
                     }
                 },
+                'client': chat_supabase_service.client.statut(),
+                'websocket': {'path': CHEMIN_WEBSOCKET, **hub.statut()},
                 'instructions': {
                     'frontend': 'Pour le temps réel côté client, utilisez les WebSockets Supabase',
+                    'websocket': f'Ou le WebSocket intégré : {CHEMIN_WEBSOCKET}?token=<jeton JWT>',
                     'javascript_example': 'supabase.channel("chat").on("postgres_changes", {...}).subscribe()',
                     'flutter_example': 'supabase.channel("chat").onPostgresChanges(...).subscribe()'
                 }
@@ -639,6 +882,7 @@ class RealtimeStatusView(APIView):
                 'supabase_connected': False,
                 'realtime_enabled': False,
                 'error': str(e),
+                'client': chat_supabase_service.client.statut(),
                 'user_id': request.user.id,
                 'timestamp': timezone.now().isoformat()
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -671,13 +915,8 @@ class TestRealtimeMessageView(APIView):
         if not chat_room_id:
             return Response({'error': 'chat_room_id requis'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Vérifier l'accès
-        user_rooms = chat_supabase_service.get_chat_rooms_for_user(request.user.id)
-        if not user_rooms['success']:
-            return Response({'error': 'Erreur vérification permissions'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        user_has_access = any(room['id'] == chat_room_id for room in user_rooms['data'])
-        if not user_has_access:
+        # Vérifier l'accès (salons locaux de l'utilisateur, en cache)
+        if not a_acces(request.user.id, chat_room_id):
             return Response({'error': 'Accès refusé à cette conversation'}, status=status.HTTP_403_FORBIDDEN)
         
         # Envoyer le message de test
@@ -689,6 +928,8 @@ class TestRealtimeMessageView(APIView):
         )
         
         if result['success']:
+            ecrire_message(ChatRoom.objects.get(supabase_id=chat_room_id), request.user, result['data'])
+            enregistrer_message(chat_room_id, request.user.id, test_message)
             return Response({
                 'success': True,
                 'message': 'Message de test envoyé ! Vérifiez votre client temps réel.',
@@ -0,0 +1,296 @@
+"""
+Transport temps réel du chat : WebSockets ASGI (monté par babiloc_backend/asgi.py).
+
+Connexion : ``ws(s)://<hôte>/ws/chat/?token=<jeton d'accès JWT>`` (ou en-tête
+``Authorization: Bearer``). Le jeton est vérifié comme pour l'API
+(CachedJWTAuthentication) ; la connexion est abonnée aux salons de
+l'utilisateur (chat.acces.salons_ids) et à son canal personnel.
+
+Messages du client : ``{"type": "ping"}``, ``{"type": "subscribe", "room": id}``,
+``{"type": "unsubscribe", "room": id}``. Messages du serveur : ``connected``,
+``pong``, ``subscribed``, ``unsubscribed``, ``error`` et les événements publiés
+par chat/temps_reel.py (``message``, ``read``, ``reservation``, ``room_created``).
+
+Prévu pour de nombreuses connexions inactives par processus : aucune tâche ni
+file par connexion (seule la coroutine de réception ouverte par le serveur),
+aucune connexion à la base conservée, événement sérialisé une fois par
+publication puis envoyé tel quel à chaque abonné. Les pings sont laissés au
+serveur ASGI (uvicorn ``--ws-ping-interval``) ; prévoir une limite de
+descripteurs de fichiers suffisante (``ulimit -n``).
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .temps_reel import CANAL_REDIS, canal_salon, canal_utilisateur
+
+logger = logging.getLogger(__name__)
+
+CHEMIN = '/ws/chat/'
+FERMETURE_NON_AUTORISE = 4401
+FERMETURE_INTROUVABLE = 4404
+
+
+class Connexion:
+    __slots__ = ('envoi', 'user_id', 'canaux')
+
+    def __init__(self, envoi, user_id):
+        self.envoi = envoi
+        self.user_id = user_id
+        self.canaux = set()
+
+    async def envoyer(self, texte):
+        await asyncio.wait_for(
+            self.envoi({'type': 'websocket.send', 'text': texte}), settings.CHAT_TEMPS_REEL_DELAI_ENVOI
+        )
+
+    async def fermer(self, code=1000):
+        try:
+            await asyncio.wait_for(
+                self.envoi({'type': 'websocket.close', 'code': code}), settings.CHAT_TEMPS_REEL_DELAI_ENVOI
+            )
+        except Exception:
+            pass
+
+
+# ==================== HUB ====================
+
+class Hub:
+    """Abonnements canal -> connexions du processus et diffusion des événements"""
+
+    def __init__(self):
+        self.abonnes = defaultdict(set)
+        self.connexions = set()
+        self.boucle = None
+        self._ecoute = None
+        self._taches = set()
+
+    def demarrer(self):
+        """À appeler depuis la boucle du serveur (démarrage ou première connexion)"""
+        self.boucle = asyncio.get_running_loop()
+        if settings.CHAT_TEMPS_REEL_REDIS_URL and self._ecoute is None:
+            self._ecoute = self._lancer(self._ecouter_redis())
+
+    async def arreter(self):
+        if self._ecoute is not None:
+            self._ecoute.cancel()
+            self._ecoute = None
+        await asyncio.gather(*(connexion.fermer(1001) for connexion in list(self.connexions)))
+
+    def _lancer(self, coroutine):
+        # Référence conservée jusqu'à la fin de la tâche
+        tache = asyncio.get_running_loop().create_task(coroutine)
+        self._taches.add(tache)
+        tache.add_done_callback(self._taches.discard)
+        return tache
+
+    # ---------- abonnements ----------
+
+    def abonner(self, connexion, canal):
+        connexion.canaux.add(canal)
+        self.abonnes[canal].add(connexion)
+
+    def desabonner(self, connexion, canal):
+        connexion.canaux.discard(canal)
+        abonnes = self.abonnes.get(canal)
+        if abonnes is not None:
+            abonnes.discard(connexion)
+            if not abonnes:
+                del self.abonnes[canal]
+
+    def connecter(self, connexion, canaux):
+        self.connexions.add(connexion)
+        for canal in canaux:
+            self.abonner(connexion, canal)
+
+    def deconnecter(self, connexion):
+        self.connexions.discard(connexion)
+        for canal in list(connexion.canaux):
+            self.desabonner(connexion, canal)
+
+    # ---------- diffusion ----------
+
+    def depuis_thread(self, charge):
+        """Remet ``charge`` au hub depuis du code synchrone (vue, signal) du même processus"""
+        boucle = self.boucle
+        if boucle is None or boucle.is_closed():
+            # Aucun serveur WebSocket dans ce processus
+            return
+        boucle.call_soon_threadsafe(self._lancer, self.distribuer(charge))
+
+    async def distribuer(self, charge):
+        """``charge`` : « canal\\névénement JSON » (voir temps_reel.publier)"""
+        canal, _, texte = charge.partition('\n')
+        abonnes = self.abonnes.get(canal)
+        if not abonnes:
+            return
+
+        if canal.startswith('utilisateur:'):
+            evenement = json.loads(texte)
+            if evenement.get('type') == 'room_created':
+                for connexion in list(abonnes):
+                    self.abonner(connexion, canal_salon(evenement['room']))
+
+        destinataires = list(abonnes)
+        resultats = await asyncio.gather(
+            *(connexion.envoyer(texte) for connexion in destinataires), return_exceptions=True
+        )
+        for connexion, resultat in zip(destinataires, resultats):
+            if isinstance(resultat, Exception):
+                # Client trop lent ou déjà parti : plus d'événements, fermeture
+                self.deconnecter(connexion)
+                self._lancer(connexion.fermer(1011))
+
+    async def _ecouter_redis(self):
+        import redis.asyncio as aioredis
+
+        attente = 1
+        while True:
+            client = aioredis.Redis.from_url(settings.CHAT_TEMPS_REEL_REDIS_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(CANAL_REDIS)
+                    logger.info("Temps réel : abonné au canal Redis")
+                    attente = 1
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self._lancer(self.distribuer(message['data'].decode()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Temps réel : écoute Redis interrompue ({str(e)}), reprise dans {attente}s")
+                await asyncio.sleep(attente)
+                attente = min(attente * 2, 30)
+            finally:
+                await client.aclose()
+
+    def statut(self):
+        return {
+            'connexions': len(self.connexions),
+            'canaux': len(self.abonnes),
+            'pubsub': bool(settings.CHAT_TEMPS_REEL_REDIS_URL),
+        }
+
+
+hub = Hub()
+
+
+# ==================== APPLICATION ASGI ====================
+
+def _jeton(scope):
+    jeton = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if jeton:
+        return jeton[0]
+    for nom, valeur in scope.get('headers', []):
+        if nom == b'authorization':
+            type_, _, jeton = valeur.decode().partition(' ')
+            if type_.lower() == 'bearer' and jeton:
+                return jeton
+    return None
+
+
+def _authentifier(jeton):
+    """(user_id, salons) ou None si le jeton est absent, invalide ou expiré"""
+    from rest_framework.exceptions import APIException
+
+    from Auths.authentication import CachedJWTAuthentication
+    from .acces import salons_ids
+
+    if not jeton:
+        return None
+    close_old_connections()
+    try:
+        authentification = CachedJWTAuthentication()
+        user = authentification.get_user(authentification.get_validated_token(jeton.encode()))
+        return user.pk, salons_ids(user.pk)
+    except APIException:
+        return None
+    finally:
+        close_old_connections()
+
+
+def _a_acces(user_id, chat_room_id):
+    from .acces import a_acces
+
+    close_old_connections()
+    try:
+        return a_acces(user_id, chat_room_id)
+    finally:
+        close_old_connections()
+
+
+async def _traiter(connexion, texte):
+    try:
+        donnees = json.loads(texte)
+        type_ = donnees['type']
+    except (ValueError, KeyError, TypeError):
+        return {'type': 'error', 'error': 'Message invalide'}
+
+    if type_ == 'ping':
+        return {'type': 'pong'}
+
+    if type_ in ('subscribe', 'unsubscribe'):
+        room = str(donnees.get('room') or '')
+        if not room:
+            return {'type': 'error', 'error': 'room requis'}
+        if type_ == 'unsubscribe':
+            hub.desabonner(connexion, canal_salon(room))
+            return {'type': 'unsubscribed', 'room': room}
+        if not await sync_to_async(_a_acces)(connexion.user_id, room):
+            return {'type': 'error', 'error': 'Accès non autorisé à cette conversation', 'room': room}
+        hub.abonner(connexion, canal_salon(room))
+        return {'type': 'subscribed', 'room': room}
+
+    return {'type': 'error', 'error': f"Type inconnu : {type_}"}
+
+
+async def application_websocket(scope, receive, send):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if scope['path'].rstrip('/') != CHEMIN.rstrip('/'):
+        await send({'type': 'websocket.close', 'code': FERMETURE_INTROUVABLE})
+        return
+
+    hub.demarrer()
+    authentification = await sync_to_async(_authentifier)(_jeton(scope))
+    await send({'type': 'websocket.accept'})
+    if authentification is None:
+        # Accepter puis fermer : le client reçoit le code 4401 (un refus donnerait un 403 opaque)
+        await send({'type': 'websocket.close', 'code': FERMETURE_NON_AUTORISE})
+        return
+
+    user_id, salons = authentification
+    connexion = Connexion(send, user_id)
+    hub.connecter(connexion, [canal_utilisateur(user_id), *(canal_salon(salon) for salon in salons)])
+    try:
+        await connexion.envoyer(json.dumps({'type': 'connected', 'user_id': user_id, 'rooms': sorted(salons)}))
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] == 'websocket.receive':
+                texte = message.get('text') or (message.get('bytes') or b'').decode(errors='replace')
+                await connexion.envoyer(json.dumps(await _traiter(connexion, texte)))
+    except Exception as e:
+        logger.info(f"Temps réel : connexion de l'utilisateur {user_id} interrompue ({e.__class__.__name__})")
+    finally:
+        hub.deconnecter(connexion)
+
+
+async def cycle_de_vie(scope, receive, send):
+    """Protocole ASGI lifespan : écoute Redis au démarrage, fermeture des connexions à l'arrêt"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            hub.demarrer()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await hub.arreter()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,27 @@
+-- Filigranes de lecture du chat (Supabase / PostgreSQL)
+--
+-- Une ligne par salon et participant, écrite par le backend Django
+-- (chat.lecture.marquer_comme_lu -> ChatSupabaseService.upsert_read_watermark)
+-- avec un upsert on_conflict='chat_room_id,user_id' : la contrainte unique
+-- ci-dessous est obligatoire, sans elle PostgREST refuse l'upsert.
+-- chat_room_id reprend le type de chat_rooms.id (uuid) ; user_id est l'ID
+-- de l'utilisateur Django.
+--
+-- À exécuter une fois dans l'éditeur SQL du projet Supabase, avant de déployer
+-- la migration chat 0003 ; puis lancer `python manage.py amorcer_non_lus_chat`.
+
+create table if not exists public.chat_read_watermarks (
+    id bigint generated always as identity primary key,
+    chat_room_id uuid not null references public.chat_rooms (id) on delete cascade,
+    user_id bigint not null,
+    last_read_message_id text,
+    last_read_at timestamptz not null default now(),
+    constraint chat_read_watermarks_room_user_unique unique (chat_room_id, user_id)
+);
+
+-- Accusés de lecture : lecture par participant côté client
+create index if not exists chat_read_watermarks_user_idx
+    on public.chat_read_watermarks (user_id);
+
+-- Écritures réservées au backend (clé service, qui contourne RLS)
+alter table public.chat_read_watermarks enable row level security;
@@ -1,15 +1,19 @@
-from pyexpat.errors import messages
 from django.contrib import admin
 from .forms import BienForm
 from .models import (
     Reservation, Ville, Favori, Bien, Type_Bien, Tarif, Media, 
     Avis, DisponibiliteHebdo, TagBien, CodePromo, HistoriqueStatutReservation,
-    RevenuProprietaire, Document
+    RevenuProprietaire, Document, PeriodeBlocage, AvisStats
 )
 
 def mark_as_verified(modeladmin, request, queryset):
-    updated = queryset.update(est_verifie=True)
-    messages.success(request, f"{updated} bien(s) marqué(s) comme vérifié(s) !")
+    from Auths.moderation import cloturer_elements
+
+    ids = list(queryset.values_list('id', flat=True))
+    updated = Bien.objects.filter(id__in=ids).update(est_verifie=True)
+    # update() ne déclenche pas les signaux : retirer les biens de la file de modération
+    cloturer_elements(biens=ids, decision='approuve', moderateur=request.user)
+    modeladmin.message_user(request, f"{updated} bien(s) marqué(s) comme vérifié(s) !")
 
 mark_as_verified.short_description = "Marquer les biens sélectionnés comme vérifiés"
 
@@ -106,7 +110,7 @@ class MediaAdmin(admin.ModelAdmin):
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ['id', 'nom', 'bien', 'type', 'created_at']
+    list_display = ['id', 'nom', 'bien', 'type', 'date_expiration', 'created_at']
     list_filter = ['type', 'created_at']
     search_fields = ['nom', 'bien__nom']
     readonly_fields = ['created_at', 'updated_at']
@@ -175,4 +179,17 @@ class AvisAdmin(admin.ModelAdmin):
         return bool(obj.reponse_proprietaire)
     
     has_response.boolean = True
-    has_response.short_description = "A une réponse"
\ No newline at end of file
+    has_response.short_description = "A une réponse"
+
+@admin.register(PeriodeBlocage)
+class PeriodeBlocageAdmin(admin.ModelAdmin):
+    list_display = ['bien', 'date_debut', 'date_fin', 'source', 'resume']
+    list_filter = ['source']
+    search_fields = ['bien__nom', 'uid_externe', 'resume']
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(AvisStats)
+class AvisStatsAdmin(admin.ModelAdmin):
+    list_display = ['bien', 'nombre_avis', 'somme_notes', 'nb_recommandations', 'updated_at']
+    search_fields = ['bien__nom']
+    readonly_fields = [field.name for field in AvisStats._meta.fields]
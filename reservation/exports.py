@@ -0,0 +1,227 @@
+"""
+Exports en flux (CSV ou JSONL gzip) des réservations, utilisateurs et biens.
+
+Les lignes sont lues par projection ``values()`` et ``iterator(chunk_size)``
+(curseur côté serveur sous PostgreSQL) puis sérialisées au fil de l'eau :
+la mémoire consommée ne dépend pas du nombre de lignes exportées.
+"""
+import csv
+import json
+import zlib
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Bien, Reservation
+
+User = get_user_model()
+
+TAILLE_LOT = 2000
+FORMATS_EXPORT = ('csv', 'jsonl')
+
+# Colonnes exportées : (nom de colonne, chemin values())
+COLONNES_RESERVATIONS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('date_debut', 'date_debut'),
+    ('date_fin', 'date_fin'),
+    ('type_tarif', 'type_tarif'),
+    ('prix_total', 'prix_total'),
+    ('bien_id', 'bien_id'),
+    ('bien_nom', 'bien__nom'),
+    ('proprietaire_id', 'bien__owner_id'),
+    ('proprietaire_username', 'bien__owner__username'),
+    ('proprietaire_email', 'bien__owner__email'),
+    ('client_id', 'user_id'),
+    ('client_username', 'user__username'),
+    ('client_email', 'user__email'),
+    ('confirmed_at', 'confirmed_at'),
+]
+
+COLONNES_UTILISATEURS = [
+    ('id', 'id'),
+    ('username', 'username'),
+    ('email', 'email'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name'),
+    ('number', 'number'),
+    ('is_active', 'is_active'),
+    ('is_vendor', 'is_vendor'),
+    ('est_verifie', 'est_verifie'),
+    ('code_parrainage', 'code_parrainage'),
+    ('parrain_id', 'parrain_id'),
+    ('date_joined', 'date_joined'),
+    ('last_login', 'last_login'),
+]
+
+COLONNES_BIENS = [
+    ('id', 'id'),
+    ('nom', 'nom'),
+    ('type_bien', 'type_bien__nom'),
+    ('ville', 'ville__nom'),
+    ('proprietaire_id', 'owner_id'),
+    ('proprietaire_username', 'owner__username'),
+    ('disponibility', 'disponibility'),
+    ('est_verifie', 'est_verifie'),
+    ('noteGlobale', 'noteGlobale'),
+    ('vues', 'vues'),
+    ('created_at', 'created_at'),
+]
+
+
+def _borne_date(valeur):
+    """Convertit 'AAAA-MM-JJ' ou une date ISO complète en filtre utilisable."""
+    if not valeur:
+        return None
+    date_heure = parse_datetime(valeur)
+    if date_heure:
+        return date_heure
+    jour = parse_date(valeur)
+    if jour is None:
+        raise ValueError(f"Date invalide : {valeur}")
+    return jour
+
+
+def _filtrer_periode(queryset, champ, date_debut=None, date_fin=None):
+    debut = _borne_date(date_debut)
+    fin = _borne_date(date_fin)
+    if debut is not None:
+        lookup = 'gte' if hasattr(debut, 'hour') else 'date__gte'
+        queryset = queryset.filter(**{f'{champ}__{lookup}': debut})
+    if fin is not None:
+        lookup = 'lte' if hasattr(fin, 'hour') else 'date__lte'
+        queryset = queryset.filter(**{f'{champ}__{lookup}': fin})
+    return queryset
+
+
+def lignes_reservations(date_debut=None, date_fin=None, statut=None, taille_lot=TAILLE_LOT):
+    """Réservations avec bien, propriétaire, client, montants et commission."""
+    queryset = _filtrer_periode(Reservation.objects.all(), 'created_at', date_debut, date_fin)
+    if statut:
+        queryset = queryset.filter(status__in=statut.split(','))
+
+    chemins = [chemin for _, chemin in COLONNES_RESERVATIONS]
+    taux = Reservation.commission_percent
+    for ligne in queryset.order_by('id').values_list(*chemins).iterator(chunk_size=taille_lot):
+        donnees = dict(zip((nom for nom, _ in COLONNES_RESERVATIONS), ligne))
+        prix = donnees['prix_total'] or Decimal('0')
+        donnees['commission_plateforme'] = round(prix * taux, 2)
+        donnees['revenu_proprietaire'] = round(prix * (Decimal('1') - taux), 2)
+        yield donnees
+
+
+def lignes_utilisateurs(date_debut=None, date_fin=None, statut=None, taille_lot=TAILLE_LOT):
+    """Utilisateurs ; ``statut`` accepte actif, inactif, vendor ou client."""
+    queryset = _filtrer_periode(User.objects.all(), 'date_joined', date_debut, date_fin)
+    filtres_statut = {
+        'actif': {'is_active': True},
+        'inactif': {'is_active': False},
+        'vendor': {'is_vendor': True},
+        'client': {'is_vendor': False},
+    }
+    if statut:
+        if statut not in filtres_statut:
+            raise ValueError(f"Statut utilisateur invalide : {statut}")
+        queryset = queryset.filter(**filtres_statut[statut])
+
+    noms = [nom for nom, _ in COLONNES_UTILISATEURS]
+    chemins = [chemin for _, chemin in COLONNES_UTILISATEURS]
+    for ligne in queryset.order_by('id').values_list(*chemins).iterator(chunk_size=taille_lot):
+        yield dict(zip(noms, ligne))
+
+
+def lignes_biens(date_debut=None, date_fin=None, statut=None, taille_lot=TAILLE_LOT):
+    """Biens ; ``statut`` accepte verifie, non_verifie, disponible ou indisponible."""
+    queryset = _filtrer_periode(Bien.objects.all(), 'created_at', date_debut, date_fin)
+    filtres_statut = {
+        'verifie': {'est_verifie': True},
+        'non_verifie': {'est_verifie': False},
+        'disponible': {'disponibility': True},
+        'indisponible': {'disponibility': False},
+    }
+    if statut:
+        if statut not in filtres_statut:
+            raise ValueError(f"Statut de bien invalide : {statut}")
+        queryset = queryset.filter(**filtres_statut[statut])
+
+    noms = [nom for nom, _ in COLONNES_BIENS]
+    chemins = [chemin for _, chemin in COLONNES_BIENS]
+    for ligne in queryset.order_by('id').values_list(*chemins).iterator(chunk_size=taille_lot):
+        yield dict(zip(noms, ligne))
+
+
+EXPORTS = {
+    'reservations': (
+        lignes_reservations,
+        [nom for nom, _ in COLONNES_RESERVATIONS] + ['commission_plateforme', 'revenu_proprietaire'],
+    ),
+    'utilisateurs': (lignes_utilisateurs, [nom for nom, _ in COLONNES_UTILISATEURS]),
+    'biens': (lignes_biens, [nom for nom, _ in COLONNES_BIENS]),
+}
+
+
+class _Tampon:
+    """Pseudo-fichier : csv.writer écrit une ligne, on la récupère aussitôt."""
+
+    def write(self, valeur):
+        return valeur
+
+
+def flux_csv(lignes, colonnes):
+    """Génère le CSV ligne par ligne (bytes UTF-8, BOM pour Excel)."""
+    writer = csv.DictWriter(_Tampon(), fieldnames=colonnes, extrasaction='ignore')
+    yield '\ufeff'.encode('utf-8')
+    yield writer.writeheader().encode('utf-8')
+    for ligne in lignes:
+        yield writer.writerow(ligne).encode('utf-8')
+
+
+def flux_jsonl_gzip(lignes, taille_bloc=64 * 1024):
+    """Génère un JSONL compressé gzip, émis par blocs d'environ ``taille_bloc`` octets."""
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 : en-tête gzip
+    tampon = []
+    taille = 0
+    for ligne in lignes:
+        donnees = (json.dumps(ligne, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+        tampon.append(donnees)
+        taille += len(donnees)
+        if taille >= taille_bloc:
+            bloc = compresseur.compress(b''.join(tampon))
+            tampon, taille = [], 0
+            if bloc:
+                yield bloc
+    if tampon:
+        bloc = compresseur.compress(b''.join(tampon))
+        if bloc:
+            yield bloc
+    yield compresseur.flush()
+
+
+def generer_export(entite, format_export='csv', date_debut=None, date_fin=None, statut=None, taille_lot=TAILLE_LOT):
+    """
+    Retourne un générateur de bytes pour l'entité demandée.
+
+    Lève ValueError si l'entité, le format ou un filtre est invalide ;
+    les filtres sont validés avant le premier octet émis.
+    """
+    if entite not in EXPORTS:
+        raise ValueError(f"Entité inconnue : {entite}")
+    if format_export not in FORMATS_EXPORT:
+        raise ValueError(f"Format inconnu : {format_export}")
+
+    fonction_lignes, colonnes = EXPORTS[entite]
+    lignes = fonction_lignes(date_debut=date_debut, date_fin=date_fin, statut=statut, taille_lot=taille_lot)
+    # Amorcer le générateur pour remonter les erreurs de filtre tout de suite
+    premiere = next(lignes, None)
+
+    def toutes_les_lignes():
+        if premiere is not None:
+            yield premiere
+            yield from lignes
+
+    if format_export == 'csv':
+        return flux_csv(toutes_les_lignes(), colonnes)
+    return flux_jsonl_gzip(toutes_les_lignes())
@@ -0,0 +1,64 @@
+"""
+Ensemble des biens favoris d'un utilisateur, mis en cache.
+
+Les identifiants sont stockés triés dans un tableau d'entiers 64 bits non
+signés (8 octets par favori, comme un BigAutoField) ; l'ensemble est chargé une
+seule fois par requête puis consulté en mémoire (sérialiseurs, conversations,
+vérification groupée). Un ajout ou un retrait supprime l'entrée après la
+validation de la transaction : elle est rechargée depuis la base à la lecture
+suivante.
+"""
+import zlib
+from array import array
+
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_TIMEOUT = 60 * 5
+
+
+def _cle(user_id):
+    return f"favoris:ids:{user_id}"
+
+
+def _encoder(ids):
+    return array('Q', sorted(ids)).tobytes()
+
+
+def _decoder(donnees):
+    ids = array('Q')
+    ids.frombytes(donnees)
+    return frozenset(ids)
+
+
+def favoris_ids(user_id):
+    """Identifiants des biens favoris de l'utilisateur (cache, sinon une requête)"""
+    from .models import Favori
+
+    donnees = cache.get(_cle(user_id))
+    if donnees is not None:
+        return _decoder(donnees)
+    ids = frozenset(Favori.objects.filter(user_id=user_id).values_list('bien_id', flat=True))
+    cache.set(_cle(user_id), _encoder(ids), CACHE_TIMEOUT)
+    return ids
+
+
+def empreinte_favoris(ids):
+    """Empreinte (CRC32) d'un ensemble de favoris : détecte tout ajout ou retrait"""
+    return zlib.crc32(_encoder(ids))
+
+
+def favoris_ids_requete(request):
+    """Favoris de l'utilisateur courant, chargés au plus une fois par requête"""
+    if request is None or not request.user.is_authenticated:
+        return frozenset()
+    ids = getattr(request, '_favoris_ids', None)
+    if ids is None:
+        ids = favoris_ids(request.user.id)
+        request._favoris_ids = ids
+    return ids
+
+
+def invalider_favoris_cache(user_id):
+    """Supprime l'ensemble en cache une fois la transaction validée (pas de lecture-modification-écriture)"""
+    transaction.on_commit(lambda: cache.delete(_cle(user_id)))
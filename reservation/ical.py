@@ -0,0 +1,185 @@
+"""
+Lecture et génération de calendriers iCalendar (RFC 5545).
+
+Seul le sous-ensemble utile à la synchronisation des disponibilités est géré :
+événements VEVENT avec DTSTART/DTEND (date ou date-heure), UID et SUMMARY.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+PRODID = "-//BabiLoc//Calendrier des biens//FR"
+LONGUEUR_LIGNE_MAX = 75  # octets, hors CRLF
+
+
+@dataclass
+class EvenementIcal:
+    uid: str
+    date_debut: datetime
+    date_fin: datetime
+    resume: str = ''
+
+
+# ============================================================================
+# GÉNÉRATION
+# ============================================================================
+
+def _echapper(texte):
+    return (
+        str(texte)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _plier(ligne):
+    """Coupe une ligne en segments de 75 octets maximum (continuation par espace)."""
+    segments = []
+    courant = ''
+    taille = 0
+    for caractere in ligne:
+        octets = len(caractere.encode('utf-8'))
+        if taille + octets > LONGUEUR_LIGNE_MAX:
+            segments.append(courant)
+            courant, taille = ' ', 1
+        courant += caractere
+        taille += octets
+    segments.append(courant)
+    return '\r\n'.join(segments)
+
+
+def _format_utc(valeur):
+    return valeur.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def generer_calendrier(nom, evenements, horodatage=None):
+    """
+    Construit le texte d'un VCALENDAR.
+
+    ``evenements`` : itérable de dicts avec uid, date_debut, date_fin, resume
+    et optionnellement statut (CONFIRMED/TENTATIVE).
+    """
+    horodatage = _format_utc(horodatage or timezone.now())
+    lignes = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_echapper(nom)}',
+    ]
+    for evenement in evenements:
+        lignes += [
+            'BEGIN:VEVENT',
+            f"UID:{evenement['uid']}",
+            f'DTSTAMP:{horodatage}',
+            f"DTSTART:{_format_utc(evenement['date_debut'])}",
+            f"DTEND:{_format_utc(evenement['date_fin'])}",
+            f"SUMMARY:{_echapper(evenement['resume'])}",
+        ]
+        if evenement.get('statut'):
+            lignes.append(f"STATUS:{evenement['statut']}")
+        lignes.append('END:VEVENT')
+    lignes.append('END:VCALENDAR')
+    return '\r\n'.join(_plier(ligne) for ligne in lignes) + '\r\n'
+
+
+# ============================================================================
+# LECTURE
+# ============================================================================
+
+def _deplier(texte):
+    """Reconstitue les lignes logiques (les continuations commencent par espace ou tabulation)."""
+    lignes = []
+    for ligne in texte.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if ligne[:1] in (' ', '\t') and lignes:
+            lignes[-1] += ligne[1:]
+        elif ligne:
+            lignes.append(ligne)
+    return lignes
+
+
+def _decouper(ligne):
+    """'DTSTART;TZID=Europe/Paris:20250101T100000' -> ('DTSTART', {'TZID': ...}, valeur)"""
+    entete, _, valeur = ligne.partition(':')
+    nom, *parametres = entete.split(';')
+    params = {}
+    for parametre in parametres:
+        cle, _, val = parametre.partition('=')
+        params[cle.upper()] = val.strip('"')
+    return nom.upper(), params, valeur
+
+
+def _desechapper(texte):
+    return (
+        texte.replace('\\n', '\n').replace('\\N', '\n')
+        .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+    )
+
+
+def _lire_date(params, valeur):
+    """Convertit une valeur DTSTART/DTEND en datetime aware."""
+    valeur = valeur.strip()
+    fuseau_defaut = timezone.get_current_timezone()
+
+    if params.get('VALUE') == 'DATE' or len(valeur) == 8:
+        jour = date(int(valeur[:4]), int(valeur[4:6]), int(valeur[6:8]))
+        return timezone.make_aware(datetime.combine(jour, time.min), fuseau_defaut)
+
+    utc = valeur.endswith('Z')
+    brut = datetime.strptime(valeur.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+    if utc:
+        return brut.replace(tzinfo=dt_timezone.utc)
+    if 'TZID' in params:
+        try:
+            return brut.replace(tzinfo=ZoneInfo(params['TZID']))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.make_aware(brut, fuseau_defaut)
+
+
+def lire_calendrier(texte):
+    """
+    Extrait les événements d'un fichier .ics.
+
+    Un événement sans DTEND dure une journée (date) ou zéro seconde (date-heure),
+    conformément à la RFC ; les événements annulés sont ignorés.
+    """
+    evenements = []
+    courant = None
+    for ligne in _deplier(texte):
+        nom, params, valeur = _decouper(ligne)
+        if nom == 'BEGIN' and valeur.upper() == 'VEVENT':
+            courant = {}
+        elif nom == 'END' and valeur.upper() == 'VEVENT':
+            if courant and 'debut' in courant and courant.get('statut') != 'CANCELLED':
+                debut = courant['debut']
+                fin = courant.get('fin')
+                if fin is None:
+                    fin = debut + (timedelta(days=1) if courant.get('jour_entier') else timedelta(0))
+                evenements.append(EvenementIcal(
+                    uid=courant.get('uid', ''),
+                    date_debut=debut,
+                    date_fin=fin,
+                    resume=courant.get('resume', ''),
+                ))
+            courant = None
+        elif courant is not None:
+            if nom == 'DTSTART':
+                courant['debut'] = _lire_date(params, valeur)
+                courant['jour_entier'] = params.get('VALUE') == 'DATE' or len(valeur.strip()) == 8
+            elif nom == 'DTEND':
+                courant['fin'] = _lire_date(params, valeur)
+            elif nom == 'UID':
+                courant['uid'] = valeur.strip()
+            elif nom == 'SUMMARY':
+                courant['resume'] = _desechapper(valeur)
+            elif nom == 'STATUS':
+                courant['statut'] = valeur.strip().upper()
+    return evenements
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.exports import EXPORTS, FORMATS_EXPORT, TAILLE_LOT, generer_export
+
+
+class Command(BaseCommand):
+    help = "Exporte les réservations, utilisateurs ou biens en CSV ou JSONL gzip, en flux continu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('entite', choices=sorted(EXPORTS))
+        parser.add_argument('--format', dest='format_export', choices=FORMATS_EXPORT, default='csv')
+        parser.add_argument('--date-debut', help="Date de création minimale (AAAA-MM-JJ)")
+        parser.add_argument('--date-fin', help="Date de création maximale (AAAA-MM-JJ)")
+        parser.add_argument('--statut', help="Filtre de statut (voir l'endpoint d'export)")
+        parser.add_argument('--sortie', help="Fichier de destination (sortie standard par défaut)")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT,
+                            help="Nombre de lignes lues par aller-retour base de données")
+
+    def handle(self, *args, **options):
+        try:
+            flux = generer_export(
+                options['entite'],
+                format_export=options['format_export'],
+                date_debut=options['date_debut'],
+                date_fin=options['date_fin'],
+                statut=options['statut'],
+                taille_lot=options['taille_lot'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        destination = open(options['sortie'], 'wb') if options['sortie'] else sys.stdout.buffer
+        octets = 0
+        try:
+            for bloc in flux:
+                destination.write(bloc)
+                octets += len(bloc)
+        finally:
+            if options['sortie']:
+                destination.close()
+
+        if options['sortie']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Export {options['entite']} écrit dans {options['sortie']} ({octets} octets)"
+            ))
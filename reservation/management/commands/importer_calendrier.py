@@ -0,0 +1,70 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from reservation.ical import lire_calendrier
+from reservation.models import Bien, PeriodeBlocage
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un calendrier externe (.ics, fichier local ou URL) en périodes de blocage "
+        "pour un bien. Les périodes précédemment importées depuis la même source sont remplacées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('bien_id', type=int)
+        parser.add_argument('calendrier', help="Chemin d'un fichier .ics ou URL http(s)")
+        parser.add_argument('--source', required=True, help="Nom du calendrier d'origine (ex: airbnb)")
+        parser.add_argument('--inclure-passe', action='store_true',
+                            help="Importer aussi les événements déjà terminés")
+
+    def _lire(self, calendrier):
+        if calendrier.startswith(('http://', 'https://')):
+            try:
+                reponse = requests.get(calendrier, timeout=15)
+                reponse.raise_for_status()
+            except requests.RequestException as e:
+                raise CommandError(f"Téléchargement impossible : {e}")
+            return reponse.content.decode('utf-8', errors='replace')
+        try:
+            with open(calendrier, encoding='utf-8', errors='replace') as fichier:
+                return fichier.read()
+        except OSError as e:
+            raise CommandError(f"Lecture impossible : {e}")
+
+    def handle(self, *args, **options):
+        try:
+            bien = Bien.objects.get(pk=options['bien_id'])
+        except Bien.DoesNotExist:
+            raise CommandError(f"Bien {options['bien_id']} introuvable")
+
+        try:
+            evenements = lire_calendrier(self._lire(options['calendrier']))
+        except ValueError as e:
+            raise CommandError(f"Calendrier invalide : {e}")
+
+        maintenant = timezone.now()
+        periodes = [
+            PeriodeBlocage(
+                bien=bien,
+                date_debut=evenement.date_debut,
+                date_fin=evenement.date_fin,
+                source=options['source'],
+                uid_externe=evenement.uid[:255],
+                resume=evenement.resume[:255],
+            )
+            for evenement in evenements
+            if evenement.date_fin > evenement.date_debut
+            and (options['inclure_passe'] or evenement.date_fin > maintenant)
+        ]
+
+        with transaction.atomic():
+            supprimees, _ = PeriodeBlocage.objects.filter(bien=bien, source=options['source']).delete()
+            PeriodeBlocage.objects.bulk_create(periodes, batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{bien.nom} : {len(periodes)} période(s) importée(s) depuis {options['source']} "
+            f"({supprimees} remplacée(s), {len(evenements) - len(periodes)} ignorée(s))"
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from reservation.models import CATEGORIES_AVIS, Avis, AvisStats
+
+
+class Command(BaseCommand):
+    help = "Recalcule entièrement les statistiques d'avis (AvisStats) en une seule requête GROUP BY"
+
+    def handle(self, *args, **options):
+        agregats = {
+            'nombre_avis': Count('id'),
+            'somme_notes': Sum('note'),
+            'nb_recommandations': Count('id', filter=Q(recommande=True)),
+        }
+        for i in range(1, 6):
+            agregats[f'nb_{i}_etoiles'] = Count('id', filter=Q(note=i))
+        for categorie in CATEGORIES_AVIS:
+            agregats[f'somme_{categorie}'] = Sum(f'note_{categorie}')
+            agregats[f'nb_{categorie}'] = Count(f'note_{categorie}')
+
+        lignes = (
+            Avis.objects.filter(est_valide=True)
+            .values('bien_id')
+            .annotate(**agregats)
+            .order_by()
+        )
+        stats = [
+            AvisStats(
+                bien_id=ligne['bien_id'],
+                **{champ: ligne[champ] or 0 for champ in agregats}
+            )
+            for ligne in lignes
+        ]
+
+        with transaction.atomic():
+            AvisStats.objects.all().delete()
+            AvisStats.objects.bulk_create(stats, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"Statistiques d'avis recalculées pour {len(stats)} bien(s)"))
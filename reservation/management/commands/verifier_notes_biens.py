@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from reservation.models import Avis, Bien
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la somme et le nombre de notes tenus sur chaque bien avec les avis valides "
+        "et signale les écarts (--corriger pour les rectifier)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corriger', action='store_true', help="Recalculer les biens en écart")
+
+    def handle(self, *args, **options):
+        avis_valides = Avis.objects.filter(bien=OuterRef('pk'), est_valide=True).values('bien').order_by()
+        biens = (
+            Bien.objects
+            .annotate(
+                vrai_nombre=Coalesce(
+                    Subquery(avis_valides.annotate(n=Count('id')).values('n')),
+                    Value(0), output_field=IntegerField()
+                ),
+                vraie_somme=Coalesce(
+                    Subquery(avis_valides.annotate(s=Sum('note')).values('s')),
+                    Value(0), output_field=IntegerField()
+                ),
+            )
+            .filter(~Q(nb_notes=F('vrai_nombre')) | ~Q(somme_notes=F('vraie_somme')))
+            .values('id', 'nom', 'nb_notes', 'somme_notes', 'vrai_nombre', 'vraie_somme')
+        )
+
+        ecarts = 0
+        for bien in biens.iterator(chunk_size=500):
+            ecarts += 1
+            self.stdout.write(
+                f"Bien {bien['id']} ({bien['nom']}) : {bien['nb_notes']} note(s) / somme {bien['somme_notes']} "
+                f"tenus, {bien['vrai_nombre']} / {bien['vraie_somme']} attendus"
+            )
+            if options['corriger']:
+                nombre, somme = bien['vrai_nombre'], bien['vraie_somme']
+                Bien.objects.filter(pk=bien['id']).update(
+                    nb_notes=nombre,
+                    somme_notes=somme,
+                    noteGlobale=round(somme / nombre, 1) if nombre else 0.0,
+                )
+
+        if not ecarts:
+            self.stdout.write(self.style.SUCCESS("Aucun écart : notes globales cohérentes"))
+        elif options['corriger']:
+            self.stdout.write(self.style.SUCCESS(f"{ecarts} bien(s) corrigé(s)"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{ecarts} bien(s) en écart (relancer avec --corriger)"))
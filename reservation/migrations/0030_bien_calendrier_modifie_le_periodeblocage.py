@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0029_alter_avis_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bien',
+            name='calendrier_modifie_le',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PeriodeBlocage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_debut', models.DateTimeField(verbose_name='Début')),
+                ('date_fin', models.DateTimeField(verbose_name='Fin')),
+                ('source', models.CharField(help_text="Calendrier d'origine (ex: airbnb, booking)", max_length=100, verbose_name='Source')),
+                ('uid_externe', models.CharField(blank=True, max_length=255, verbose_name='UID externe')),
+                ('resume', models.CharField(blank=True, max_length=255, verbose_name='Résumé')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('bien', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periodes_blocage', to='reservation.bien', verbose_name='Bien')),
+            ],
+            options={
+                'verbose_name': 'Période de blocage',
+                'verbose_name_plural': 'Périodes de blocage',
+                'ordering': ['date_debut'],
+                'indexes': [models.Index(fields=['bien', 'date_debut', 'date_fin'], name='blocage_bien_periode_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+CATEGORIES = ('proprete', 'communication', 'emplacement', 'rapport_qualite_prix')
+
+
+def initialiser_stats_avis(apps, schema_editor):
+    """Calcule les statistiques des avis existants (même requête que reconstruire_stats_avis)"""
+    Avis = apps.get_model('reservation', 'Avis')
+    AvisStats = apps.get_model('reservation', 'AvisStats')
+
+    agregats = {
+        'nombre_avis': Count('id'),
+        'somme_notes': Sum('note'),
+        'nb_recommandations': Count('id', filter=Q(recommande=True)),
+    }
+    for i in range(1, 6):
+        agregats[f'nb_{i}_etoiles'] = Count('id', filter=Q(note=i))
+    for categorie in CATEGORIES:
+        agregats[f'somme_{categorie}'] = Sum(f'note_{categorie}')
+        agregats[f'nb_{categorie}'] = Count(f'note_{categorie}')
+
+    lignes = Avis.objects.filter(est_valide=True).values('bien_id').annotate(**agregats).order_by()
+    AvisStats.objects.bulk_create(
+        [AvisStats(bien_id=ligne['bien_id'], **{champ: ligne[champ] or 0 for champ in agregats}) for ligne in lignes],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0030_bien_calendrier_modifie_le_periodeblocage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvisStats',
+            fields=[
+                ('bien', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats_avis', serialize=False, to='reservation.bien', verbose_name='Bien')),
+                ('nombre_avis', models.IntegerField(default=0)),
+                ('somme_notes', models.IntegerField(default=0)),
+                ('nb_1_etoiles', models.IntegerField(default=0)),
+                ('nb_2_etoiles', models.IntegerField(default=0)),
+                ('nb_3_etoiles', models.IntegerField(default=0)),
+                ('nb_4_etoiles', models.IntegerField(default=0)),
+                ('nb_5_etoiles', models.IntegerField(default=0)),
+                ('nb_recommandations', models.IntegerField(default=0)),
+                ('somme_proprete', models.IntegerField(default=0)),
+                ('nb_proprete', models.IntegerField(default=0)),
+                ('somme_communication', models.IntegerField(default=0)),
+                ('nb_communication', models.IntegerField(default=0)),
+                ('somme_emplacement', models.IntegerField(default=0)),
+                ('nb_emplacement', models.IntegerField(default=0)),
+                ('somme_rapport_qualite_prix', models.IntegerField(default=0)),
+                ('nb_rapport_qualite_prix', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+            ],
+            options={
+                'verbose_name': 'Statistiques des avis',
+                'verbose_name_plural': 'Statistiques des avis',
+            },
+        ),
+        migrations.RunPython(initialiser_stats_avis, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def initialiser_compteurs_notes(apps, schema_editor):
+    """Initialise somme et nombre des notes valides de chaque bien en un UPDATE"""
+    Avis = apps.get_model('reservation', 'Avis')
+    Bien = apps.get_model('reservation', 'Bien')
+
+    avis_valides = Avis.objects.filter(bien=OuterRef('pk'), est_valide=True).values('bien').order_by()
+    Bien.objects.update(
+        nb_notes=Coalesce(Subquery(avis_valides.annotate(n=Count('id')).values('n')), Value(0), output_field=IntegerField()),
+        somme_notes=Coalesce(Subquery(avis_valides.annotate(s=Sum('note')).values('s')), Value(0), output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0031_avisstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bien',
+            name='nb_notes',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='bien',
+            name='somme_notes',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(initialiser_compteurs_notes, migrations.RunPython.noop),
+    ]
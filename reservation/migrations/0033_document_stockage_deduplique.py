@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:05
+
+import Auths.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0032_bien_nb_notes_somme_notes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='fichier',
+            field=models.FileField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to='documents_biens/'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=Auths.stockage.stockage_documents, upload_to='documents_biens/images/'),
+        ),
+    ]
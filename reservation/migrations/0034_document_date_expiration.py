@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0033_document_stockage_deduplique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='date_expiration',
+            field=models.DateField(blank=True, null=True, verbose_name="Date d'expiration"),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='expiration_notifiee',
+            field=models.DateField(blank=True, null=True, verbose_name='Expiration notifiée'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('date_expiration__isnull', False)), fields=['date_expiration'], name='document_bien_expiration_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0034_document_date_expiration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favori',
+            index=models.Index(fields=['user', 'created_at'], name='favori_user_ajout_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', 'updated_at'], name='reservation_user_maj_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['bien', 'updated_at'], name='reservation_bien_maj_idx'),
+        ),
+    ]
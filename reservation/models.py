@@ -1,10 +1,12 @@
 from django.db import models
 from Auths.utils import bien_image_upload_to  # <- [`Auths.utils.bien_image_upload_to`](Auths/utils.py)
+from Auths.stockage import liberer_fichiers, liberer_fichiers_remplaces, memoriser_fichiers, stockage_documents
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator,MaxValueValidator
 from decimal import Decimal
 from enum import Enum
-from django.db.models import TextChoices
+from django.db.models import TextChoices, F, Case, When, Value
+from django.db.models.functions import Cast, Round
 from django.utils import timezone
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
@@ -164,6 +166,13 @@ class Bien(models.Model):
 
     est_verifie = models.BooleanField(default=False)
 
+    # Somme et nombre des notes des avis valides : noteGlobale = somme / nombre
+    nb_notes = models.IntegerField(default=0, editable=False)
+    somme_notes = models.IntegerField(default=0, editable=False)
+
+    # Horodatage du dernier changement de réservation (version du flux iCalendar)
+    calendrier_modifie_le = models.DateTimeField(null=True, blank=True, editable=False)
+
     def get_first_image(self):
         """Récupère la première image du bien pour l'affichage en liste"""
         return self.media.first().image.url if self.media.exists() else None
@@ -202,8 +211,8 @@ class DisponibiliteHebdo(models.Model):
 class Document(models.Model):
     bien = models.ForeignKey("Bien", related_name="documents", on_delete=models.CASCADE)
     nom = models.CharField(max_length=255)  # Exemple: "Carte Grise", "Attestation de propriété"
-    fichier = models.FileField(upload_to='documents_biens/', blank=True, null=True)
-    image = models.ImageField(upload_to='documents_biens/images/', blank=True, null=True)
+    fichier = models.FileField(upload_to='documents_biens/', storage=stockage_documents, blank=True, null=True)
+    image = models.ImageField(upload_to='documents_biens/images/', storage=stockage_documents, blank=True, null=True)
     type = models.CharField(
         max_length=100,
         choices=[
@@ -213,10 +222,27 @@ class Document(models.Model):
             ('autre', 'Autre'),
         ]
     )
+    date_expiration = models.DateField(null=True, blank=True, verbose_name="Date d'expiration")
+    expiration_notifiee = models.DateField(null=True, blank=True, verbose_name="Expiration notifiée")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
     date_upload = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['date_expiration'],
+                condition=models.Q(date_expiration__isnull=False),
+                name='document_bien_expiration_idx',
+            ),
+        ]
+
+    def is_expired(self):
+        """Vérifie si le document (assurance, carte grise…) est expiré"""
+        if self.date_expiration:
+            return timezone.now().date() > self.date_expiration
+        return False
+
     def clean(self):
         """Validation pour s'assurer qu'au moins un fichier ou une image est fourni"""
         from django.core.exceptions import ValidationError
@@ -357,6 +383,11 @@ class Reservation(models.Model):
         ordering = ['-created_at']  # Réservations les plus récentes en premier
         verbose_name = "Réservation"
         verbose_name_plural = "Réservations"
+        indexes = [
+            # Synchronisation différentielle (chat/synchronisation.py) : client et hôte
+            models.Index(fields=['user', 'updated_at'], name='reservation_user_maj_idx'),
+            models.Index(fields=['bien', 'updated_at'], name='reservation_bien_maj_idx'),
+        ]
     
     def __str__(self):
         return f"Reservation #{self.id} - {self.user.username}"
@@ -446,6 +477,43 @@ class HistoriqueStatutReservation(models.Model):
     def __str__(self):
         return f"Reservation {self.reservation.id} : {self.ancien_statut} → {self.nouveau_statut}"
 
+# ============================================================================
+# MODÈLE PÉRIODE DE BLOCAGE
+# ============================================================================
+# Indisponibilités importées depuis un calendrier externe (.ics)
+# Exemple : "Villa Assinie réservée sur Airbnb du 10 au 15 août"
+# Prises en compte dans la vérification des conflits à la réservation
+class PeriodeBlocage(models.Model):
+    bien = models.ForeignKey(
+        Bien,
+        on_delete=models.CASCADE,
+        related_name='periodes_blocage',
+        verbose_name="Bien"
+    )
+    date_debut = models.DateTimeField(verbose_name="Début")
+    date_fin = models.DateTimeField(verbose_name="Fin")
+    source = models.CharField(
+        max_length=100,
+        verbose_name="Source",
+        help_text="Calendrier d'origine (ex: airbnb, booking)"
+    )
+    uid_externe = models.CharField(max_length=255, blank=True, verbose_name="UID externe")
+    resume = models.CharField(max_length=255, blank=True, verbose_name="Résumé")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+
+    class Meta:
+        ordering = ['date_debut']
+        indexes = [
+            models.Index(fields=['bien', 'date_debut', 'date_fin'], name='blocage_bien_periode_idx'),
+        ]
+        verbose_name = "Période de blocage"
+        verbose_name_plural = "Périodes de blocage"
+
+    def __str__(self):
+        return f"{self.bien.nom} bloqué du {self.date_debut:%d/%m/%Y} au {self.date_fin:%d/%m/%Y} ({self.source})"
+
 # ============================================================================
 # MODÈLE FAVORI
 # ============================================================================
@@ -474,10 +542,44 @@ class Favori(models.Model):
         ordering = ['-created_at']  # Favoris les plus récents en premier
         verbose_name = "Favori"
         verbose_name_plural = "Favoris"
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='favori_user_ajout_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.bien.nom}"
 
+# ============================================================================
+# SIGNAUX POUR LE CACHE DES FAVORIS
+# ============================================================================
+@receiver(post_save, sender=Favori)
+def invalider_favoris_apres_ajout(sender, instance, created, **kwargs):
+    if created:
+        from .favoris import invalider_favoris_cache
+        invalider_favoris_cache(instance.user_id)
+
+@receiver(models.signals.post_delete, sender=Favori)
+def invalider_favoris_apres_retrait(sender, instance, **kwargs):
+    from .favoris import invalider_favoris_cache
+    invalider_favoris_cache(instance.user_id)
+
+# ============================================================================
+# RÉFÉRENCES DES FICHIERS DÉDUPLIQUÉS (voir Auths/stockage.py)
+# ============================================================================
+CHAMPS_FICHIERS_DOCUMENT = ('fichier', 'image')
+
+@receiver(pre_save, sender=Document)
+def memoriser_fichiers_document_bien(sender, instance, update_fields=None, **kwargs):
+    memoriser_fichiers(instance, CHAMPS_FICHIERS_DOCUMENT, update_fields)
+
+@receiver(post_save, sender=Document)
+def liberer_fichiers_remplaces_document_bien(sender, instance, **kwargs):
+    liberer_fichiers_remplaces(instance)
+
+@receiver(models.signals.post_delete, sender=Document)
+def liberer_fichiers_document_bien(sender, instance, **kwargs):
+    liberer_fichiers(instance, CHAMPS_FICHIERS_DOCUMENT)
+
 # ============================================================================
 # SIGNAL POUR ENVOYER UN EMAIL LORS DU TÉLÉCHARGEMENT DE DOCUMENT
 # ============================================================================
@@ -645,26 +747,189 @@ class Avis(models.Model):
         if self.reservation and self.reservation.bien != self.bien:
             raise ValidationError("Le bien ne correspond pas à la réservation.")
 
+# ============================================================================
+# MODÈLE STATISTIQUES DES AVIS
+# ============================================================================
+# Compteurs agrégés des avis valides d'un bien, tenus à jour par signaux
+# Exemple : "Villa Assinie : 12 avis, 9 × 5⭐, 11 recommandations"
+# Évite de ré-agréger tous les avis à chaque consultation des statistiques
+CATEGORIES_AVIS = ('proprete', 'communication', 'emplacement', 'rapport_qualite_prix')
+
+# Champs d'Avis qui influencent les statistiques (et la note globale)
+CHAMPS_STATS_AVIS = (
+    'bien_id', 'note', 'recommande', 'est_valide',
+    *(f'note_{categorie}' for categorie in CATEGORIES_AVIS),
+)
+
+
+class AvisStats(models.Model):
+    bien = models.OneToOneField(
+        Bien,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats_avis',
+        verbose_name="Bien"
+    )
+    nombre_avis = models.IntegerField(default=0)
+    somme_notes = models.IntegerField(default=0)
+    nb_1_etoiles = models.IntegerField(default=0)
+    nb_2_etoiles = models.IntegerField(default=0)
+    nb_3_etoiles = models.IntegerField(default=0)
+    nb_4_etoiles = models.IntegerField(default=0)
+    nb_5_etoiles = models.IntegerField(default=0)
+    nb_recommandations = models.IntegerField(default=0)
+
+    # Notes détaillées : somme et nombre d'avis ayant renseigné la catégorie
+    somme_proprete = models.IntegerField(default=0)
+    nb_proprete = models.IntegerField(default=0)
+    somme_communication = models.IntegerField(default=0)
+    nb_communication = models.IntegerField(default=0)
+    somme_emplacement = models.IntegerField(default=0)
+    nb_emplacement = models.IntegerField(default=0)
+    somme_rapport_qualite_prix = models.IntegerField(default=0)
+    nb_rapport_qualite_prix = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+
+    class Meta:
+        verbose_name = "Statistiques des avis"
+        verbose_name_plural = "Statistiques des avis"
+
+    def __str__(self):
+        return f"Statistiques avis du bien {self.bien_id} ({self.nombre_avis} avis)"
+
+    def en_statistiques(self):
+        """Format de réponse de l'endpoint statistiques_avis_bien"""
+        def moyenne(somme, nombre):
+            return round(somme / nombre, 1) if nombre else None
+
+        return {
+            'note_moyenne': moyenne(self.somme_notes, self.nombre_avis) or 0,
+            'nombre_avis': self.nombre_avis,
+            'repartition_notes': {
+                f"{i}_etoiles": getattr(self, f'nb_{i}_etoiles') for i in range(1, 6)
+            },
+            'pourcentage_recommandation': (
+                round(self.nb_recommandations / self.nombre_avis * 100, 1) if self.nombre_avis else 0
+            ),
+            'notes_moyennes_categories': {
+                categorie: moyenne(getattr(self, f'somme_{categorie}'), getattr(self, f'nb_{categorie}'))
+                for categorie in CATEGORIES_AVIS
+            },
+        }
+
+
+def contribution_avis(etat):
+    """Compteurs AvisStats apportés par un avis (dict de CHAMPS_STATS_AVIS) ; vide s'il n'est pas valide"""
+    if not etat or not etat['est_valide']:
+        return {}
+    contribution = {
+        'nombre_avis': 1,
+        'somme_notes': etat['note'],
+        f"nb_{etat['note']}_etoiles": 1,
+        'nb_recommandations': 1 if etat['recommande'] else 0,
+    }
+    for categorie in CATEGORIES_AVIS:
+        valeur = etat[f'note_{categorie}']
+        if valeur is not None:
+            contribution[f'somme_{categorie}'] = valeur
+            contribution[f'nb_{categorie}'] = 1
+    return contribution
+
+
+def deltas_stats_avis(ancien, nouveau):
+    """{bien_id: {compteur: delta}} entre deux états d'un avis (None = inexistant)"""
+    deltas = {}
+    for etat, signe in ((ancien, -1), (nouveau, 1)):
+        for champ, valeur in contribution_avis(etat).items():
+            compteurs = deltas.setdefault(etat['bien_id'], {})
+            compteurs[champ] = compteurs.get(champ, 0) + signe * valeur
+    deltas = {
+        bien_id: {champ: delta for champ, delta in compteurs.items() if delta}
+        for bien_id, compteurs in deltas.items()
+    }
+    return {bien_id: compteurs for bien_id, compteurs in deltas.items() if compteurs}
+
+
+def appliquer_delta_stats_avis(bien_id, delta, creer=True):
+    """Applique un delta de compteurs en un seul UPDATE (création de la ligne au besoin)"""
+    valeurs = {champ: F(champ) + valeur for champ, valeur in delta.items()}
+    valeurs['updated_at'] = timezone.now()
+    if AvisStats.objects.filter(bien_id=bien_id).update(**valeurs) or not creer:
+        return
+    AvisStats.objects.get_or_create(bien_id=bien_id)
+    AvisStats.objects.filter(bien_id=bien_id).update(**valeurs)
+
+
+def _etat_avis(avis):
+    return {champ: getattr(avis, champ) for champ in CHAMPS_STATS_AVIS}
+
+
+@receiver(pre_save, sender=Avis)
+def memoriser_etat_avis(sender, instance, update_fields=None, **kwargs):
+    """Conserve l'état stocké de l'avis pour calculer les deltas après sauvegarde"""
+    if update_fields is not None and not ({'bien', *CHAMPS_STATS_AVIS} & set(update_fields)):
+        instance._etat_avis_precedent = False  # Aucun champ statistique modifié
+        return
+    if not instance.pk:
+        instance._etat_avis_precedent = None
+        return
+    instance._etat_avis_precedent = (
+        Avis.objects.filter(pk=instance.pk).values(*CHAMPS_STATS_AVIS).first()
+    )
+
+
+@receiver(post_save, sender=Avis)
+def mettre_a_jour_stats_avis_sauvegarde(sender, instance, **kwargs):
+    """Ajuste les compteurs du bien selon la différence ancien/nouvel état"""
+    ancien = getattr(instance, '_etat_avis_precedent', None)
+    if ancien is False:
+        return
+    for bien_id, delta in deltas_stats_avis(ancien, _etat_avis(instance)).items():
+        appliquer_delta_stats_avis(bien_id, delta)
+
+
+@receiver(models.signals.post_delete, sender=Avis)
+def mettre_a_jour_stats_avis_suppression(sender, instance, **kwargs):
+    # Pas de création : lors de la suppression d'un bien, ses statistiques partent avec lui
+    for bien_id, delta in deltas_stats_avis(_etat_avis(instance), None).items():
+        appliquer_delta_stats_avis(bien_id, delta, creer=False)
+
 # ============================================================================
 # SIGNAL POUR METTRE À JOUR LA NOTE GLOBALE DU BIEN
 # ============================================================================
+def ajuster_note_globale(bien_id, delta_nombre, delta_somme):
+    """Ajuste somme, nombre et note globale du bien en un seul UPDATE"""
+    if not delta_nombre and not delta_somme:
+        return
+    nombre = F('nb_notes') + delta_nombre
+    somme = F('somme_notes') + delta_somme
+    Bien.objects.filter(pk=bien_id).update(
+        nb_notes=nombre,
+        somme_notes=somme,
+        noteGlobale=Case(
+            When(nb_notes__gt=-delta_nombre, then=Round(Cast(somme, models.FloatField()) / nombre, 1)),
+            default=Value(0.0),
+            output_field=models.FloatField(),
+        ),
+    )
+
+
 @receiver(models.signals.post_save, sender=Avis)
-@receiver(models.signals.post_delete, sender=Avis)
 def mettre_a_jour_note_globale_bien(sender, instance, **kwargs):
-    """Met à jour la note globale du bien après ajout/suppression d'un avis"""
-    from django.db.models import Avg
-    
-    bien = instance.bien
-    note_moyenne = bien.avis.filter(est_valide=True).aggregate(
-        moyenne=Avg('note')
-    )['moyenne']
-    
-    if note_moyenne:
-        bien.noteGlobale = round(note_moyenne, 1)
-    else:
-        bien.noteGlobale = 0.0
-    
-    bien.save(update_fields=['noteGlobale'])
+    """Met à jour la note globale du bien selon la différence ancien/nouvel avis"""
+    ancien = getattr(instance, '_etat_avis_precedent', None)
+    if ancien is False:
+        return  # Aucun champ pris en compte dans la note n'a changé
+    for bien_id, delta in deltas_stats_avis(ancien, _etat_avis(instance)).items():
+        ajuster_note_globale(bien_id, delta.get('nombre_avis', 0), delta.get('somme_notes', 0))
+
+
+@receiver(models.signals.post_delete, sender=Avis)
+def retirer_note_globale_bien(sender, instance, **kwargs):
+    """Retire la note d'un avis supprimé de la note globale du bien"""
+    for bien_id, delta in deltas_stats_avis(_etat_avis(instance), None).items():
+        ajuster_note_globale(bien_id, delta.get('nombre_avis', 0), delta.get('somme_notes', 0))
 
 # ============================================================================
 # SIGNAL POUR HISTORIQUE DES STATUTS DE RÉSERVATION
@@ -683,6 +948,15 @@ def sauvegarder_historique_statut(sender, instance, **kwargs):
             nouveau_statut=instance.status
         )
 
+# ============================================================================
+# SIGNAL POUR LA VERSION DU CALENDRIER DU BIEN
+# ============================================================================
+@receiver(post_save, sender=Reservation)
+@receiver(models.signals.post_delete, sender=Reservation)
+def marquer_calendrier_bien_modifie(sender, instance, **kwargs):
+    """Change la version du flux .ics du bien (ETag et clé de cache)"""
+    Bien.objects.filter(pk=instance.bien_id).update(calendrier_modifie_le=timezone.now())
+
 # ============================================================================
 # MODÈLE REVENU PROPRIÉTAIRE
 # ============================================================================
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from .favoris import favoris_ids_requete
 from .models import (
     Reservation, Bien, Media, Favori, TagBien, Tarif, Type_Bien, 
     Document, Avis, DisponibiliteHebdo, Ville, CodePromo,
-    HistoriqueStatutReservation, RevenuProprietaire
+    HistoriqueStatutReservation, RevenuProprietaire, PeriodeBlocage
 )
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -67,7 +68,7 @@ class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = [
-            'id', 'bien', 'nom', 'type', 'fichier', 'image',
+            'id', 'bien', 'nom', 'type', 'fichier', 'image', 'date_expiration',
             'file_url', 'file_type', 'file_extension', 'created_at'
         ]
 
@@ -139,10 +140,7 @@ class BienSerializer(serializers.ModelSerializer):
         return Favori.objects.filter(bien=obj).count()
 
     def get_is_favori(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favori.objects.filter(user=request.user, bien=obj).exists()
-        return False
+        return obj.id in favoris_ids_requete(self.context.get('request'))
 
     def get_premiere_image(self, obj):
         request = self.context.get('request')
@@ -251,6 +249,15 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         
         if conflits.exists():
             raise serializers.ValidationError("Ce bien est déjà réservé pour cette période.")
+
+        # Vérifier les indisponibilités importées des calendriers externes
+        blocages = PeriodeBlocage.objects.filter(
+            bien=bien,
+            date_debut__lt=date_fin,
+            date_fin__gt=date_debut
+        )
+        if blocages.exists():
+            raise serializers.ValidationError("Ce bien est indisponible pour cette période.")
         
         return data
 
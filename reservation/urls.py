@@ -3,6 +3,8 @@ from .views import (
     SoldeHoteView, 
     ReservationDetailView,
     HistoriqueRevenusProprietaireView,
+    ExportDonneesAdminView,
+    CalendrierBienView,
 )
 
 from .viewserializer import (
@@ -16,6 +18,7 @@ from .viewserializer import (
     MesFavorisView,
     RetirerFavoriView,
     toggle_favori,
+    verifier_favoris,
     likes_de_mon_bien,
     TarifCreateView,
     TarifDeleteView,
@@ -47,9 +50,13 @@ urlpatterns = [
     path('creer-reservations/', CreateReservationView.as_view(), name='create-reservation'),
     path('mes-reservations/', MesReservationsView.as_view(), name='mes-reservations'),
     path('all-reservations/', AllReservationsView.as_view(), name='all-reservations'),
+
+    # Exports administrateur (reservations, utilisateurs, biens)
+    path('admin/exports/<str:entite>/', ExportDonneesAdminView.as_view(), name='admin-export-donnees'),
     
     # Disponibilité publique
     path('biens/<int:bien_id>/disponibilite/', DisponibiliteBienView.as_view(), name='disponibilite-bien'),
+    path('biens/<int:bien_id>/calendrier.ics', CalendrierBienView.as_view(), name='calendrier-bien'),
     
     # Détails et mise à jour
     path('reservations/<int:pk>/', ReservationDetailView.as_view(), name='reservation-detail'),
@@ -78,6 +85,7 @@ urlpatterns = [
     path('mes-favoris/', MesFavorisView.as_view(), name='mes-favoris'),
     path('favoris/<int:pk>/', RetirerFavoriView.as_view(), name='retirer-favori'),
     path('favoris/toggle/', toggle_favori, name='toggle-favori'),
+    path('favoris/check/', verifier_favoris, name='verifier-favoris'),
     
     # Hote
     path('Dashboard/solde/', SoldeHoteView.as_view(), name='hote-solde'),
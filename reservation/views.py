@@ -11,7 +11,8 @@ import logging
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.db import models
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
 
 from django.shortcuts import get_object_or_404
 from .models import Reservation, HistoriqueStatutReservation, RevenuProprietaire
@@ -25,6 +26,7 @@ from .serializers import (
     ReservationListSerializer,
 )
 from decimal import Decimal
+from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -125,3 +127,130 @@ class HistoriqueRevenusProprietaireView(APIView):
             })
         
         return Response(revenus_data)
+
+
+class ExportDonneesAdminView(APIView):
+    """Export en flux (CSV ou JSONL gzip) réservé aux administrateurs"""
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Exporter les réservations, utilisateurs ou biens en flux continu. "
+            "Le fichier est produit au fil de l'eau, sans charger les données en mémoire."
+        ),
+        manual_parameters=[
+            openapi.Parameter('export_format', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=['csv', 'jsonl'], description="csv (défaut) ou jsonl (compressé gzip)"),
+            openapi.Parameter('date_debut', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Date de création minimale (AAAA-MM-JJ)"),
+            openapi.Parameter('date_fin', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Date de création maximale (AAAA-MM-JJ)"),
+            openapi.Parameter('statut', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Réservations : statuts séparés par des virgules ; "
+                                          "utilisateurs : actif/inactif/vendor/client ; "
+                                          "biens : verifie/non_verifie/disponible/indisponible"),
+        ],
+        responses={
+            200: "Fichier d'export",
+            400: "Paramètres invalides",
+            403: "Réservé aux administrateurs"
+        },
+        tags=['Administration']
+    )
+    def get(self, request, entite):
+        from .exports import generer_export
+
+        format_export = request.query_params.get('export_format', 'csv')
+        try:
+            flux = generer_export(
+                entite,
+                format_export=format_export,
+                date_debut=request.query_params.get('date_debut'),
+                date_fin=request.query_params.get('date_fin'),
+                statut=request.query_params.get('statut'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        horodatage = timezone.now().strftime('%Y%m%d_%H%M%S')
+        if format_export == 'csv':
+            response = StreamingHttpResponse(flux, content_type='text/csv; charset=utf-8')
+            nom_fichier = f"export_{entite}_{horodatage}.csv"
+        else:
+            response = StreamingHttpResponse(flux, content_type='application/gzip')
+            nom_fichier = f"export_{entite}_{horodatage}.jsonl.gz"
+        response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+        logger.info(f"Export {entite} ({format_export}) lancé par {request.user.username}")
+        return response
+
+
+class CalendrierBienView(APIView):
+    """Flux iCalendar (.ics) public des réservations d'un bien"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []  # Les clients calendrier n'envoient pas de jeton
+
+    # Fenêtre des réservations passées encore publiées
+    JOURS_HISTORIQUE = 30
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Flux .ics des réservations en attente et confirmées d'un bien, "
+            "à abonner dans un calendrier externe (Airbnb, Google Agenda...). "
+            "Supporte If-None-Match (réponse 304)."
+        ),
+        responses={
+            200: "Calendrier text/calendar",
+            304: "Calendrier inchangé",
+            404: "Bien non trouvé"
+        },
+        tags=['Disponibilité']
+    )
+    def get(self, request, bien_id):
+        from django.core.cache import cache
+        from django.http import HttpResponseNotModified
+        from .ical import generer_calendrier
+        from .models import Bien
+
+        bien = get_object_or_404(Bien.objects.only('id', 'nom', 'calendrier_modifie_le'), pk=bien_id)
+
+        # La version change à chaque modification de réservation du bien,
+        # et chaque jour puisque la fenêtre publiée glisse avec le temps
+        modifie = bien.calendrier_modifie_le
+        version = f"{int(modifie.timestamp() * 1000000) if modifie else 0}-{timezone.localdate():%Y%m%d}"
+        etag = f'"bien-{bien.id}-{version}"'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in [valeur.strip() for valeur in if_none_match.split(',')]:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        cle_cache = f"calendrier_ics:{bien.id}:{version}"
+        contenu = cache.get(cle_cache)
+        if contenu is None:
+            debut_fenetre = timezone.now() - timedelta(days=self.JOURS_HISTORIQUE)
+            reservations = Reservation.objects.filter(
+                bien_id=bien.id,
+                status__in=['pending', 'confirmed'],
+                date_fin__gte=debut_fenetre
+            ).order_by('date_debut').values('id', 'status', 'date_debut', 'date_fin')
+
+            evenements = (
+                {
+                    'uid': f"reservation-{r['id']}@babiloc",
+                    'date_debut': r['date_debut'],
+                    'date_fin': r['date_fin'],
+                    'resume': "Réservé (BabiLoc)" if r['status'] == 'confirmed' else "En attente (BabiLoc)",
+                    'statut': 'CONFIRMED' if r['status'] == 'confirmed' else 'TENTATIVE',
+                }
+                for r in reservations
+            )
+            contenu = generer_calendrier(f"BabiLoc - {bien.nom}", evenements, horodatage=modifie)
+            cache.set(cle_cache, contenu, self.CACHE_TIMEOUT)
+
+        response = HttpResponse(contenu, content_type='text/calendar; charset=utf-8')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=300'
+        response['Content-Disposition'] = f'inline; filename="bien-{bien.id}.ics"'
+        return response
@@ -3,13 +3,13 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Avg
+from django.db.models import Count, Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from Auths import permission
 from rest_framework import serializers
-from django.db.models import Count, Avg
-from .models import Reservation,TagBien, Ville,Bien, HistoriqueStatutReservation, Favori, Tarif, Avis, Type_Bien, Document, Typetarif
+from .favoris import favoris_ids_requete
+from .models import Reservation,TagBien, Ville,Bien, HistoriqueStatutReservation, Favori, Tarif, Avis, Type_Bien, Document, Typetarif, AvisStats
 from .serializers import (
     ReservationSerializer,
     ReservationCreateSerializer,
@@ -885,6 +885,50 @@ def toggle_favori(request):
             'favori': serializer.data
         }, status=status.HTTP_200_OK)
 
+@swagger_auto_schema(
+    method='get',
+    operation_description="Vérifier en une fois si des biens sont dans les favoris de l'utilisateur",
+    manual_parameters=[
+        openapi.Parameter(
+            'ids', openapi.IN_QUERY,
+            description="IDs des biens séparés par des virgules (200 maximum)",
+            type=openapi.TYPE_STRING, required=True
+        )
+    ],
+    responses={
+        200: openapi.Response(
+            description="Appartenance aux favoris par ID de bien",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'favoris': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        additional_properties=openapi.Schema(type=openapi.TYPE_BOOLEAN)
+                    )
+                }
+            )
+        ),
+        400: "Paramètre ids invalide",
+        401: "Non authentifié"
+    },
+    tags=['Favoris']
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def verifier_favoris(request):
+    """
+    Indique pour chaque bien demandé s'il est dans les favoris (sans requête par bien)
+    """
+    try:
+        ids = [int(valeur) for valeur in request.query_params.get('ids', '').split(',') if valeur.strip()]
+    except ValueError:
+        return Response({'error': 'ids doit être une liste d\'entiers séparés par des virgules'}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids or len(ids) > 200:
+        return Response({'error': 'Entre 1 et 200 ids requis'}, status=status.HTTP_400_BAD_REQUEST)
+
+    favoris = favoris_ids_requete(request)
+    return Response({'favoris': {str(bien_id): bien_id in favoris for bien_id in ids}})
+
 @swagger_auto_schema(
     method='get',
     operation_summary="Voir les utilisateurs qui ont liké un bien",
@@ -1102,53 +1146,15 @@ class ReponseProprietaireView(generics.UpdateAPIView):
 def statistiques_avis_bien(request, bien_id):
     """
     Retourne les statistiques d'avis pour un bien donné
+    (lecture des compteurs AvisStats tenus à jour par signaux)
     """
-    try:
-        bien = Bien.objects.get(id=bien_id)
-    except Bien.DoesNotExist:
-        return Response({"detail": "Bien non trouvé"}, status=404)
-    
-    avis = bien.avis.filter(est_valide=True)
-    
-    # Statistiques de base
-    stats = avis.aggregate(
-        note_moyenne=Avg('note'),
-        nombre_avis=Count('id')
-    )
-    
-    # Répartition des notes
-    repartition = {}
-    for i in range(1, 6):
-        repartition[f"{i}_etoiles"] = avis.filter(note=i).count()
-    
-    # Pourcentage de recommandation
-    total_avis = stats['nombre_avis'] or 0
-    recommandations = avis.filter(recommande=True).count()
-    pourcentage_recommandation = (recommandations / total_avis * 100) if total_avis > 0 else 0
-    
-    # Notes moyennes par catégorie
-    notes_categories = avis.aggregate(
-        proprete=Avg('note_proprete'),
-        communication=Avg('note_communication'),
-        emplacement=Avg('note_emplacement'),
-        rapport_qualite_prix=Avg('note_rapport_qualite_prix')
-    )
-    
-    # Nettoyer les valeurs None
-    notes_categories = {
-        k: round(v, 1) if v is not None else None 
-        for k, v in notes_categories.items()
-    }
-    
-    data = {
-        'note_moyenne': round(stats['note_moyenne'], 1) if stats['note_moyenne'] else 0,
-        'nombre_avis': total_avis,
-        'repartition_notes': repartition,
-        'pourcentage_recommandation': round(pourcentage_recommandation, 1),
-        'notes_moyennes_categories': notes_categories
-    }
-    
-    return Response(data)
+    stats = AvisStats.objects.filter(bien_id=bien_id).first()
+    if stats is None:
+        if not Bien.objects.filter(id=bien_id).exists():
+            return Response({"detail": "Bien non trouvé"}, status=404)
+        stats = AvisStats(bien_id=bien_id)  # Aucun avis encore enregistré
+
+    return Response(stats.en_statistiques())
 
 @swagger_auto_schema(
     method='get',